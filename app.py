@@ -10,6 +10,10 @@ def create_app():
     app = Flask(__name__)
     app.config.from_object(Config)
     
+    # orjson for jsonify()/get_json(); Decimal and datetime serialized natively
+    from utils.json_provider import init_json_provider
+    init_json_provider(app)
+    
     # Configure upload settings
     app.config['MAX_CONTENT_LENGTH'] = 5 * 1024 * 1024  # 5MB max file size
     app.config['UPLOAD_FOLDER'] = 'static/uploads'
@@ -25,6 +29,22 @@ def create_app():
     # Initialize database pool
     db.create_pool()
     
+    # Per-request statement counts checked against route query budgets
+    from utils.query_stats import init_query_stats
+    init_query_stats(app)
+    
+    # Latency/DB/size histograms, served on /metrics
+    from utils.metrics import init_metrics
+    init_metrics(app)
+    
+    # Statements over SLOW_QUERY_MS are logged with an EXPLAIN plan
+    from utils.slow_queries import init_slow_query_log
+    init_slow_query_log(app)
+    
+    # cProfile for sampled or admin-flagged requests (no hooks when disabled)
+    from utils.request_profiler import init_request_profiler
+    init_request_profiler(app)
+    
     # Initialize Telegram service
     from utils.telegram_service import init_telegram_service
     if app.config.get('TELEGRAM_BOT_TOKEN') and app.config.get('TELEGRAM_ADMIN_CHAT_ID'):
@@ -46,6 +66,9 @@ def create_app():
     from routes.upload_routes import upload_bp
     from routes.verification_routes import verification_bp
     from routes.support_routes import support_bp
+    from routes.media_routes import media_bp
+    from routes.admin_routes import admin_bp
+    from routes.batch_routes import batch_bp
     
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
     app.register_blueprint(user_bp, url_prefix='/api/users')
@@ -58,6 +81,16 @@ def create_app():
     app.register_blueprint(upload_bp, url_prefix='/api/upload')
     app.register_blueprint(verification_bp, url_prefix='/api/verification')
     app.register_blueprint(support_bp, url_prefix='/api/support')
+    app.register_blueprint(admin_bp, url_prefix='/api/admin')
+    app.register_blueprint(batch_bp, url_prefix='/api/batch')
+    
+    # Uploaded media: takes precedence over the generic /static/<path> rule
+    app.register_blueprint(media_bp, url_prefix='/static/uploads')
+    
+    # gzip/brotli for large JSON/text responses; registered last so it runs
+    # before the other after_request hooks
+    from utils.compression import init_compression
+    init_compression(app)
     
     @app.route('/api/health')
     def health():
@@ -0,0 +1,355 @@
+"""
+End-to-end HTTP load test with per-endpoint latency percentiles
+
+Drives a running server (or boots `gunicorn app:app` itself with --boot)
+with a mix of realistic user journeys from concurrent virtual users, then
+writes throughput and p50/p95/p99 per endpoint to a JSON file so runs on
+different commits can be compared.
+
+Mixes (--mix):
+    browse    product listing/detail/reviews, some search and cart
+    search    mostly product search
+    cart      add / view / remove cart items
+    checkout  burst of add-to-cart + place order
+    admin     admin dashboards (users, orders, support inbox)
+
+Customers log in as users created by generate_data.py
+(user<N>@example.test / password123). The admin mix needs
+BENCH_ADMIN_EMAIL / BENCH_ADMIN_PASSWORD (or --admin-email/--admin-password).
+
+Usage:
+    # seed a local database, boot gunicorn and run the browse mix for 60s
+    python bench_load.py --boot --seed-scale 0.05 --mix browse --duration 60
+    # against an already running server, then compare with a previous run
+    python bench_load.py --base-url http://localhost:5000 --mix checkout \\
+        --compare bench_results/checkout-<before>.json
+"""
+import os
+import sys
+import json
+import math
+import time
+import random
+import argparse
+import threading
+import subprocess
+from datetime import datetime
+from collections import defaultdict
+import requests
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+SEARCH_TERMS = ['wireless', 'premium', 'smart', 'cable', 'lamp', 'case', 'pro', 'eco']
+REVIEW_SORTS = ['newest', 'helpful', 'highest', 'lowest']
+
+class VirtualUser:
+    """One simulated client: its own HTTP session, RNG and latency samples"""
+    def __init__(self, base_url, rng, samples, errors, product_ids):
+        self.base_url = base_url.rstrip('/')
+        self.session = requests.Session()
+        self.rng = rng
+        self.samples = samples
+        self.errors = errors
+        self.product_ids = product_ids
+        self.recording = False
+        self.address_id = None
+
+    def call(self, method, path, name, expect=(200, 201), **kwargs):
+        started = time.perf_counter()
+        try:
+            response = self.session.request(method, self.base_url + path, timeout=30, **kwargs)
+            ok = response.status_code in expect
+        except requests.RequestException:
+            response, ok = None, False
+        if self.recording:
+            self.samples[name].append((time.perf_counter() - started) * 1000)
+            if not ok:
+                self.errors[name] += 1
+        return response if ok else None
+
+    def login(self, email, password):
+        response = self.call('POST', '/api/auth/login', 'POST /api/auth/login',
+                             json={'email': email, 'password': password})
+        if response is None:
+            return False
+        token = response.json()['data']['access_token']
+        self.session.headers['Authorization'] = f'Bearer {token}'
+        return True
+
+    def product_id(self):
+        # Popular products get most traffic, like the generated order data
+        index = min(int(self.rng.paretovariate(1.2)) - 1, len(self.product_ids) - 1)
+        return self.product_ids[index]
+
+# ---------------------------------------------------------------------------
+# Journeys
+
+def browse(user):
+    user.call('GET', f'/api/products?page={user.rng.randint(1, 5)}&per_page=20', 'GET /api/products')
+    product_id = user.product_id()
+    user.call('GET', f'/api/products/{product_id}', 'GET /api/products/<id>')
+    user.call('GET', f'/api/reviews/product/{product_id}?sort={user.rng.choice(REVIEW_SORTS)}',
+              'GET /api/reviews/product/<id>')
+    if user.rng.random() < 0.3:
+        user.call('GET', '/api/categories', 'GET /api/categories')
+
+def search(user):
+    term = user.rng.choice(SEARCH_TERMS)
+    user.call('GET', f'/api/products?search={term}&per_page=20', 'GET /api/products?search')
+    if user.rng.random() < 0.5:
+        user.call('GET', f'/api/products/{user.product_id()}', 'GET /api/products/<id>')
+
+def cart_churn(user):
+    user.call('POST', '/api/cart', 'POST /api/cart', json={'product_id': user.product_id()})
+    response = user.call('GET', '/api/cart', 'GET /api/cart')
+    items = response.json()['data'].get('items', []) if response is not None else []
+    if items:
+        cart_id = user.rng.choice(items)['cart_id']
+        user.call('DELETE', f'/api/cart/{cart_id}', 'DELETE /api/cart/<id>')
+
+def checkout(user):
+    if user.address_id is None:
+        response = user.call('GET', '/api/users/addresses', 'GET /api/users/addresses')
+        addresses = response.json()['data'] if response is not None else []
+        if not addresses:
+            return
+        user.address_id = addresses[0]['address_id']
+    for _ in range(user.rng.randint(1, 3)):
+        user.call('POST', '/api/cart', 'POST /api/cart',
+                  json={'product_id': user.product_id(), 'quantity': 1})
+    user.call('POST', '/api/orders', 'POST /api/orders',
+              json={'shipping_address_id': user.address_id})
+
+def admin_dashboard(user):
+    user.call('GET', '/api/users?limit=50', 'GET /api/users')
+    response = user.call('GET', '/api/orders/admin/all?per_page=20', 'GET /api/orders/admin/all')
+    orders = response.json()['data'] if response is not None else []
+    if orders:
+        order_id = user.rng.choice(orders)['order_id']
+        user.call('GET', f'/api/orders/admin/{order_id}', 'GET /api/orders/admin/<id>')
+    user.call('GET', '/api/support/admin/conversations', 'GET /api/support/admin/conversations')
+
+# mix -> ([(journey, weight)], login as: None | 'customer' | 'admin')
+MIXES = {
+    'browse': ([(browse, 80), (search, 15), (cart_churn, 5)], 'customer'),
+    'search': ([(search, 80), (browse, 20)], None),
+    'cart': ([(cart_churn, 70), (browse, 30)], 'customer'),
+    'checkout': ([(checkout, 60), (cart_churn, 20), (browse, 20)], 'customer'),
+    'admin': ([(admin_dashboard, 100)], 'admin'),
+}
+
+# ---------------------------------------------------------------------------
+
+def percentile(sorted_values, pct):
+    """Nearest-rank percentile of an ascending list"""
+    if not sorted_values:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(sorted_values)))
+    return sorted_values[rank - 1]
+
+def summarize(samples, errors, elapsed):
+    endpoints = {}
+    total = total_errors = 0
+    for name in sorted(samples):
+        values = sorted(samples[name])
+        total += len(values)
+        total_errors += errors.get(name, 0)
+        endpoints[name] = {
+            'count': len(values),
+            'errors': errors.get(name, 0),
+            'rps': round(len(values) / elapsed, 2),
+            'mean_ms': round(sum(values) / len(values), 2),
+            'p50_ms': round(percentile(values, 50), 2),
+            'p95_ms': round(percentile(values, 95), 2),
+            'p99_ms': round(percentile(values, 99), 2),
+            'max_ms': round(values[-1], 2),
+        }
+    return {'requests': total, 'errors': total_errors,
+            'rps': round(total / elapsed, 2)}, endpoints
+
+def fetch_product_ids(base_url, count=200):
+    ids = []
+    for page in range(1, count // 100 + 1):
+        response = requests.get(f"{base_url}/api/products?page={page}&per_page=100", timeout=30)
+        response.raise_for_status()
+        ids.extend(p['product_id'] for p in response.json()['data'])
+    if not ids:
+        sys.exit('No products found: seed the database first (generate_data.py)')
+    return ids
+
+def run_user(index, args, journeys, login_as, product_ids, deadlines, results):
+    rng = random.Random(f"{args.seed}:{index}")
+    samples, errors = defaultdict(list), defaultdict(int)
+    user = VirtualUser(args.base_url, rng, samples, errors, product_ids)
+
+    if login_as == 'admin':
+        if not user.login(args.admin_email, args.admin_password):
+            print(f"✗ virtual user {index}: admin login failed")
+            return
+    elif login_as == 'customer':
+        # Skip the occasional inactive generated account
+        for _ in range(5):
+            if user.login(f"user{rng.randint(1, args.user_pool)}@example.test", 'password123'):
+                break
+        else:
+            print(f"✗ virtual user {index}: customer login failed")
+            return
+
+    choices = [journey for journey, _ in journeys]
+    weights = [weight for _, weight in journeys]
+    warmup_until, stop_at = deadlines
+    while time.monotonic() < stop_at:
+        user.recording = time.monotonic() >= warmup_until
+        rng.choices(choices, weights=weights)[0](user)
+        if args.think_time:
+            time.sleep(rng.expovariate(1 / args.think_time))
+
+    results.append((samples, errors))
+
+def run_load(args):
+    journeys, login_as = MIXES[args.mix]
+    if login_as == 'admin' and not (args.admin_email and args.admin_password):
+        sys.exit('The admin mix needs --admin-email/--admin-password or BENCH_ADMIN_* env vars')
+
+    product_ids = fetch_product_ids(args.base_url)
+    started = time.monotonic()
+    deadlines = (started + args.warmup, started + args.warmup + args.duration)
+    results = []
+    threads = [threading.Thread(target=run_user,
+                                args=(i, args, journeys, login_as, product_ids, deadlines, results))
+               for i in range(args.concurrency)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    samples, errors = defaultdict(list), defaultdict(int)
+    for user_samples, user_errors in results:
+        for name, values in user_samples.items():
+            samples[name].extend(values)
+        for name, count in user_errors.items():
+            errors[name] += count
+    return summarize(samples, errors, args.duration)
+
+# ---------------------------------------------------------------------------
+
+def git_commit():
+    try:
+        return subprocess.check_output(['git', 'rev-parse', '--short', 'HEAD'],
+                                       cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def seed_database(scale, seed):
+    subprocess.run([sys.executable, 'migrate.py'], cwd=ROOT, check=True)
+    subprocess.run([sys.executable, 'generate_data.py', '--scale', str(scale),
+                    '--seed', str(seed)], cwd=ROOT, check=True)
+
+def boot_gunicorn(port, workers):
+    server = subprocess.Popen(['gunicorn', '-w', str(workers), '-b', f'127.0.0.1:{port}',
+                               '--log-level', 'warning', 'app:app'], cwd=ROOT)
+    for _ in range(60):
+        try:
+            if requests.get(f'http://127.0.0.1:{port}/api/health', timeout=1).ok:
+                return server
+        except requests.RequestException:
+            pass
+        if server.poll() is not None:
+            sys.exit('gunicorn exited during startup')
+        time.sleep(0.5)
+    server.terminate()
+    sys.exit('gunicorn did not become healthy within 30s')
+
+def compare(current, baseline_path, max_regression):
+    """Print p95 changes per endpoint; returns True if any regressed too far"""
+    with open(baseline_path) as f:
+        baseline = json.load(f)['endpoints']
+    regressed = False
+    print(f"\np95 vs {baseline_path}:")
+    for name, stats in current.items():
+        if name not in baseline:
+            continue
+        before, after = baseline[name]['p95_ms'], stats['p95_ms']
+        change = (after - before) / before * 100 if before else 0
+        flag = ''
+        if change > max_regression:
+            regressed = True
+            flag = '  ← regression'
+        print(f"  {name:<42} {before:>9.1f} → {after:>9.1f} ms  ({change:+.0f}%){flag}")
+    return regressed
+
+def main():
+    parser = argparse.ArgumentParser(description='HTTP load test with latency percentiles')
+    parser.add_argument('--mix', choices=sorted(MIXES), default='browse')
+    parser.add_argument('--base-url', default='http://127.0.0.1:5000')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--duration', type=float, default=60, help='measured seconds')
+    parser.add_argument('--warmup', type=float, default=10, help='unmeasured seconds first')
+    parser.add_argument('--think-time', type=float, default=0,
+                        help='mean pause between journeys in seconds (0 = closed loop)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--user-pool', type=int, default=1000,
+                        help='log customers in as user1..userN@example.test')
+    parser.add_argument('--admin-email', default=os.getenv('BENCH_ADMIN_EMAIL'))
+    parser.add_argument('--admin-password', default=os.getenv('BENCH_ADMIN_PASSWORD'))
+    parser.add_argument('--boot', action='store_true', help='start gunicorn app:app locally')
+    parser.add_argument('--port', type=int, default=5055)
+    parser.add_argument('--workers', type=int, default=4, help='gunicorn workers with --boot')
+    parser.add_argument('--seed-scale', type=float,
+                        help='migrate and run generate_data.py at this scale first')
+    parser.add_argument('--output', help='result file (default bench_results/<mix>-<time>.json)')
+    parser.add_argument('--compare', help='previous result file to compare p95 against')
+    parser.add_argument('--max-regression', type=float, default=20,
+                        help='exit 1 if any endpoint p95 is this many percent slower')
+    args = parser.parse_args()
+
+    if args.seed_scale:
+        seed_database(args.seed_scale, args.seed)
+
+    server = None
+    if args.boot:
+        server = boot_gunicorn(args.port, args.workers)
+        args.base_url = f'http://127.0.0.1:{args.port}'
+
+    try:
+        totals, endpoints = run_load(args)
+    finally:
+        if server:
+            server.terminate()
+            server.wait()
+
+    result = {
+        'meta': {
+            'mix': args.mix,
+            'commit': git_commit(),
+            'started_at': datetime.now().isoformat(timespec='seconds'),
+            'base_url': args.base_url,
+            'concurrency': args.concurrency,
+            'duration_s': args.duration,
+            'warmup_s': args.warmup,
+            'think_time_s': args.think_time,
+            'gunicorn_workers': args.workers if args.boot else None,
+            'seed': args.seed,
+        },
+        'totals': totals,
+        'endpoints': endpoints,
+    }
+
+    output = args.output or os.path.join(
+        ROOT, 'bench_results', f"{args.mix}-{datetime.now():%Y%m%d-%H%M%S}.json")
+    os.makedirs(os.path.dirname(output), exist_ok=True)
+    with open(output, 'w') as f:
+        json.dump(result, f, indent=2)
+
+    print(f"\n{args.mix}: {totals['requests']} requests, {totals['errors']} errors, "
+          f"{totals['rps']} req/s")
+    print(f"  {'endpoint':<42} {'count':>7} {'p50':>8} {'p95':>8} {'p99':>8}  errors")
+    for name, stats in endpoints.items():
+        print(f"  {name:<42} {stats['count']:>7} {stats['p50_ms']:>8.1f} "
+              f"{stats['p95_ms']:>8.1f} {stats['p99_ms']:>8.1f}  {stats['errors']}")
+    print(f"\n✅ Results written to {output}")
+
+    if args.compare and compare(endpoints, args.compare, args.max_regression):
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,111 @@
+"""
+Benchmark uploaded-media serving: Flask's default static handler vs
+routes/media_routes.py
+
+In-process (default): drives the app through the WSGI test client, hitting
+the same file once through the default /static rule and once through the
+media route, so the numbers compare handler overhead (full GET, conditional
+GET -> 304, Range GET -> 206) without network noise. The bigger win is not
+visible here: immutable URLs are not re-requested by browsers and CDNs at all.
+
+Over HTTP: pass --current-url and --media-url pointing at two running
+servers (e.g. gunicorn on the baseline commit and on this one) to include
+sendfile and socket costs.
+
+Usage:
+    python bench_media.py [--requests 2000] [--size-kb 200]
+    python bench_media.py --current-url http://localhost:5001 --media-url http://localhost:5000 \
+        --path /static/uploads/ab/cd/<hash>.jpg [--concurrency 8]
+"""
+import os
+import sys
+import time
+import hashlib
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+def make_sample(size_kb):
+    """
+    Write a content-addressed sample file under static/uploads plus a copy
+    under static/_bench, which only Flask's default static rule serves
+    Returns: (media_url, current_url, paths)
+    """
+    data = os.urandom(size_kb * 1024)
+    content_hash = hashlib.sha256(data).hexdigest()
+    relative = f"{content_hash[:2]}/{content_hash[2:4]}/{content_hash}.jpg"
+    paths = []
+    for folder in ('uploads', '_bench'):
+        path = os.path.join(ROOT, 'static', folder, relative)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(data)
+        paths.append(path)
+    return f"/static/uploads/{relative}", f"/static/_bench/{relative}", paths
+
+def run(label, fn, count):
+    start = time.perf_counter()
+    status = None
+    for _ in range(count):
+        status = fn()
+    elapsed = time.perf_counter() - start
+    print(f"  {label:<34} {count / elapsed:>9.0f} req/s   (last status {status})")
+
+def bench_in_process(count, size_kb):
+    from app import create_app
+
+    media_url, current_url, paths = make_sample(size_kb)
+    client = create_app().test_client()
+
+    try:
+        for name, url in (('current (Flask static)', current_url), ('media_routes', media_url)):
+            first = client.get(url)
+            etag = first.headers.get('ETag')
+            print(f"\n{name}: Cache-Control = {first.headers.get('Cache-Control')!r}")
+            run('full GET (200)', lambda: client.get(url).status_code, count)
+            run('conditional GET (304)',
+                lambda: client.get(url, headers={'If-None-Match': etag}).status_code, count)
+            run('range GET 64KB (206)',
+                lambda: client.get(url, headers={'Range': 'bytes=0-65535'}).status_code, count)
+    finally:
+        for path in paths:
+            os.remove(path)
+
+def bench_http(base_url, path, count, concurrency):
+    import requests
+
+    session = requests.Session()
+    first = session.get(base_url + path)
+    etag = first.headers.get('ETag')
+    print(f"\n{base_url}: Cache-Control = {first.headers.get('Cache-Control')!r}")
+
+    def fetch(headers):
+        return session.get(base_url + path, headers=headers).status_code
+
+    for label, headers in (('full GET', {}),
+                           ('conditional GET', {'If-None-Match': etag} if etag else {}),
+                           ('range GET 64KB', {'Range': 'bytes=0-65535'})):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            statuses = list(pool.map(lambda _: fetch(headers), range(count)))
+        elapsed = time.perf_counter() - start
+        print(f"  {label:<34} {count / elapsed:>9.0f} req/s   (last status {statuses[-1]})")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--requests', type=int, default=2000)
+    parser.add_argument('--size-kb', type=int, default=200)
+    parser.add_argument('--current-url')
+    parser.add_argument('--media-url')
+    parser.add_argument('--path')
+    parser.add_argument('--concurrency', type=int, default=8)
+    args = parser.parse_args()
+
+    if args.current_url or args.media_url:
+        if not (args.current_url and args.media_url and args.path):
+            sys.exit('--current-url, --media-url and --path are required for HTTP mode')
+        bench_http(args.current_url, args.path, args.requests, args.concurrency)
+        bench_http(args.media_url, args.path, args.requests, args.concurrency)
+    else:
+        bench_in_process(args.requests, args.size_kb)
@@ -0,0 +1,139 @@
+"""
+Benchmark row-to-dict conversion: hand-indexed comprehension code vs the
+compiled RowMapper (utils/row_mapper.py)
+
+Uses synthetic rows shaped like the product list and admin order queries
+(Decimal prices, datetimes, nested customer/address groups), so no database
+is needed. The "hand" variants are the loops the routes used before, with
+their float()/.isoformat() conversions; the RowMapper leaves Decimal and
+datetime values to the JSON provider instead. So that both sides do the same
+work, each variant is timed through serialization with app.json.dumps_bytes,
+i.e. up to the response body, and reported per row.
+
+Usage:
+    python bench_row_mapping.py [--rows 100] [--repeat 2000]
+"""
+import time
+import random
+import argparse
+from decimal import Decimal
+from datetime import datetime, timedelta
+
+from flask import Flask
+from utils.json_provider import init_json_provider
+from utils.rating_stats import average_rating
+from routes.product_routes import PRODUCT_LIST_FIELDS
+from routes.order_routes import ADMIN_ORDER_LIST_ROW
+
+# The full product list fieldset, i.e. what GET /api/products uses without ?fields=
+PRODUCT_LIST_ROW = PRODUCT_LIST_FIELDS.compile(PRODUCT_LIST_FIELDS.parse(None))[2]
+
+def product_rows(count):
+    rng = random.Random(1)
+    return [(i, f'SKU-{i}', f'Product {i}', f'product-{i}', 'Short description',
+             Decimal(rng.randint(100, 99999)) / 100, None if i % 3 else Decimal('129.00'),
+             rng.randint(0, 500), i % 10 == 0, 'Brand', 'Category',
+             f'/static/uploads/{i}.jpg', {'thumb': f'/static/uploads/{i}_thumb.webp'},
+             rng.randint(0, 500), rng.randint(0, 100))
+            for i in range(count)]
+
+def fieldset_rows(rows):
+    # The fieldset query selects review_count twice (for review_count and avg_rating)
+    return [row[:13] + (row[13], row[14], row[14]) for row in rows]
+
+def order_rows(count):
+    rng = random.Random(2)
+    start = datetime(2024, 1, 1)
+    return [(i, f'ORD-{i:012X}', Decimal(rng.randint(100, 999999)) / 100, 'pending', 'paid',
+             None, start + timedelta(minutes=i), 'First', 'Last', f'user{i}@example.com',
+             None if i % 5 == 0 else 'Full Name', 'City', 'State', 'Country', '555-0100')
+            for i in range(count)]
+
+def hand_products(rows):
+    products = []
+    for row in rows:
+        products.append({
+            'product_id': row[0],
+            'sku': row[1],
+            'name': row[2],
+            'slug': row[3],
+            'short_description': row[4],
+            'price': float(row[5]),
+            'compare_at_price': float(row[6]) if row[6] else None,
+            'stock_quantity': row[7],
+            'is_featured': row[8],
+            'brand': row[9],
+            'category_name': row[10],
+            'primary_image': row[11],
+            'primary_image_variants': row[12],
+            'avg_rating': average_rating(row[13], row[14]),
+            'review_count': row[14] or 0
+        })
+    return products
+
+def hand_orders(rows):
+    orders = []
+    for row in rows:
+        orders.append({
+            'order_id': row[0],
+            'order_number': row[1],
+            'total_amount': float(row[2]),
+            'status': row[3],
+            'payment_status': row[4],
+            'tracking_number': row[5],
+            'created_at': row[6].isoformat(),
+            'customer': {
+                'first_name': row[7],
+                'last_name': row[8],
+                'email': row[9]
+            },
+            'shipping_address': {
+                'full_name': row[10],
+                'city': row[11],
+                'state': row[12],
+                'country': row[13],
+                'phone': row[14]
+            } if row[10] else None
+        })
+    return orders
+
+def measure(fn, rows, repeat):
+    best = float('inf')
+    for _ in range(5):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fn(rows)
+        best = min(best, time.perf_counter() - start)
+    return best / (repeat * len(rows)) * 1e9
+
+def json_encoder():
+    app = Flask(__name__)
+    init_json_provider(app)
+    return app.json.dumps_bytes
+
+def main(row_count, repeat):
+    dumps = json_encoder()
+    products = product_rows(row_count)
+    fieldset_products = fieldset_rows(products)
+    cases = (
+        ('product list', products,
+         lambda rows: dumps(hand_products(rows)),
+         lambda rows: dumps(list(PRODUCT_LIST_ROW.map(fieldset_products)))),
+        ('admin order list', order_rows(row_count),
+         lambda rows: dumps(hand_orders(rows)),
+         lambda rows: dumps(list(ADMIN_ORDER_LIST_ROW.map(rows)))),
+    )
+    print(f"{row_count} rows per call, mapped and serialized, best of 5 x {repeat} calls\n")
+    for label, rows, hand, mapped in cases:
+        hand_ns = measure(hand, rows, repeat)
+        mapped_ns = measure(mapped, rows, repeat)
+        print(f"{label}")
+        print(f"  hand-indexed loop + dumps   {hand_ns:8.0f} ns/row")
+        print(f"  RowMapper + dumps           {mapped_ns:8.0f} ns/row   ({hand_ns / mapped_ns:.2f}x)")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.split('\n')[1])
+    parser.add_argument('--rows', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=2000)
+    args = parser.parse_args()
+    main(args.rows, args.repeat)
@@ -2,6 +2,7 @@
 import requests
 import psycopg2
 from config import Config
+from utils import support_rollup
 
 TELEGRAM_BOT_TOKEN = Config.TELEGRAM_BOT_TOKEN
 
@@ -50,9 +51,10 @@ def check_telegram_updates():
             try:
                 # Find the original message
                 cursor.execute("""
-                    SELECT user_id, message_id
+                    SELECT user_id, message_id, status
                     FROM support_messages
                     WHERE telegram_message_id = %s AND sender = 'customer'
+                    FOR UPDATE
                 """, (reply_to_message_id,))
                 
                 result = cursor.fetchone()
@@ -60,7 +62,7 @@ def check_telegram_updates():
                     print(f"   ⚠️  Original message not found")
                     continue
                 
-                user_id, original_message_id = result
+                user_id, original_message_id, original_status = result
                 
                 # Check if reply already exists
                 cursor.execute("""
@@ -77,10 +79,10 @@ def check_telegram_updates():
                     INSERT INTO support_messages 
                     (user_id, message_text, sender, status)
                     VALUES (%s, %s, 'admin', 'replied')
-                    RETURNING message_id
+                    RETURNING message_id, created_at
                 """, (user_id, reply_text))
                 
-                admin_message_id = cursor.fetchone()[0]
+                admin_message_id, reply_created_at = cursor.fetchone()
                 
                 # Update original message status
                 cursor.execute("""
@@ -89,6 +91,11 @@ def check_telegram_updates():
                     WHERE message_id = %s
                 """, (original_message_id,))
                 
+                support_rollup.record_admin_reply(
+                    cursor, user_id, admin_message_id, reply_text, reply_created_at,
+                    answered_pending=original_status == 'pending'
+                )
+                
                 conn.commit()
                 print(f"   ✅ Reply saved (message_id: {admin_message_id})")
                 
@@ -38,3 +38,68 @@ class Config:
     # Telegram Bot Configuration
     TELEGRAM_BOT_TOKEN = os.getenv('TELEGRAM_BOT_TOKEN')
     TELEGRAM_ADMIN_CHAT_ID = os.getenv('TELEGRAM_ADMIN_CHAT_ID')
+    
+    # Image processing (resized/WebP variants built in a process pool)
+    IMAGE_PROCESS_WORKERS = int(os.getenv('IMAGE_PROCESS_WORKERS', 2))
+    IMAGE_PROCESS_TIMEOUT = int(os.getenv('IMAGE_PROCESS_TIMEOUT', 30))
+    
+    # Resumable chunked uploads (kept outside static/ so partial files are never served)
+    UPLOAD_SESSION_FOLDER = os.getenv('UPLOAD_SESSION_FOLDER', 'upload_sessions')
+    UPLOAD_SESSION_MAX_SIZE = int(os.getenv('UPLOAD_SESSION_MAX_SIZE', 20 * 1024 * 1024))
+    UPLOAD_WRITE_WORKERS = int(os.getenv('UPLOAD_WRITE_WORKERS', 4))
+    
+    # Media serving (routes/media_routes.py)
+    # MEDIA_X_ACCEL_PREFIX: internal nginx location to hand files off to, e.g. /_media
+    MEDIA_X_ACCEL_PREFIX = os.getenv('MEDIA_X_ACCEL_PREFIX')
+    MEDIA_PRECOMPRESSED = os.getenv('MEDIA_PRECOMPRESSED', 'False') == 'True'
+    
+    # Seconds between batched writes of buffered counters (review helpful votes)
+    COUNTER_FLUSH_INTERVAL = int(os.getenv('COUNTER_FLUSH_INTERVAL', 5))
+    
+    # Schema migrations (migrate.py): how long DDL may wait for a table lock
+    # before giving up and retrying, so it never queues behind long transactions
+    MIGRATION_LOCK_TIMEOUT = os.getenv('MIGRATION_LOCK_TIMEOUT', '5s')
+    MIGRATION_LOCK_RETRIES = int(os.getenv('MIGRATION_LOCK_RETRIES', 10))
+    
+    # Per-request SQL accounting (utils/query_stats.py)
+    # QUERY_BUDGET_MODE: off | warn (log) | raise (fail the request, for tests)
+    QUERY_BUDGET_MODE = os.getenv('QUERY_BUDGET_MODE', 'warn')
+    QUERY_STATS_HEADERS = os.getenv('QUERY_STATS_HEADERS', 'False') == 'True'
+    
+    # Prometheus metrics (utils/metrics.py)
+    # METRICS_DIR: shared directory for per-worker snapshots, so /metrics
+    # covers every gunicorn worker; empty it before starting the server
+    METRICS_DIR = os.getenv('METRICS_DIR')
+    METRICS_FLUSH_INTERVAL = int(os.getenv('METRICS_FLUSH_INTERVAL', 5))
+    # Optional bearer token required to scrape /metrics
+    METRICS_TOKEN = os.getenv('METRICS_TOKEN')
+    
+    # Slow-query log (utils/slow_queries.py); SLOW_QUERY_MS=0 disables it
+    SLOW_QUERY_MS = float(os.getenv('SLOW_QUERY_MS', 200))
+    SLOW_QUERY_BUFFER_SIZE = int(os.getenv('SLOW_QUERY_BUFFER_SIZE', 200))
+    SLOW_QUERY_LOG_DIR = os.getenv('SLOW_QUERY_LOG_DIR', 'logs')
+    SLOW_QUERY_EXPLAIN = os.getenv('SLOW_QUERY_EXPLAIN', 'True') == 'True'
+    # Seconds before the same statement shape is explained again
+    SLOW_QUERY_EXPLAIN_INTERVAL = int(os.getenv('SLOW_QUERY_EXPLAIN_INTERVAL', 300))
+    
+    # Request profiling (utils/request_profiler.py): admins send X-Profile: 1,
+    # and PROFILE_SAMPLE_RATE (0.0-1.0) profiles a random share of requests
+    PROFILING_ENABLED = os.getenv('PROFILING_ENABLED', 'False') == 'True'
+    PROFILE_SAMPLE_RATE = float(os.getenv('PROFILE_SAMPLE_RATE', 0))
+    PROFILE_DIR = os.getenv('PROFILE_DIR', 'profiles')
+    PROFILE_MAX_FILES = int(os.getenv('PROFILE_MAX_FILES', 200))
+    
+    # JSON responses (utils/json_provider.py): Decimal as 'number' or 'string'
+    JSON_DECIMAL_AS = os.getenv('JSON_DECIMAL_AS', 'number')
+    
+    # Response compression (utils/compression.py); brotli is used when the
+    # optional brotli package is installed
+    COMPRESSION_ENABLED = os.getenv('COMPRESSION_ENABLED', 'True') == 'True'
+    COMPRESSION_MIN_SIZE = int(os.getenv('COMPRESSION_MIN_SIZE', 1024))
+    COMPRESSION_GZIP_LEVEL = int(os.getenv('COMPRESSION_GZIP_LEVEL', 5))
+    COMPRESSION_BROTLI_QUALITY = int(os.getenv('COMPRESSION_BROTLI_QUALITY', 4))
+    # Bytes of compressed bodies cached per worker (0 disables)
+    COMPRESSION_CACHE_BYTES = int(os.getenv('COMPRESSION_CACHE_BYTES', 8 * 1024 * 1024))
+    
+    # Most sub-requests accepted by one POST /api/batch
+    BATCH_MAX_REQUESTS = int(os.getenv('BATCH_MAX_REQUESTS', 20))
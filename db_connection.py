@@ -1,10 +1,17 @@
-import psycopg2
-from psycopg2 import pool
+from psycopg2.pool import ThreadedConnectionPool
+from psycopg2.extensions import TRANSACTION_STATUS_IDLE
 import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
 from dotenv import load_dotenv
+from utils.query_stats import InstrumentedCursor, record_pool_wait
 
 load_dotenv()
 
+# [connection, borrow depth] while shared_connection() is active in this context
+_shared = ContextVar('shared_connection', default=None)
+
 class Database:
     def __init__(self):
         self.connection_pool = None
@@ -12,13 +19,16 @@ class Database:
     def create_pool(self):
         """Create a connection pool"""
         try:
-            self.connection_pool = psycopg2.pool.SimpleConnectionPool(
+            # Threaded pool: background flushers share it with request handlers
+            self.connection_pool = ThreadedConnectionPool(
                 1, 20,
                 host=os.getenv('DB_HOST'),
                 port=os.getenv('DB_PORT'),
                 database=os.getenv('DB_NAME'),
                 user=os.getenv('DB_USER'),
-                password=os.getenv('DB_PASSWORD')
+                password=os.getenv('DB_PASSWORD'),
+                # Counts/times statements per request (utils/query_stats.py)
+                cursor_factory=InstrumentedCursor
             )
             print("Connection pool created successfully")
         except Exception as e:
@@ -26,12 +36,41 @@ class Database:
             
     def get_connection(self):
         """Get a connection from the pool"""
-        return self.connection_pool.getconn()
+        shared = _shared.get()
+        if shared is not None:
+            shared[1] += 1
+            return shared[0]
+        start = time.perf_counter()
+        connection = self.connection_pool.getconn()
+        record_pool_wait((time.perf_counter() - start) * 1000)
+        return connection
     
     def return_connection(self, connection):
         """Return a connection to the pool"""
+        shared = _shared.get()
+        if shared is not None and connection is shared[0]:
+            shared[1] -= 1
+            # End whatever the handler left open, as putconn() would
+            if shared[1] == 0 and connection.info.transaction_status != TRANSACTION_STATUS_IDLE:
+                connection.rollback()
+            return
         self.connection_pool.putconn(connection)
     
+    @contextmanager
+    def shared_connection(self):
+        """Serve every get_connection() in this context from one pooled
+        connection (used by /api/batch to run its sub-requests on one checkout)"""
+        if _shared.get() is not None:
+            yield
+            return
+        connection = self.get_connection()
+        token = _shared.set([connection, 0])
+        try:
+            yield
+        finally:
+            _shared.reset(token)
+            self.connection_pool.putconn(connection)
+    
     def close_all_connections(self):
         """Close all connections in the pool"""
         if self.connection_pool:
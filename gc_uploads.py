@@ -0,0 +1,102 @@
+"""
+Garbage-collect orphaned content-addressed uploads
+
+Reference counts are bumped on every upload. This script reconciles them
+with the rows that actually point at each file (product_images and
+categories), then deletes files that have had no references for longer
+than the grace period, together with their resized variants. Abandoned
+resumable upload sessions older than a day are removed as well.
+
+Usage: python gc_uploads.py [grace_days] [--dry-run]
+"""
+import os
+import sys
+from config import Config
+from db_connection import db
+from utils.upload_sessions import expire_sessions
+
+UPLOAD_FOLDER = 'static/uploads'
+URL_PREFIX = '/static/uploads/'
+
+def url_to_path(url):
+    return os.path.join(UPLOAD_FOLDER, url[len(URL_PREFIX):].replace('/', os.sep))
+
+def gc_uploads(grace_days=7, dry_run=False):
+    if not dry_run:
+        expired = expire_sessions(Config.UPLOAD_SESSION_FOLDER, 24 * 60 * 60)
+        print(f"✓ Removed {expired} abandoned upload sessions")
+    
+    db.create_pool()
+    
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        # Recount live references in one set-based pass
+        cursor.execute("""
+            WITH refs AS (
+                SELECT image_url AS url, COUNT(*) AS n FROM product_images GROUP BY image_url
+                UNION ALL
+                SELECT image_url, COUNT(*) FROM categories
+                WHERE image_url IS NOT NULL GROUP BY image_url
+            ), totals AS (
+                SELECT url, SUM(n) AS n FROM refs GROUP BY url
+            )
+            UPDATE media_files mf
+            SET ref_count = COALESCE(t.n, 0),
+                last_referenced_at = CASE WHEN COALESCE(t.n, 0) > 0
+                                          THEN CURRENT_TIMESTAMP
+                                          ELSE mf.last_referenced_at END
+            FROM media_files m
+            LEFT JOIN totals t ON t.url = m.url
+            WHERE mf.content_hash = m.content_hash
+              AND mf.ref_count IS DISTINCT FROM COALESCE(t.n, 0)
+        """)
+        print(f"✓ Reconciled {cursor.rowcount} reference counts")
+        
+        cursor.execute("""
+            SELECT mf.content_hash, mf.url, iv.variants
+            FROM media_files mf
+            LEFT JOIN image_variants iv ON iv.source_url = mf.url
+            WHERE mf.ref_count = 0
+              AND mf.last_referenced_at < CURRENT_TIMESTAMP - make_interval(days => %s)
+            FOR UPDATE OF mf SKIP LOCKED
+        """, (grace_days,))
+        orphans = cursor.fetchall()
+        
+        freed = 0
+        for content_hash, url, variants in orphans:
+            paths = [url_to_path(url)]
+            for entry in (variants or {}).values():
+                paths.extend(url_to_path(v) for k, v in entry.items()
+                             if k not in ('width', 'height'))
+            
+            for path in set(paths):
+                if os.path.exists(path):
+                    freed += os.path.getsize(path)
+                    if not dry_run:
+                        os.remove(path)
+            
+            if not dry_run:
+                cursor.execute("DELETE FROM image_variants WHERE source_url = %s", (url,))
+                cursor.execute("DELETE FROM media_files WHERE content_hash = %s", (content_hash,))
+        
+        if dry_run:
+            conn.rollback()
+        else:
+            conn.commit()
+        
+        action = "Would remove" if dry_run else "Removed"
+        print(f"✓ {action} {len(orphans)} orphaned files ({freed / 1024 / 1024:.1f} MB)")
+        
+    except Exception as e:
+        conn.rollback()
+        print(f"✗ Error collecting uploads: {e}")
+    finally:
+        cursor.close()
+        db.return_connection(conn)
+        db.close_all_connections()
+
+if __name__ == '__main__':
+    args = [a for a in sys.argv[1:] if not a.startswith('--')]
+    gc_uploads(int(args[0]) if args else 7, dry_run='--dry-run' in sys.argv)
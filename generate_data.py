@@ -0,0 +1,391 @@
+"""
+Generate a production-scale synthetic dataset for benchmarking
+
+Streams users, addresses, products, variants, images, orders, order items,
+reviews and cart rows into PostgreSQL with COPY FROM STDIN. Each table is
+split into chunks that are generated and copied in parallel worker
+processes, each on its own connection.
+
+Data is skewed like real traffic: product popularity (order items, reviews,
+carts) is Zipfian, and so is user activity, so a few customers place many
+orders and most place one or none. Popular products are spread over the ID
+range instead of being the lowest IDs.
+
+Output is deterministic for a given --seed and sizes: every chunk has its
+own RNG derived from (seed, table, chunk), so the worker count does not
+change the data. Only password hashes differ (bcrypt salts); every
+generated user's password is 'password123'.
+
+Rows are appended after the existing maximum IDs. Apply migrations first
+(python migrate.py). Afterwards sequences are advanced, tables ANALYZEd and
+the rating/order rollups rebuilt.
+
+Usage:
+    python generate_data.py [--scale 1.0] [--seed 42] [--workers 8]
+    python generate_data.py --users 100000 --products 20000 --orders 200000
+"""
+import io
+import time
+import random
+import argparse
+import itertools
+from array import array
+from bisect import bisect_left
+from datetime import datetime, timedelta
+from concurrent.futures import ProcessPoolExecutor, as_completed
+import psycopg2
+from config import Config
+
+CHUNK_ROWS = 100_000
+
+# Defaults at --scale 1.0
+DEFAULT_SIZES = {
+    'users': 1_000_000,
+    'products': 200_000,
+    'orders': 2_000_000,
+    'reviews': 1_000_000,
+}
+
+PRODUCT_ZIPF_S = 1.1
+USER_ZIPF_S = 0.9
+CART_USER_FRACTION = 0.05
+VARIANT_PRODUCT_FRACTION = 0.3
+ORDER_STATUSES = [('delivered', 70), ('shipped', 10), ('processing', 8),
+                  ('pending', 7), ('cancelled', 5)]
+RATINGS = [(5, 45), (4, 25), (3, 12), (2, 8), (1, 10)]
+FIRST_NAMES = ['James', 'Mary', 'Wei', 'Priya', 'Ahmed', 'Sofia', 'Kenji', 'Olga',
+               'Carlos', 'Amara', 'Liam', 'Noor', 'Mateo', 'Yuki', 'Fatima', 'Ivan']
+LAST_NAMES = ['Smith', 'Garcia', 'Chen', 'Patel', 'Khan', 'Rossi', 'Sato', 'Ivanova',
+              'Silva', 'Okafor', 'Brown', 'Haddad', 'Lopez', 'Kim', 'Nguyen', 'Novak']
+WORDS = ['Wireless', 'Premium', 'Compact', 'Smart', 'Classic', 'Ultra', 'Eco', 'Pro',
+         'Charger', 'Cable', 'Jacket', 'Lamp', 'Speaker', 'Mount', 'Case', 'Bottle']
+CITIES = [('Austin', 'TX'), ('Seattle', 'WA'), ('Denver', 'CO'), ('Boston', 'MA'),
+          ('Miami', 'FL'), ('Chicago', 'IL'), ('Phoenix', 'AZ'), ('Portland', 'OR')]
+
+NOW = datetime(2025, 1, 1)
+HISTORY_DAYS = 730
+
+# ---------------------------------------------------------------------------
+# Deterministic helpers
+
+def chunk_rng(seed, table, chunk_index):
+    return random.Random(f"{seed}:{table}:{chunk_index}")
+
+def weighted(rng, choices):
+    return rng.choices([c for c, _ in choices], weights=[w for _, w in choices])[0]
+
+def product_price(product_index):
+    """Stable price for a product, shared by products and order items"""
+    return round(5 + (product_index * 2654435761 % 99_500) / 100, 2)
+
+def product_has_variants(product_index):
+    return product_index * 40503 % 100 < VARIANT_PRODUCT_FRACTION * 100
+
+def random_timestamp(rng, days=HISTORY_DAYS):
+    return NOW - timedelta(seconds=rng.randrange(days * 86400))
+
+_zipf_cache = {}
+
+def zipf_sampler(n, s):
+    """
+    Returns sample(rng) -> 0-based index in [0, n), Zipf-distributed by
+    rank, with ranks scattered over the index range by a fixed permutation
+    """
+    key = (n, s)
+    if key not in _zipf_cache:
+        cdf = array('d', itertools.accumulate(1.0 / (rank ** s) for rank in range(1, n + 1)))
+        total = cdf[-1]
+        # Multiplier coprime with n maps rank -> index without collisions
+        step = next(m for m in itertools.count(7919) if _gcd(m, n) == 1)
+        _zipf_cache[key] = (cdf, total, step)
+    cdf, total, step = _zipf_cache[key]
+
+    def sample(rng):
+        rank = bisect_left(cdf, rng.random() * total)
+        return (min(rank, n - 1) * step) % n
+    return sample
+
+def _gcd(a, b):
+    while b:
+        a, b = b, a % b
+    return a
+
+# ---------------------------------------------------------------------------
+# COPY plumbing
+
+def copy_value(value):
+    if value is None:
+        return '\\N'
+    if isinstance(value, bool):
+        return 't' if value else 'f'
+    if isinstance(value, datetime):
+        return value.isoformat(sep=' ')
+    return str(value)
+
+class RowStream(io.RawIOBase):
+    """File-like object that COPY reads; rows are generated on demand"""
+    def __init__(self, rows):
+        self._lines = ('\t'.join(copy_value(v) for v in row) + '\n' for row in rows)
+        self._buffer = b''
+
+    def readable(self):
+        return True
+
+    def read(self, size=-1):
+        while size < 0 or len(self._buffer) < size:
+            line = next(self._lines, None)
+            if line is None:
+                break
+            self._buffer += line.encode('utf-8')
+        if size < 0:
+            size = len(self._buffer)
+        data, self._buffer = self._buffer[:size], self._buffer[size:]
+        return data
+
+def connect():
+    return psycopg2.connect(host=Config.DB_HOST, database=Config.DB_NAME, user=Config.DB_USER,
+                            password=Config.DB_PASSWORD, port=Config.DB_PORT)
+
+def copy_rows(cursor, table, columns, rows):
+    cursor.copy_expert(f"COPY {table} ({', '.join(columns)}) FROM STDIN", RowStream(rows))
+
+# ---------------------------------------------------------------------------
+# Row generators: one chunk of `count` rows starting at index `start`
+
+def gen_users(ctx, rng, start, count):
+    for i in range(start, start + count):
+        user_id = ctx['base']['users'] + i + 1
+        created = random_timestamp(rng, HISTORY_DAYS + 365)
+        yield (user_id, f"user{user_id}@example.test", ctx['password_hash'],
+               rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES), f"+1-555-{i % 10000:04d}",
+               'customer', rng.random() > 0.02, rng.random() > 0.15,
+               created + timedelta(days=rng.randrange(365)), created)
+
+def gen_addresses(ctx, rng, start, count):
+    for i in range(start, start + count):
+        city, state = rng.choice(CITIES)
+        yield (ctx['base']['addresses'] + i + 1, ctx['base']['users'] + i + 1,
+               f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}", f"+1-555-{i % 10000:04d}",
+               f"{rng.randrange(1, 9999)} Main St", city, state,
+               f"{rng.randrange(10000, 99999)}", 'USA', True)
+
+def gen_products(ctx, rng, start, count):
+    categories = ctx['category_ids']
+    for i in range(start, start + count):
+        pid = ctx['base']['products'] + i + 1
+        name = f"{rng.choice(WORDS)} {rng.choice(WORDS)} {pid}"
+        price = product_price(i)
+        stock = 0 if rng.random() < 0.05 else rng.randrange(1, 500)
+        yield (pid, f"GEN-{pid:08d}", name, f"gen-{pid}", f"Generated product {pid}",
+               name, price, round(price * 1.2, 2) if rng.random() < 0.3 else None,
+               stock, rng.choice(categories), rng.choice(WORDS),
+               rng.random() < 0.02, rng.random() > 0.03, random_timestamp(rng))
+
+def gen_variants(ctx, rng, start, count):
+    for i in range(start, start + count):
+        if not product_has_variants(i):
+            continue
+        pid = ctx['base']['products'] + i + 1
+        for size in ('S', 'M', 'L'):
+            yield (pid, f"GEN-{pid:08d}-{size}", f"Size {size}", product_price(i),
+                   rng.randrange(0, 200), '{"size": "%s"}' % size)
+
+def gen_images(ctx, rng, start, count):
+    for i in range(start, start + count):
+        pid = ctx['base']['products'] + i + 1
+        for position in range(1 + rng.randrange(4)):
+            yield (pid, f"/static/uploads/generated/{pid}_{position}.jpg",
+                   f"Product {pid}", position == 0, position)
+
+def gen_reviews(ctx, rng, start, count):
+    pick_product = zipf_sampler(ctx['sizes']['products'], PRODUCT_ZIPF_S)
+    n_users = ctx['sizes']['users']
+    for _ in range(count):
+        helpful = min(int(rng.paretovariate(1.5)) - 1, 500)
+        yield (ctx['base']['products'] + pick_product(rng) + 1,
+               ctx['base']['users'] + rng.randrange(n_users) + 1,
+               weighted(rng, RATINGS), 'Generated review', 'Generated review text',
+               rng.random() < 0.6, rng.random() > 0.05, helpful, random_timestamp(rng))
+
+def gen_cart(ctx, rng, start, count):
+    pick_product = zipf_sampler(ctx['sizes']['products'], PRODUCT_ZIPF_S)
+    for i in range(start, start + count):
+        if rng.random() >= CART_USER_FRACTION:
+            continue
+        products = {pick_product(rng) for _ in range(rng.randrange(1, 6))}
+        for product_index in sorted(products):
+            yield (ctx['base']['users'] + i + 1, ctx['base']['products'] + product_index + 1,
+                   rng.randrange(1, 4), random_timestamp(rng, 30))
+
+def gen_orders_and_items(ctx, rng, start, count):
+    """Returns (orders, items) lists; items need their order's totals"""
+    pick_product = zipf_sampler(ctx['sizes']['products'], PRODUCT_ZIPF_S)
+    pick_user = zipf_sampler(ctx['sizes']['users'], USER_ZIPF_S)
+    orders, items = [], []
+    for i in range(start, start + count):
+        order_id = ctx['base']['orders'] + i + 1
+        user_index = pick_user(rng)
+        created = random_timestamp(rng)
+        subtotal = 0
+        for product_index in {pick_product(rng) for _ in range(1 + int(rng.expovariate(0.7)))}:
+            quantity = rng.randrange(1, 4)
+            price = product_price(product_index)
+            pid = ctx['base']['products'] + product_index + 1
+            items.append((order_id, pid, f"Product {pid}", f"GEN-{pid:08d}", quantity,
+                          price, round(price * quantity, 2), created))
+            subtotal += price * quantity
+        subtotal = round(subtotal, 2)
+        shipping = 0 if subtotal > 50 else 5.99
+        tax = round(subtotal * 0.08, 2)
+        status = weighted(rng, ORDER_STATUSES)
+        orders.append((order_id, f"ORD-{order_id:012X}", ctx['base']['users'] + user_index + 1,
+                       subtotal, tax, shipping, round(subtotal + tax + shipping, 2), status,
+                       ctx['base']['addresses'] + user_index + 1, 'card',
+                       'pending' if status == 'pending' else 'paid', created, created))
+    return orders, items
+
+# table -> (row generator, number of source rows, COPY columns)
+TABLES = {
+    'users': (gen_users, 'users', [
+        'user_id', 'email', 'password_hash', 'first_name', 'last_name', 'phone', 'role',
+        'is_active', 'is_verified', 'last_login', 'created_at']),
+    'addresses': (gen_addresses, 'users', [
+        'address_id', 'user_id', 'full_name', 'phone', 'address_line1', 'city', 'state',
+        'postal_code', 'country', 'is_default']),
+    'products': (gen_products, 'products', [
+        'product_id', 'sku', 'name', 'slug', 'description', 'short_description', 'price',
+        'compare_at_price', 'stock_quantity', 'category_id', 'brand', 'is_featured',
+        'is_active', 'created_at']),
+    'product_variants': (gen_variants, 'products', [
+        'product_id', 'sku', 'name', 'price', 'stock_quantity', 'attributes']),
+    'product_images': (gen_images, 'products', [
+        'product_id', 'image_url', 'alt_text', 'is_primary', 'display_order']),
+    'reviews': (gen_reviews, 'reviews', [
+        'product_id', 'user_id', 'rating', 'title', 'comment', 'is_verified_purchase',
+        'is_approved', 'helpful_count', 'created_at']),
+    'cart': (gen_cart, 'users', ['user_id', 'product_id', 'quantity', 'created_at']),
+    'orders': (gen_orders_and_items, 'orders', [
+        'order_id', 'order_number', 'user_id', 'subtotal', 'tax_amount', 'shipping_cost',
+        'total_amount', 'status', 'shipping_address_id', 'payment_method', 'payment_status',
+        'created_at', 'updated_at']),
+}
+ORDER_ITEM_COLUMNS = ['order_id', 'product_id', 'product_name', 'sku', 'quantity',
+                      'unit_price', 'total_price', 'created_at']
+
+# Tables in the same phase only depend on earlier phases
+PHASES = [
+    ['users', 'products'],
+    ['addresses', 'product_variants', 'product_images'],
+    ['orders', 'reviews', 'cart'],
+]
+
+def run_chunk(table, chunk_index, start, count, ctx):
+    """Generate and COPY one chunk (runs in a worker process)"""
+    generator, _, columns = TABLES[table]
+    rng = chunk_rng(ctx['seed'], table, chunk_index)
+    conn = connect()
+    cursor = conn.cursor()
+    try:
+        if table == 'orders':
+            orders, items = generator(ctx, rng, start, count)
+            copy_rows(cursor, 'orders', columns, orders)
+            copy_rows(cursor, 'order_items', ORDER_ITEM_COLUMNS, items)
+        else:
+            copy_rows(cursor, table, columns, generator(ctx, rng, start, count))
+        conn.commit()
+        return table, count
+    finally:
+        cursor.close()
+        conn.close()
+
+# ---------------------------------------------------------------------------
+
+def prepare_context(sizes, seed):
+    from utils.auth_utils import hash_password
+
+    conn = connect()
+    cursor = conn.cursor()
+    try:
+        base = {}
+        for table, key in (('users', 'user_id'), ('addresses', 'address_id'),
+                           ('products', 'product_id'), ('orders', 'order_id')):
+            cursor.execute(f"SELECT COALESCE(MAX({key}), 0) FROM {table}")
+            base[table] = cursor.fetchone()[0]
+
+        cursor.execute("SELECT category_id FROM categories ORDER BY category_id")
+        category_ids = [row[0] for row in cursor.fetchall()]
+        if not category_ids:
+            for n in range(1, 21):
+                cursor.execute("""
+                    INSERT INTO categories (name, slug, is_active) VALUES (%s, %s, TRUE)
+                    RETURNING category_id
+                """, (f"Generated Category {n}", f"generated-{n}"))
+                category_ids.append(cursor.fetchone()[0])
+            conn.commit()
+    finally:
+        cursor.close()
+        conn.close()
+
+    return {'seed': seed, 'sizes': sizes, 'base': base, 'category_ids': category_ids,
+            'password_hash': hash_password('password123')}
+
+def finish():
+    """Advance sequences past the explicit IDs, refresh statistics and rollups"""
+    conn = connect()
+    conn.autocommit = True
+    cursor = conn.cursor()
+    try:
+        for table, key in (('users', 'user_id'), ('addresses', 'address_id'),
+                           ('products', 'product_id'), ('orders', 'order_id')):
+            cursor.execute(f"""
+                SELECT setval(pg_get_serial_sequence('{table}', '{key}'),
+                              (SELECT COALESCE(MAX({key}), 1) FROM {table}))
+            """)
+        for table in list(TABLES) + ['order_items']:
+            cursor.execute(f"ANALYZE {table}")
+    finally:
+        cursor.close()
+        conn.close()
+
+    from rebuild_rating_stats import rebuild_rating_stats
+    from rebuild_user_order_stats import rebuild_user_order_stats
+    rebuild_rating_stats()
+    rebuild_user_order_stats()
+
+def generate_data(sizes, seed=42, workers=4):
+    ctx = prepare_context(sizes, seed)
+    started = time.monotonic()
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        for phase in PHASES:
+            futures = []
+            for table in phase:
+                total = sizes[TABLES[table][1]]
+                for chunk_index, start in enumerate(range(0, total, CHUNK_ROWS)):
+                    count = min(CHUNK_ROWS, total - start)
+                    futures.append(pool.submit(run_chunk, table, chunk_index, start, count, ctx))
+
+            done = {}
+            for future in as_completed(futures):
+                table, count = future.result()
+                done[table] = done.get(table, 0) + count
+            for table in phase:
+                print(f"✓ {table}: {done.get(table, 0):,} source rows "
+                      f"({time.monotonic() - started:.0f}s)")
+
+    finish()
+    print(f"✅ Generated dataset in {time.monotonic() - started:.0f}s")
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Generate a large synthetic dataset with COPY')
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='multiplier for the default sizes (e.g. 0.01 for a quick run)')
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--workers', type=int, default=4)
+    for name in DEFAULT_SIZES:
+        parser.add_argument(f'--{name}', type=int, help=f'number of {name} (overrides --scale)')
+    args = parser.parse_args()
+
+    sizes = {name: getattr(args, name) or max(1, int(default * args.scale))
+             for name, default in DEFAULT_SIZES.items()}
+    generate_data(sizes, args.seed, args.workers)
@@ -0,0 +1,183 @@
+"""
+Versioned schema migration runner (see migrations/__init__.py)
+
+Applied versions are recorded in schema_migrations. A PostgreSQL advisory
+lock ensures only one runner works at a time, so it is safe to start from
+every deploy. Every migration runs with MIGRATION_LOCK_TIMEOUT and is
+retried with backoff when it cannot take a lock quickly. Waiting behind a
+long transaction would otherwise stall all queries on the table.
+
+Usage:
+    python migrate.py [up [VERSION]]      apply pending migrations (up to VERSION)
+    python migrate.py status              list applied and pending migrations
+    python migrate.py down VERSION --yes  revert migrations newer than VERSION
+                                          (down 0 --yes drops everything; dev only)
+"""
+import os
+import re
+import sys
+import time
+import argparse
+import importlib.util
+from psycopg2 import errors
+from config import Config
+from db_connection import db
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'migrations')
+FILENAME_RE = re.compile(r'^(\d{3})_(\w+)\.py$')
+ADVISORY_LOCK_KEY = 7264419  # any constant shared by all runners
+
+def discover_migrations():
+    """Returns: sorted list of (version, name, path)"""
+    found = []
+    for filename in os.listdir(MIGRATIONS_DIR):
+        match = FILENAME_RE.match(filename)
+        if match:
+            found.append((int(match.group(1)), match.group(2),
+                          os.path.join(MIGRATIONS_DIR, filename)))
+    found.sort()
+    versions = [version for version, _, _ in found]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError('Duplicate migration version numbers')
+    return found
+
+def load_migration(version, name, path):
+    spec = importlib.util.spec_from_file_location(f"migration_{version:03d}_{name}", path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def ensure_migrations_table(conn):
+    cursor = conn.cursor()
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name VARCHAR(255) NOT NULL,
+            applied_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            duration_ms INTEGER
+        );
+    """)
+    conn.commit()
+    cursor.close()
+
+def applied_versions(conn):
+    cursor = conn.cursor()
+    cursor.execute("SELECT version FROM schema_migrations")
+    versions = {row[0] for row in cursor.fetchall()}
+    conn.commit()
+    cursor.close()
+    return versions
+
+def run_step(conn, module, step, record):
+    """
+    Run module.upgrade/downgrade plus the schema_migrations bookkeeping,
+    retrying when a lock cannot be taken within the lock timeout
+    record: callable returning the (sql, params) to execute after the step succeeds
+    """
+    transactional = getattr(module, 'TRANSACTIONAL', True)
+    retries = Config.MIGRATION_LOCK_RETRIES
+    
+    for attempt in range(retries + 1):
+        conn.autocommit = not transactional
+        cursor = conn.cursor()
+        try:
+            cursor.execute("SET lock_timeout = %s", (Config.MIGRATION_LOCK_TIMEOUT,))
+            getattr(module, step)(cursor)
+            cursor.execute(*record())
+            if transactional:
+                conn.commit()
+            return
+        except errors.LockNotAvailable:
+            if transactional:
+                conn.rollback()
+            if attempt == retries:
+                raise
+            delay = min(2 ** attempt, 30)
+            print(f"  ⏳ Lock not available, retrying in {delay}s ({attempt + 1}/{retries})")
+            time.sleep(delay)
+        except Exception:
+            if transactional:
+                conn.rollback()
+            raise
+        finally:
+            cursor.close()
+            conn.autocommit = False
+
+def migrate_up(conn, target=None):
+    done = applied_versions(conn)
+    pending = [m for m in discover_migrations()
+               if m[0] not in done and (target is None or m[0] <= target)]
+    if not pending:
+        print("✅ Database schema is up to date")
+        return
+    
+    for version, name, path in pending:
+        module = load_migration(version, name, path)
+        print(f"→ Applying {version:03d}_{name}")
+        started = time.monotonic()
+        run_step(conn, module, 'upgrade', lambda: (
+            "INSERT INTO schema_migrations (version, name, duration_ms) VALUES (%s, %s, %s)",
+            (version, name, int((time.monotonic() - started) * 1000))
+        ))
+        print(f"✅ Applied {version:03d}_{name} in {time.monotonic() - started:.1f}s")
+
+def migrate_down(conn, target):
+    done = applied_versions(conn)
+    to_revert = [m for m in reversed(discover_migrations()) if m[0] in done and m[0] > target]
+    
+    for version, name, path in to_revert:
+        module = load_migration(version, name, path)
+        if not hasattr(module, 'downgrade'):
+            raise RuntimeError(f"{version:03d}_{name} cannot be reverted (no downgrade)")
+        print(f"→ Reverting {version:03d}_{name}")
+        run_step(conn, module, 'downgrade', lambda: (
+            "DELETE FROM schema_migrations WHERE version = %s", (version,)
+        ))
+        print(f"✅ Reverted {version:03d}_{name}")
+
+def show_status(conn):
+    done = applied_versions(conn)
+    for version, name, _ in discover_migrations():
+        mark = '✓' if version in done else ' '
+        print(f"[{mark}] {version:03d}_{name}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Apply or revert schema migrations')
+    parser.add_argument('command', nargs='?', default='up', choices=['up', 'down', 'status'])
+    parser.add_argument('version', nargs='?', type=int)
+    parser.add_argument('--yes', action='store_true', help='confirm a destructive down')
+    args = parser.parse_args(argv)
+    
+    if args.command == 'down' and (args.version is None or not args.yes):
+        parser.error('down requires a target VERSION and --yes')
+    
+    db.create_pool()
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        # Session-level lock: held across the autocommit and transactional steps
+        cursor.execute("SELECT pg_advisory_lock(%s)", (ADVISORY_LOCK_KEY,))
+        conn.commit()
+        ensure_migrations_table(conn)
+        
+        if args.command == 'status':
+            show_status(conn)
+        elif args.command == 'down':
+            migrate_down(conn, args.version)
+        else:
+            migrate_up(conn, args.version)
+        return 0
+        
+    except Exception as e:
+        print(f"❌ Migration failed: {e}")
+        return 1
+    finally:
+        cursor.execute("SELECT pg_advisory_unlock(%s)", (ADVISORY_LOCK_KEY,))
+        conn.commit()
+        cursor.close()
+        db.return_connection(conn)
+        db.close_all_connections()
+
+if __name__ == '__main__':
+    sys.exit(main())
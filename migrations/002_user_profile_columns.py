@@ -0,0 +1,18 @@
+"""
+Add gender and date_of_birth to users (formerly add_profile_columns.py)
+Nullable columns without a default are a catalog-only change.
+"""
+
+def upgrade(cursor):
+    cursor.execute("""
+        ALTER TABLE users
+        ADD COLUMN IF NOT EXISTS gender VARCHAR(20),
+        ADD COLUMN IF NOT EXISTS date_of_birth DATE;
+    """)
+
+def downgrade(cursor):
+    cursor.execute("""
+        ALTER TABLE users
+        DROP COLUMN IF EXISTS gender,
+        DROP COLUMN IF EXISTS date_of_birth;
+    """)
@@ -0,0 +1,17 @@
+"""
+Add email verification code columns to users (formerly add_verification_columns.py)
+"""
+
+def upgrade(cursor):
+    cursor.execute("""
+        ALTER TABLE users
+        ADD COLUMN IF NOT EXISTS verification_token VARCHAR(6),
+        ADD COLUMN IF NOT EXISTS verification_token_expires TIMESTAMP;
+    """)
+
+def downgrade(cursor):
+    cursor.execute("""
+        ALTER TABLE users
+        DROP COLUMN IF EXISTS verification_token,
+        DROP COLUMN IF EXISTS verification_token_expires;
+    """)
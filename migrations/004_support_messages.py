@@ -0,0 +1,31 @@
+"""
+Support chat messages (formerly create_support_table.py)
+"""
+
+def upgrade(cursor):
+    # Create support_messages table
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS support_messages (
+            message_id SERIAL PRIMARY KEY,
+            user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+            order_id INTEGER REFERENCES orders(order_id) ON DELETE SET NULL,
+            message_text TEXT NOT NULL,
+            sender VARCHAR(20) NOT NULL CHECK (sender IN ('customer', 'admin')),
+            status VARCHAR(20) DEFAULT 'pending' CHECK (status IN ('pending', 'replied', 'closed')),
+            telegram_message_id INTEGER,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+    
+    # Create index for faster queries
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_support_user_id ON support_messages(user_id);
+    """)
+    
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_support_status ON support_messages(status);
+    """)
+
+def downgrade(cursor):
+    cursor.execute("DROP TABLE IF EXISTS support_messages")
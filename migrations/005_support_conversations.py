@@ -0,0 +1,63 @@
+"""
+Per-customer support conversation rollup for the admin inbox,
+backfilled from support_messages in user_id ranges
+"""
+from migrations import backfill_in_batches
+
+TRANSACTIONAL = False
+
+def upgrade(cursor):
+    # One row per customer, maintained by routes/support_routes.py
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS support_conversations (
+            user_id INTEGER PRIMARY KEY REFERENCES users(user_id) ON DELETE CASCADE,
+            last_message_id INTEGER,
+            last_message_text TEXT,
+            last_sender VARCHAR(20) CHECK (last_sender IN ('customer', 'admin')),
+            message_count INTEGER NOT NULL DEFAULT 0,
+            pending_count INTEGER NOT NULL DEFAULT 0,
+            last_activity_at TIMESTAMP NOT NULL DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+    
+    # Keyset pagination indexes for the inbox (all / awaiting reply)
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_support_conv_activity
+        ON support_conversations(last_activity_at DESC, user_id DESC);
+    """)
+    
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_support_conv_pending_activity
+        ON support_conversations(last_activity_at DESC, user_id DESC)
+        WHERE pending_count > 0;
+    """)
+    
+    backfill_in_batches(cursor, 'support_messages', 'user_id', """
+        INSERT INTO support_conversations
+        (user_id, last_message_id, last_message_text, last_sender,
+         message_count, pending_count, last_activity_at)
+        SELECT DISTINCT ON (sm.user_id)
+               sm.user_id, sm.message_id, LEFT(sm.message_text, 200), sm.sender,
+               stats.message_count, stats.pending_count, sm.created_at
+        FROM support_messages sm
+        JOIN (
+            SELECT user_id,
+                   COUNT(*) AS message_count,
+                   COUNT(*) FILTER (WHERE sender = 'customer' AND status = 'pending') AS pending_count
+            FROM support_messages
+            WHERE user_id BETWEEN %(lo)s AND %(hi)s
+            GROUP BY user_id
+        ) stats ON stats.user_id = sm.user_id
+        WHERE sm.user_id BETWEEN %(lo)s AND %(hi)s
+        ORDER BY sm.user_id, sm.created_at DESC, sm.message_id DESC
+        ON CONFLICT (user_id) DO UPDATE SET
+            last_message_id = EXCLUDED.last_message_id,
+            last_message_text = EXCLUDED.last_message_text,
+            last_sender = EXCLUDED.last_sender,
+            message_count = EXCLUDED.message_count,
+            pending_count = EXCLUDED.pending_count,
+            last_activity_at = EXCLUDED.last_activity_at
+    """, batch_size=1000)
+
+def downgrade(cursor):
+    cursor.execute("DROP TABLE IF EXISTS support_conversations")
@@ -0,0 +1,26 @@
+"""
+Resized/WebP variants of uploaded images, plus the primary-image lookup index
+"""
+from migrations import create_index_concurrently
+
+TRANSACTIONAL = False
+
+def upgrade(cursor):
+    # Keyed by the original upload URL so any product_images row that
+    # points at an upload picks up its variants with a single join
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS image_variants (
+            source_url VARCHAR(500) PRIMARY KEY,
+            width INTEGER,
+            height INTEGER,
+            variants JSONB NOT NULL,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+    
+    create_index_concurrently(cursor, 'idx_product_images_primary',
+                              'ON product_images(product_id) WHERE is_primary = TRUE')
+
+def downgrade(cursor):
+    cursor.execute("DROP INDEX IF EXISTS idx_product_images_primary")
+    cursor.execute("DROP TABLE IF EXISTS image_variants")
@@ -0,0 +1,25 @@
+"""
+Content-addressed upload reference counts
+"""
+
+def upgrade(cursor):
+    # One row per stored file (SHA-256 of the content)
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS media_files (
+            content_hash CHAR(64) PRIMARY KEY,
+            url VARCHAR(500) UNIQUE NOT NULL,
+            size_bytes INTEGER NOT NULL,
+            ref_count INTEGER NOT NULL DEFAULT 0,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            last_referenced_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+    
+    # Garbage collection looks for unreferenced files
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_media_files_orphans
+        ON media_files(last_referenced_at) WHERE ref_count = 0;
+    """)
+
+def downgrade(cursor):
+    cursor.execute("DROP TABLE IF EXISTS media_files")
@@ -0,0 +1,42 @@
+"""
+Per-product review aggregates, backfilled from approved reviews in
+product_id ranges (rebuild_rating_stats.py repairs drift later)
+"""
+from migrations import backfill_in_batches
+
+TRANSACTIONAL = False
+
+def upgrade(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS product_rating_stats (
+            product_id INTEGER PRIMARY KEY REFERENCES products(product_id) ON DELETE CASCADE,
+            review_count INTEGER NOT NULL DEFAULT 0,
+            rating_sum INTEGER NOT NULL DEFAULT 0,
+            star_1 INTEGER NOT NULL DEFAULT 0,
+            star_2 INTEGER NOT NULL DEFAULT 0,
+            star_3 INTEGER NOT NULL DEFAULT 0,
+            star_4 INTEGER NOT NULL DEFAULT 0,
+            star_5 INTEGER NOT NULL DEFAULT 0,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+    
+    backfill_in_batches(cursor, 'products', 'product_id', """
+        INSERT INTO product_rating_stats
+        (product_id, review_count, rating_sum, star_1, star_2, star_3, star_4, star_5)
+        SELECT product_id,
+               COUNT(*),
+               SUM(rating),
+               COUNT(*) FILTER (WHERE rating = 1),
+               COUNT(*) FILTER (WHERE rating = 2),
+               COUNT(*) FILTER (WHERE rating = 3),
+               COUNT(*) FILTER (WHERE rating = 4),
+               COUNT(*) FILTER (WHERE rating = 5)
+        FROM reviews
+        WHERE is_approved = TRUE AND product_id BETWEEN %(lo)s AND %(hi)s
+        GROUP BY product_id
+        ON CONFLICT (product_id) DO NOTHING
+    """)
+
+def downgrade(cursor):
+    cursor.execute("DROP TABLE IF EXISTS product_rating_stats")
@@ -0,0 +1,37 @@
+"""
+Partial covering indexes for paginated product reviews, one per sort mode
+of GET /api/reviews/product/<id>, restricted to approved reviews
+Built CONCURRENTLY so the tables stay writable.
+"""
+from migrations import create_index_concurrently
+
+TRANSACTIONAL = False
+
+INDEXES = [
+    # newest (also serves the rating filter via idx_reviews_lowest)
+    ('idx_reviews_newest',
+     "ON reviews(product_id, created_at DESC, review_id DESC)"
+     " INCLUDE (rating, helpful_count)"
+     " WHERE is_approved = TRUE"),
+    ('idx_reviews_helpful',
+     "ON reviews(product_id, helpful_count DESC, review_id DESC)"
+     " INCLUDE (rating, created_at)"
+     " WHERE is_approved = TRUE"),
+    ('idx_reviews_highest',
+     "ON reviews(product_id, rating DESC, created_at DESC, review_id DESC)"
+     " INCLUDE (helpful_count)"
+     " WHERE is_approved = TRUE"),
+    # lowest first; with rating = N it is also newest-within-rating
+    ('idx_reviews_lowest',
+     "ON reviews(product_id, rating ASC, created_at DESC, review_id DESC)"
+     " INCLUDE (helpful_count)"
+     " WHERE is_approved = TRUE"),
+]
+
+def upgrade(cursor):
+    for name, definition in INDEXES:
+        create_index_concurrently(cursor, name, definition)
+
+def downgrade(cursor):
+    for name, _ in INDEXES:
+        cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
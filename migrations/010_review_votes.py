@@ -0,0 +1,16 @@
+"""
+One helpful vote per user per review
+"""
+
+def upgrade(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS review_votes (
+            review_id INTEGER NOT NULL REFERENCES reviews(review_id) ON DELETE CASCADE,
+            user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            PRIMARY KEY (review_id, user_id)
+        );
+    """)
+
+def downgrade(cursor):
+    cursor.execute("DROP TABLE IF EXISTS review_votes")
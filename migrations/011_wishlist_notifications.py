@@ -0,0 +1,48 @@
+"""
+Product change events and the email queue for wishlist alerts
+"""
+from migrations import create_index_concurrently
+
+# wishlist can be large; its new index is built without blocking writes
+TRANSACTIONAL = False
+
+def upgrade(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS product_change_events (
+            event_id BIGSERIAL PRIMARY KEY,
+            product_id INTEGER NOT NULL REFERENCES products(product_id) ON DELETE CASCADE,
+            kind VARCHAR(20) NOT NULL CHECK (kind IN ('back_in_stock', 'price_drop')),
+            old_price DECIMAL(10, 2),
+            new_price DECIMAL(10, 2),
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+    
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS email_queue (
+            email_id BIGSERIAL PRIMARY KEY,
+            user_id INTEGER NOT NULL REFERENCES users(user_id) ON DELETE CASCADE,
+            template VARCHAR(50) NOT NULL,
+            dedupe_key VARCHAR(100) NOT NULL UNIQUE,
+            payload JSONB NOT NULL DEFAULT '{}',
+            status VARCHAR(20) NOT NULL DEFAULT 'pending'
+                CHECK (status IN ('pending', 'sent', 'failed')),
+            attempts INTEGER NOT NULL DEFAULT 0,
+            last_error TEXT,
+            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+            sent_at TIMESTAMP
+        );
+    """)
+    
+    cursor.execute("""
+        CREATE INDEX IF NOT EXISTS idx_email_queue_pending
+        ON email_queue(email_id) WHERE status = 'pending';
+    """)
+    
+    # wishlist is only indexed by user; the fan-out starts from products
+    create_index_concurrently(cursor, 'idx_wishlist_product', 'ON wishlist(product_id, user_id)')
+
+def downgrade(cursor):
+    cursor.execute("DROP INDEX IF EXISTS idx_wishlist_product")
+    cursor.execute("DROP TABLE IF EXISTS email_queue")
+    cursor.execute("DROP TABLE IF EXISTS product_change_events")
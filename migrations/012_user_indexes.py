@@ -0,0 +1,33 @@
+"""
+Indexes for the admin user list (GET /api/users and /api/users/export)
+- (created_at, user_id) for the keyset order, plus a role-leading variant
+- partial indexes for the minority flags admins filter on (unverified, inactive)
+- lower(...) text_pattern_ops indexes for ?q= prefix search, which work for
+  LIKE 'abc%' whatever the database collation
+Built CONCURRENTLY so the tables stay writable.
+"""
+from migrations import create_index_concurrently
+
+TRANSACTIONAL = False
+
+INDEXES = [
+    ('idx_users_created', "ON users(created_at DESC, user_id DESC)"),
+    ('idx_users_role_created', "ON users(role, created_at DESC, user_id DESC)"),
+    ('idx_users_unverified_created',
+     "ON users(created_at DESC, user_id DESC)"
+     " WHERE is_verified = FALSE"),
+    ('idx_users_inactive_created',
+     "ON users(created_at DESC, user_id DESC)"
+     " WHERE is_active = FALSE"),
+    ('idx_users_email_prefix', "ON users(lower(email) text_pattern_ops)"),
+    ('idx_users_first_name_prefix', "ON users(lower(first_name) text_pattern_ops)"),
+    ('idx_users_last_name_prefix', "ON users(lower(last_name) text_pattern_ops)"),
+]
+
+def upgrade(cursor):
+    for name, definition in INDEXES:
+        create_index_concurrently(cursor, name, definition)
+
+def downgrade(cursor):
+    for name, _ in INDEXES:
+        cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
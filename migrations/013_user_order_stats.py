@@ -0,0 +1,30 @@
+"""
+Per-customer order statistics, backfilled from orders in user_id ranges
+(rebuild_user_order_stats.py repairs drift later)
+"""
+from migrations import backfill_in_batches
+
+TRANSACTIONAL = False
+
+def upgrade(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS user_order_stats (
+            user_id INTEGER PRIMARY KEY REFERENCES users(user_id) ON DELETE CASCADE,
+            order_count INTEGER NOT NULL DEFAULT 0,
+            total_spent DECIMAL(12, 2) NOT NULL DEFAULT 0,
+            last_order_at TIMESTAMP,
+            updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+        );
+    """)
+    
+    backfill_in_batches(cursor, 'users', 'user_id', """
+        INSERT INTO user_order_stats (user_id, order_count, total_spent, last_order_at)
+        SELECT user_id, COUNT(*), SUM(total_amount), MAX(created_at)
+        FROM orders
+        WHERE status <> 'cancelled' AND user_id BETWEEN %(lo)s AND %(hi)s
+        GROUP BY user_id
+        ON CONFLICT (user_id) DO NOTHING
+    """)
+
+def downgrade(cursor):
+    cursor.execute("DROP TABLE IF EXISTS user_order_stats")
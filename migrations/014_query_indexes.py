@@ -0,0 +1,40 @@
+"""
+Composite and partial indexes matching the hot route queries
+(tests/test_query_plans.py EXPLAINs the statements the routes send)
+Built CONCURRENTLY so the tables stay writable.
+"""
+from migrations import create_index_concurrently
+
+TRANSACTIONAL = False
+
+INDEXES = [
+    # GET /api/products: active products, newest first (optionally by category / featured)
+    ('idx_products_active_created',
+     "ON products(created_at DESC)"
+     " WHERE is_active = TRUE"),
+    ('idx_products_active_category_created',
+     "ON products(category_id, created_at DESC)"
+     " WHERE is_active = TRUE"),
+    ('idx_products_featured_created',
+     "ON products(created_at DESC)"
+     " WHERE is_active = TRUE AND is_featured = TRUE"),
+    # GET /api/orders (customer history) and /api/orders/admin/all?status=
+    ('idx_orders_user_created', "ON orders(user_id, created_at DESC)"),
+    ('idx_orders_status_created', "ON orders(status, created_at DESC)"),
+    # Order detail status history, newest first
+    ('idx_order_history_order_created', "ON order_status_history(order_id, created_at DESC)"),
+    # GET /api/support/messages: one customer's conversation in order
+    ('idx_support_user_created', "ON support_messages(user_id, created_at)"),
+    # Telegram webhook / poller: find the customer message an admin replied to
+    ('idx_support_telegram_message',
+     "ON support_messages(telegram_message_id)"
+     " WHERE sender = 'customer' AND telegram_message_id IS NOT NULL"),
+]
+
+def upgrade(cursor):
+    for name, definition in INDEXES:
+        create_index_concurrently(cursor, name, definition)
+
+def downgrade(cursor):
+    for name, _ in INDEXES:
+        cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
@@ -0,0 +1,13 @@
+"""
+Drop idx_cart_user_product_variant where an earlier 014 created it: it
+duplicates cart_user_id_product_id_variant_id_key, the index behind the
+UNIQUE(user_id, product_id, variant_id) constraint, and only added write
+cost and disk. No-op on databases that never had it.
+"""
+TRANSACTIONAL = False
+
+def upgrade(cursor):
+    cursor.execute("DROP INDEX CONCURRENTLY IF EXISTS idx_cart_user_product_variant")
+
+def downgrade(cursor):
+    pass  # nothing to restore: the unique constraint's index covers the same lookups
@@ -0,0 +1,14 @@
+"""
+Add users.wishlist_version, bumped by every wishlist add/remove, so each
+worker's membership cache can check its entry is current
+(utils/wishlist_cache.py). A constant default is a catalog-only change.
+"""
+
+def upgrade(cursor):
+    cursor.execute("""
+        ALTER TABLE users
+        ADD COLUMN IF NOT EXISTS wishlist_version INTEGER NOT NULL DEFAULT 0;
+    """)
+
+def downgrade(cursor):
+    cursor.execute("ALTER TABLE users DROP COLUMN IF EXISTS wishlist_version")
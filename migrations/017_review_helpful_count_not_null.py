@@ -0,0 +1,29 @@
+"""
+Make reviews.helpful_count NOT NULL DEFAULT 0
+It was only DEFAULT 0, so NULL counts broke the vote response, lost every
+buffered vote on flush (NULL + delta) and ended helpful-sort pagination
+(NULLs sort first and a NULL cursor matches nothing). NULLs are backfilled
+to 0 in review_id ranges; NOT NULL is then proven by a CHECK validated
+without blocking writes, which SET NOT NULL reuses instead of rescanning.
+"""
+from migrations import backfill_in_batches
+
+TRANSACTIONAL = False
+
+def upgrade(cursor):
+    cursor.execute("ALTER TABLE reviews ALTER COLUMN helpful_count SET DEFAULT 0")
+    backfill_in_batches(cursor, 'reviews', 'review_id', """
+        UPDATE reviews SET helpful_count = 0
+        WHERE helpful_count IS NULL AND review_id BETWEEN %(lo)s AND %(hi)s
+    """)
+    cursor.execute("""
+        ALTER TABLE reviews DROP CONSTRAINT IF EXISTS reviews_helpful_count_not_null;
+        ALTER TABLE reviews ADD CONSTRAINT reviews_helpful_count_not_null
+            CHECK (helpful_count IS NOT NULL) NOT VALID;
+    """)
+    cursor.execute("ALTER TABLE reviews VALIDATE CONSTRAINT reviews_helpful_count_not_null")
+    cursor.execute("ALTER TABLE reviews ALTER COLUMN helpful_count SET NOT NULL")
+    cursor.execute("ALTER TABLE reviews DROP CONSTRAINT reviews_helpful_count_not_null")
+
+def downgrade(cursor):
+    cursor.execute("ALTER TABLE reviews ALTER COLUMN helpful_count DROP NOT NULL")
@@ -0,0 +1,56 @@
+"""
+Versioned schema migrations, applied in order by migrate.py
+
+Each migration is a file NNN_description.py defining upgrade(cursor) and,
+where it can be undone, downgrade(cursor). By default a migration runs in
+one transaction with a short lock_timeout; the runner retries it when a
+lock cannot be taken, instead of letting it queue behind long transactions
+and block every query on the table meanwhile.
+
+A migration that sets TRANSACTIONAL = False runs in autocommit mode. This
+is required for CREATE INDEX CONCURRENTLY and lets backfills commit batch
+by batch. Such migrations must be safe to re-run after a partial failure.
+
+The helpers below are for use inside migrations.
+"""
+import time
+
+def create_index_concurrently(cursor, name, definition):
+    """
+    CREATE INDEX CONCURRENTLY name <definition>, for non-transactional migrations
+    A failed concurrent build leaves an INVALID index behind that IF NOT
+    EXISTS would skip, so that is dropped and rebuilt.
+    definition: everything after the index name, e.g. 'ON orders(status)'
+    """
+    cursor.execute("""
+        SELECT i.indisvalid FROM pg_index i
+        JOIN pg_class c ON c.oid = i.indexrelid
+        WHERE c.relname = %s
+    """, (name,))
+    existing = cursor.fetchone()
+    if existing and existing[0]:
+        return
+    if existing:
+        cursor.execute(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+    cursor.execute(f"CREATE INDEX CONCURRENTLY {name} {definition}")
+
+def backfill_in_batches(cursor, table, key_column, statement, batch_size=5000, pause=0.05):
+    """
+    Run statement over table in key ranges, committing after each range
+    (non-transactional migrations only), so no batch holds row locks for
+    long and replicas/autovacuum keep up.
+    statement: SQL using %(lo)s and %(hi)s as the inclusive key range
+    Returns: total rows affected
+    """
+    cursor.execute(f"SELECT MIN({key_column}), MAX({key_column}) FROM {table}")
+    low, high = cursor.fetchone()
+    if low is None:
+        return 0
+
+    affected = 0
+    for start in range(low, high + 1, batch_size):
+        cursor.execute(statement, {'lo': start, 'hi': start + batch_size - 1})
+        affected += max(cursor.rowcount, 0)
+        if pause:
+            time.sleep(pause)
+    return affected
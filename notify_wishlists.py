@@ -0,0 +1,101 @@
+"""
+Turn captured product changes into wishlist alert emails
+
+Each batch claims up to --batch events and, in a single statement, joins the
+affected products against wishlist and users and upserts one 'wishlist_alert'
+row per user into email_queue. The dedupe key is per user per day: products
+that change while that day's email is still pending are merged into it, and
+once it has been sent nothing more is queued for that user until tomorrow.
+A restock wishlisted by 100k users is one INSERT ... SELECT, not 100k queries.
+
+Changes are re-checked against the current product row, so a product that
+went back out of stock (or back up in price) before the job ran is skipped.
+Events are deleted as they are claimed; SKIP LOCKED lets runs overlap safely.
+
+Usage: python notify_wishlists.py [--batch 1000]
+Then send with: python send_email_queue.py
+"""
+import argparse
+from db_connection import db
+
+ENQUEUE_SQL = """
+    WITH claimed AS (
+        DELETE FROM product_change_events
+        WHERE event_id IN (
+            SELECT event_id FROM product_change_events
+            ORDER BY event_id
+            LIMIT %(batch)s
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING product_id, kind, old_price
+    ), changes AS (
+        SELECT c.product_id, c.kind, MAX(c.old_price) AS old_price
+        FROM claimed c
+        GROUP BY c.product_id, c.kind
+    ), still_valid AS (
+        SELECT ch.product_id, ch.kind, ch.old_price, p.name, p.slug, p.price
+        FROM changes ch
+        JOIN products p ON p.product_id = ch.product_id AND p.is_active = TRUE
+        WHERE (ch.kind = 'back_in_stock' AND p.stock_quantity > 0)
+           OR (ch.kind = 'price_drop' AND p.price < ch.old_price)
+    ), per_user AS (
+        SELECT w.user_id,
+               jsonb_agg(jsonb_build_object(
+                   'product_id', s.product_id,
+                   'name', s.name,
+                   'slug', s.slug,
+                   'kind', s.kind,
+                   'price', s.price,
+                   'old_price', s.old_price
+               ) ORDER BY s.product_id) AS items
+        FROM still_valid s
+        JOIN wishlist w ON w.product_id = s.product_id
+        JOIN users u ON u.user_id = w.user_id AND u.is_active = TRUE
+        GROUP BY w.user_id
+    ), queued AS (
+        INSERT INTO email_queue (user_id, template, dedupe_key, payload)
+        SELECT user_id, 'wishlist_alert',
+               'wishlist_alert:' || user_id || ':' || CURRENT_DATE,
+               jsonb_build_object('items', items)
+        FROM per_user
+        ON CONFLICT (dedupe_key) DO UPDATE
+            SET payload = jsonb_build_object(
+                'items', (email_queue.payload -> 'items') || (EXCLUDED.payload -> 'items')
+            )
+            WHERE email_queue.status = 'pending'
+        RETURNING 1
+    )
+    SELECT (SELECT COUNT(*) FROM claimed), (SELECT COUNT(*) FROM queued)
+"""
+
+def notify_wishlists(batch_size=1000):
+    db.create_pool()
+    
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        events = queued = 0
+        while True:
+            cursor.execute(ENQUEUE_SQL, {'batch': batch_size})
+            claimed, batch_queued = cursor.fetchone()
+            conn.commit()
+            if claimed == 0:
+                break
+            events += claimed
+            queued += batch_queued
+        
+        print(f"✅ Processed {events} product changes, queued or updated {queued} wishlist alert emails")
+        
+    except Exception as e:
+        conn.rollback()
+        print(f"❌ Error queueing wishlist alerts: {e}")
+    finally:
+        cursor.close()
+        db.return_connection(conn)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Queue wishlist alert emails')
+    parser.add_argument('--batch', type=int, default=1000)
+    args = parser.parse_args()
+    notify_wishlists(args.batch)
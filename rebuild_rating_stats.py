@@ -0,0 +1,65 @@
+"""
+Rebuild product_rating_stats from the reviews table
+
+Use for the initial backfill or to repair drift. Runs as one set-based
+statement per step inside a single transaction, so readers see either the
+old or the new aggregates.
+"""
+from db_connection import db
+
+def rebuild_rating_stats():
+    db.create_pool()
+    
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("""
+            INSERT INTO product_rating_stats
+            (product_id, review_count, rating_sum, star_1, star_2, star_3, star_4, star_5)
+            SELECT product_id,
+                   COUNT(*),
+                   SUM(rating),
+                   COUNT(*) FILTER (WHERE rating = 1),
+                   COUNT(*) FILTER (WHERE rating = 2),
+                   COUNT(*) FILTER (WHERE rating = 3),
+                   COUNT(*) FILTER (WHERE rating = 4),
+                   COUNT(*) FILTER (WHERE rating = 5)
+            FROM reviews
+            WHERE is_approved = TRUE AND product_id IS NOT NULL
+            GROUP BY product_id
+            ON CONFLICT (product_id) DO UPDATE SET
+                review_count = EXCLUDED.review_count,
+                rating_sum = EXCLUDED.rating_sum,
+                star_1 = EXCLUDED.star_1,
+                star_2 = EXCLUDED.star_2,
+                star_3 = EXCLUDED.star_3,
+                star_4 = EXCLUDED.star_4,
+                star_5 = EXCLUDED.star_5,
+                updated_at = CURRENT_TIMESTAMP
+        """)
+        upserted = cursor.rowcount
+        
+        # Products whose approved reviews have all gone
+        cursor.execute("""
+            DELETE FROM product_rating_stats prs
+            WHERE NOT EXISTS (
+                SELECT 1 FROM reviews r
+                WHERE r.product_id = prs.product_id AND r.is_approved = TRUE
+            )
+        """)
+        removed = cursor.rowcount
+        
+        conn.commit()
+        print(f"✓ Rating stats rebuilt: {upserted} products updated, {removed} cleared")
+        
+    except Exception as e:
+        conn.rollback()
+        print(f"✗ Error rebuilding rating stats: {e}")
+    finally:
+        cursor.close()
+        db.return_connection(conn)
+        db.close_all_connections()
+
+if __name__ == '__main__':
+    rebuild_rating_stats()
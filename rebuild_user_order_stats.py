@@ -0,0 +1,56 @@
+"""
+Rebuild user_order_stats from the orders table
+
+Use for the initial backfill or to repair drift. The rollup table is locked
+first, so orders being placed or cancelled meanwhile wait for the rebuild
+and then apply their increment on top of it instead of being lost or
+counted twice. Orders themselves stay writable.
+"""
+from db_connection import db
+
+def rebuild_user_order_stats():
+    db.create_pool()
+    
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("LOCK TABLE user_order_stats IN EXCLUSIVE MODE")
+        
+        cursor.execute("""
+            INSERT INTO user_order_stats (user_id, order_count, total_spent, last_order_at)
+            SELECT user_id, COUNT(*), SUM(total_amount), MAX(created_at)
+            FROM orders
+            WHERE status <> 'cancelled' AND user_id IS NOT NULL
+            GROUP BY user_id
+            ON CONFLICT (user_id) DO UPDATE SET
+                order_count = EXCLUDED.order_count,
+                total_spent = EXCLUDED.total_spent,
+                last_order_at = EXCLUDED.last_order_at,
+                updated_at = CURRENT_TIMESTAMP
+        """)
+        upserted = cursor.rowcount
+        
+        # Customers whose orders have all been cancelled or removed
+        cursor.execute("""
+            DELETE FROM user_order_stats uos
+            WHERE NOT EXISTS (
+                SELECT 1 FROM orders o
+                WHERE o.user_id = uos.user_id AND o.status <> 'cancelled'
+            )
+        """)
+        removed = cursor.rowcount
+        
+        conn.commit()
+        print(f"✓ Order stats rebuilt: {upserted} customers updated, {removed} cleared")
+        
+    except Exception as e:
+        conn.rollback()
+        print(f"✗ Error rebuilding order stats: {e}")
+    finally:
+        cursor.close()
+        db.return_connection(conn)
+        db.close_all_connections()
+
+if __name__ == '__main__':
+    rebuild_user_order_stats()
@@ -0,0 +1,86 @@
+import os
+from flask import Blueprint, request, current_app, send_file
+from flask_jwt_extended import jwt_required
+from werkzeug.security import safe_join
+from utils.response_utils import success_response, error_response
+from utils.auth_utils import admin_required
+from utils.pagination import parse_limit
+from utils.slow_queries import slow_queries
+from utils.request_profiler import list_profiles
+
+admin_bp = Blueprint('admin', __name__)
+
+SLOW_QUERY_ORDERS = ('total_ms', 'max_ms', 'count')
+PROFILE_FORMATS = {'collapsed': ('.collapsed', 'text/plain'),
+                   'prof': ('.prof', 'application/octet-stream')}
+
+@admin_bp.route('/slow-queries', methods=['GET'])
+@jwt_required()
+@admin_required()
+def get_slow_queries():
+    """
+    Top slow-query fingerprints seen by this worker, with their latest plan
+    ?order=total_ms|max_ms|count  ?limit=
+    """
+    order = request.args.get('order', 'total_ms')
+    if order not in SLOW_QUERY_ORDERS:
+        return error_response(f'Invalid order. Must be one of: {", ".join(SLOW_QUERY_ORDERS)}')
+    limit = parse_limit(request.args.get('limit'), default=20, maximum=100)
+
+    return success_response({
+        'worker_pid': os.getpid(),
+        'threshold_ms': slow_queries.threshold_ms,
+        'dropped_plans': slow_queries.dropped_plans,
+        'queries': slow_queries.top(order, limit),
+    })
+
+@admin_bp.route('/slow-queries/recent', methods=['GET'])
+@jwt_required()
+@admin_required()
+def get_recent_slow_queries():
+    """Most recent slow statements from this worker's ring buffer, newest first"""
+    limit = parse_limit(request.args.get('limit'), default=50, maximum=500)
+    return success_response({
+        'worker_pid': os.getpid(),
+        'entries': slow_queries.latest(limit),
+    })
+
+def profile_dir():
+    return os.path.join(current_app.root_path, current_app.config.get('PROFILE_DIR', 'profiles'))
+
+@admin_bp.route('/profiles', methods=['GET'])
+@jwt_required()
+@admin_required()
+def get_profiles():
+    """
+    Stored request profiles, newest first
+    ?endpoint=  ?limit=
+    """
+    limit = parse_limit(request.args.get('limit'), default=50, maximum=500)
+    profiles = list_profiles(profile_dir())
+    endpoint = request.args.get('endpoint')
+    if endpoint:
+        profiles = [meta for meta in profiles if meta['endpoint'] == endpoint]
+    return success_response({
+        'enabled': bool(current_app.config.get('PROFILING_ENABLED')),
+        'profiles': profiles[:limit],
+    })
+
+@admin_bp.route('/profiles/<profile_id>', methods=['GET'])
+@jwt_required()
+@admin_required()
+def download_profile(profile_id):
+    """
+    One profile as folded stacks (flamegraph.pl / speedscope) or pstats
+    ?format=collapsed|prof
+    """
+    fmt = request.args.get('format', 'collapsed')
+    if fmt not in PROFILE_FORMATS:
+        return error_response(f'Invalid format. Must be one of: {", ".join(PROFILE_FORMATS)}')
+    suffix, mimetype = PROFILE_FORMATS[fmt]
+
+    path = safe_join(profile_dir(), profile_id + suffix)
+    if path is None or not os.path.isfile(path):
+        return error_response('Profile not found', 404)
+    return send_file(path, mimetype=mimetype, as_attachment=True,
+                     download_name=profile_id + suffix)
@@ -0,0 +1,86 @@
+"""
+Batch endpoint: several API calls in one HTTP round trip
+
+POST /api/batch
+    {"requests": [
+        {"id": "me", "method": "GET", "path": "/api/auth/me"},
+        {"id": "cart", "path": "/api/cart"},
+        {"id": "featured", "path": "/api/products?is_featured=1&fields=name,price,primary_image"}
+    ]}
+
+Sub-requests run in order, in-process, through the normal request
+machinery (routing, auth decorators, before/after hooks), each in its own
+request and app context. The batch's token is checked up front, so a bad
+token fails the whole batch instead of every item; the Authorization header
+is then forwarded and each sub-request's @jwt_required still decodes it (a
+signature check, no database work). The admin role is looked up once for
+the batch, and all sub-requests share one pooled DB connection. Every item
+gets its own status and body; one failing item does not fail the others.
+"""
+from flask import Blueprint, request, current_app
+from flask_jwt_extended import verify_jwt_in_request
+from db_connection import db
+from utils.response_utils import success_response, error_response
+from utils.auth_utils import cached_roles
+
+batch_bp = Blueprint('batch', __name__)
+
+BATCH_METHODS = ('GET', 'POST', 'PUT', 'DELETE')
+FORWARDED_HEADERS = ('Authorization', 'Accept-Language', 'User-Agent')
+
+def validate_items(items, max_items):
+    """Returns an error message, or None when the batch is well formed"""
+    if not isinstance(items, list) or not items:
+        return 'requests must be a non-empty list'
+    if len(items) > max_items:
+        return f'At most {max_items} requests per batch'
+    for index, item in enumerate(items):
+        if not isinstance(item, dict) or not isinstance(item.get('path'), str):
+            return f'requests[{index}]: path is required'
+        if not item['path'].startswith('/api/') or item['path'].startswith('/api/batch'):
+            return f'requests[{index}]: path must be an /api/ endpoint other than /api/batch'
+        method = item.get('method', 'GET')
+        if not isinstance(method, str) or method.upper() not in BATCH_METHODS:
+            return f'requests[{index}]: method must be one of {", ".join(BATCH_METHODS)}'
+    return None
+
+def dispatch(app, item, headers):
+    """Run one sub-request; returns (status, body)"""
+    options = {'method': item.get('method', 'GET').upper(), 'headers': headers,
+               'environ_base': {'REMOTE_ADDR': request.remote_addr}}
+    if item.get('body') is not None:
+        options['json'] = item['body']
+
+    # A fresh app context gives the sub-request its own `g`
+    with app.app_context(), app.test_request_context(item['path'], **options):
+        try:
+            response = app.full_dispatch_request()
+        except Exception as e:
+            app.logger.exception("Batch sub-request %s failed", item['path'])
+            return 500, {'success': False, 'error': str(e)}
+        body = response.get_json(silent=True)
+        if body is None:
+            body = response.get_data(as_text=True)
+        return response.status_code, body
+
+@batch_bp.route('', methods=['POST'])
+def run_batch():
+    data = request.get_json(silent=True) or {}
+    items = data.get('requests')
+    error = validate_items(items, current_app.config.get('BATCH_MAX_REQUESTS', 20))
+    if error:
+        return error_response(error)
+
+    # Fail fast on a bad token instead of returning the same error per item
+    verify_jwt_in_request(optional=True)
+
+    headers = {name: request.headers[name] for name in FORWARDED_HEADERS if name in request.headers}
+    app = current_app._get_current_object()
+
+    results = []
+    with db.shared_connection(), cached_roles():
+        for index, item in enumerate(items):
+            status, body = dispatch(app, item, headers)
+            results.append({'id': item.get('id', index), 'status': status, 'body': body})
+
+    return success_response({'results': results})
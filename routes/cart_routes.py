@@ -2,10 +2,12 @@ from flask import Blueprint, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from db_connection import db
 from utils.response_utils import success_response, error_response
+from utils.query_stats import query_budget
 
 cart_bp = Blueprint('cart', __name__)
 
 @cart_bp.route('', methods=['GET'])
+@query_budget(1)
 @jwt_required()
 def get_cart():
     user_id = get_jwt_identity()
@@ -17,12 +19,15 @@ def get_cart():
         cursor.execute("""
             SELECT c.cart_id, c.product_id, c.variant_id, c.quantity,
                    p.name, p.price, p.stock_quantity, p.slug,
-                   (SELECT image_url FROM product_images WHERE product_id = p.product_id 
-                    AND is_primary = TRUE LIMIT 1) as image_url,
+                   pi.image_url,
                    pv.name as variant_name, pv.price as variant_price
             FROM cart c
             JOIN products p ON c.product_id = p.product_id
             LEFT JOIN product_variants pv ON c.variant_id = pv.variant_id
+            LEFT JOIN LATERAL (
+                SELECT image_url FROM product_images WHERE product_id = p.product_id 
+                AND is_primary = TRUE LIMIT 1
+            ) pi ON TRUE
             WHERE c.user_id = %s
         """, (user_id,))
         
@@ -55,6 +60,7 @@ def get_cart():
         db.return_connection(conn)
 
 @cart_bp.route('', methods=['POST'])
+@query_budget(2)
 @jwt_required()
 def add_to_cart():
     user_id = get_jwt_identity()
@@ -70,9 +76,8 @@ def add_to_cart():
         # Check if item exists
         cursor.execute("""
             SELECT cart_id, quantity FROM cart 
-            WHERE user_id = %s AND product_id = %s AND 
-                  (variant_id = %s OR (variant_id IS NULL AND %s IS NULL))
-        """, (user_id, data['product_id'], data.get('variant_id'), data.get('variant_id')))
+            WHERE user_id = %s AND product_id = %s AND variant_id IS NOT DISTINCT FROM %s
+        """, (user_id, data['product_id'], data.get('variant_id')))
         
         existing = cursor.fetchone()
         
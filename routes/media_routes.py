@@ -0,0 +1,81 @@
+"""
+Media serving for uploaded files
+
+Replaces Flask's default static handler for /static/uploads:
+- content-hashed files (see utils/media_store.py) never change, so they are
+  served with a one-year immutable Cache-Control; anything else gets a short
+  max-age plus ETag/Last-Modified revalidation
+- conditional (If-None-Match / If-Modified-Since) and Range requests are
+  answered by Werkzeug's send_file
+- the file body is handed to the server's wsgi.file_wrapper, which gunicorn
+  serves with sendfile(); with MEDIA_X_ACCEL_PREFIX set, nginx serves it via
+  X-Accel-Redirect instead
+- with MEDIA_PRECOMPRESSED enabled, a sibling .br/.gz file is served when the
+  client accepts that encoding
+"""
+import os
+import re
+import mimetypes
+from flask import Blueprint, current_app, request, send_file, abort, make_response
+from werkzeug.security import safe_join
+
+media_bp = Blueprint('media', __name__)
+
+HASHED_PATH_RE = re.compile(
+    r'^(variants/)?[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}(_[a-z]+)?\.[a-z0-9]+$'
+)
+IMMUTABLE_MAX_AGE = 365 * 24 * 60 * 60
+DEFAULT_MAX_AGE = 60 * 60
+PRECOMPRESSED = (('br', '.br'), ('gzip', '.gz'))
+
+def cache_control_for(filename):
+    if HASHED_PATH_RE.match(filename):
+        return f'public, max-age={IMMUTABLE_MAX_AGE}, immutable'
+    return f'public, max-age={DEFAULT_MAX_AGE}'
+
+def pick_precompressed(directory, filename):
+    """Return (encoding, compressed_filename) for the best accepted sibling, or None"""
+    accepted = request.accept_encodings
+    for encoding, suffix in PRECOMPRESSED:
+        if not accepted[encoding]:
+            continue
+        candidate = safe_join(directory, filename + suffix)
+        if candidate and os.path.isfile(candidate):
+            return encoding, filename + suffix
+    return None
+
+@media_bp.route('/<path:filename>', methods=['GET', 'HEAD'])
+def serve_media(filename):
+    config = current_app.config
+    directory = os.path.join(current_app.root_path, config['UPLOAD_FOLDER'])
+    path = safe_join(directory, filename)
+    if path is None or not os.path.isfile(path):
+        abort(404)
+
+    encoding = None
+    served_name = filename
+    if config.get('MEDIA_PRECOMPRESSED'):
+        picked = pick_precompressed(directory, filename)
+        if picked:
+            encoding, served_name = picked
+            path = safe_join(directory, served_name)
+
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    x_accel_prefix = config.get('MEDIA_X_ACCEL_PREFIX')
+
+    if x_accel_prefix:
+        # nginx performs the zero-copy send, range and conditional handling
+        response = make_response('')
+        response.headers['X-Accel-Redirect'] = f"{x_accel_prefix.rstrip('/')}/{served_name}"
+        response.headers['Content-Type'] = mimetype
+    else:
+        # path is already confined to the upload folder by safe_join; caching
+        # headers are set below instead of via max_age (which also adds Expires)
+        response = send_file(path, mimetype=mimetype, conditional=True, etag=True)
+
+    response.headers['Cache-Control'] = cache_control_for(filename)
+    if config.get('MEDIA_PRECOMPRESSED'):
+        response.vary.add('Accept-Encoding')
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    return response
@@ -3,14 +3,102 @@ from flask_jwt_extended import jwt_required, get_jwt_identity
 from db_connection import db
 from utils.response_utils import success_response, error_response, paginated_response
 from utils.auth_utils import admin_required
+from utils.order_stats import record_order, record_status_change, serialize_order_stats
+from utils.query_stats import query_budget
+from utils.row_mapper import RowMapper
+from utils.fieldsets import FieldSet, Field, UnknownFields
+from psycopg2.extras import execute_values
 import secrets
 
 order_bp = Blueprint('orders', __name__)
 
+ADMIN_ORDER_LIST_ROW = RowMapper(
+    ['order_id', 'order_number', 'total_amount', 'status', 'payment_status',
+     'tracking_number', 'created_at',
+     'customer.first_name', 'customer.last_name', 'customer.email',
+     'shipping_address.full_name', 'shipping_address.city', 'shipping_address.state',
+     'shipping_address.country', 'shipping_address.phone'],
+    present_if={'shipping_address': 'shipping_address.full_name'},
+    name='admin_order_list',
+)
+
+def customer_summary(user_id, first_name, last_name, email, phone,
+                     order_count, total_spent, last_order_at):
+    return {
+        'user_id': user_id,
+        'first_name': first_name,
+        'last_name': last_name,
+        'email': email,
+        'phone': phone,
+        'order_stats': serialize_order_stats(order_count, total_spent, last_order_at)
+    }
+
+def shipping_address_or_none(full_name, address_line1, address_line2, city, state,
+                             postal_code, country, phone):
+    if not full_name:
+        return None
+    return {
+        'full_name': full_name,
+        'address_line1': address_line1,
+        'address_line2': address_line2,
+        'city': city,
+        'state': state,
+        'postal_code': postal_code,
+        'country': country,
+        'phone': phone
+    }
+
+ORDER_LIST_FIELDS = FieldSet([
+    Field('order_id', 'o.order_id'),
+    Field('order_number', 'o.order_number'),
+    Field('total_amount', 'o.total_amount'),
+    Field('status', 'o.status'),
+    Field('payment_status', 'o.payment_status'),
+    Field('created_at', 'o.created_at'),
+], required=('order_id',), name='order_list')
+
+ADMIN_ORDER_FIELDS = FieldSet([
+    Field('order_id', 'o.order_id'),
+    Field('order_number', 'o.order_number'),
+    Field('subtotal', 'o.subtotal'),
+    Field('tax_amount', 'o.tax_amount'),
+    Field('shipping_cost', 'o.shipping_cost'),
+    Field('discount_amount', 'o.discount_amount'),
+    Field('total_amount', 'o.total_amount'),
+    Field('status', 'o.status'),
+    Field('payment_status', 'o.payment_status'),
+    Field('payment_method', 'o.payment_method'),
+    Field('tracking_number', 'o.tracking_number'),
+    Field('shipping_method', 'o.shipping_method'),
+    Field('created_at', 'o.created_at'),
+    Field('customer', 'u.user_id', 'u.first_name', 'u.last_name', 'u.email', 'u.phone',
+          's.order_count', 's.total_spent', 's.last_order_at',
+          build=customer_summary, joins=('customer', 'order_stats')),
+    Field('shipping_address', 'a.full_name', 'a.address_line1', 'a.address_line2', 'a.city',
+          'a.state', 'a.postal_code', 'a.country', 'a.phone',
+          build=shipping_address_or_none, joins=('shipping_address',)),
+    # Filled from their own queries, which only run when selected
+    Field('items'),
+    Field('status_history'),
+], joins=[
+    ('customer', "JOIN users u ON o.user_id = u.user_id", ()),
+    ('order_stats', "LEFT JOIN user_order_stats s ON s.user_id = u.user_id", ('customer',)),
+    ('shipping_address', "LEFT JOIN addresses a ON o.shipping_address_id = a.address_id", ()),
+], required=('order_id',), name='admin_order')
+
+ORDER_ITEM_ROW = RowMapper(
+    ['product_id', 'product_name', 'sku', 'quantity', 'unit_price', 'total_price'],
+    name='order_item',
+)
+
+STATUS_HISTORY_ROW = RowMapper(['status', 'notes', 'created_at', 'created_by'],
+                               name='status_history')
+
 def generate_order_number():
     return f"ORD-{secrets.token_hex(6).upper()}"
 
 @order_bp.route('', methods=['POST'])
+@query_budget(8)
 @jwt_required()
 def create_order():
     user_id = get_jwt_identity()
@@ -56,35 +144,48 @@ def create_order():
                               discount_amount, total_amount, shipping_address_id, 
                               billing_address_id, payment_method, shipping_method)
             VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-            RETURNING order_id
+            RETURNING order_id, created_at
         """, (order_number, user_id, subtotal, tax_amount, shipping_cost, discount_amount,
               total_amount, data['shipping_address_id'], data.get('billing_address_id'),
               data.get('payment_method'), data.get('shipping_method')))
         
-        order_id = cursor.fetchone()[0]
+        order_id, created_at = cursor.fetchone()
         
-        # Create order items
+        # Create order items and take stock in one statement per table,
+        # however many lines the cart has; stock rows are updated in key
+        # order so concurrent checkouts cannot deadlock
+        order_items = []
+        variant_stock = {}
+        product_stock = {}
         for item in cart_items:
             price = float(item[7]) if item[7] else float(item[5])
             sku = item[8] if item[8] else item[4]
-            
-            cursor.execute("""
-                INSERT INTO order_items (order_id, product_id, variant_id, product_name, 
-                                       sku, quantity, unit_price, total_price)
-                VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
-            """, (order_id, item[0], item[1], item[3], sku, item[2], price, price * item[2]))
-            
-            # Update stock
+            order_items.append((order_id, item[0], item[1], item[3], sku, item[2],
+                                price, price * item[2]))
             if item[1]:  # Has variant
-                cursor.execute("""
-                    UPDATE product_variants SET stock_quantity = stock_quantity - %s
-                    WHERE variant_id = %s
-                """, (item[2], item[1]))
+                variant_stock[item[1]] = variant_stock.get(item[1], 0) + item[2]
             else:
-                cursor.execute("""
-                    UPDATE products SET stock_quantity = stock_quantity - %s
-                    WHERE product_id = %s
-                """, (item[2], item[0]))
+                product_stock[item[0]] = product_stock.get(item[0], 0) + item[2]
+        
+        execute_values(cursor, """
+            INSERT INTO order_items (order_id, product_id, variant_id, product_name, 
+                                   sku, quantity, unit_price, total_price)
+            VALUES %s
+        """, order_items, page_size=len(order_items))
+        
+        if variant_stock:
+            execute_values(cursor, """
+                UPDATE product_variants pv SET stock_quantity = pv.stock_quantity - v.quantity
+                FROM (VALUES %s) AS v(variant_id, quantity)
+                WHERE pv.variant_id = v.variant_id
+            """, sorted(variant_stock.items()), page_size=len(variant_stock))
+        
+        if product_stock:
+            execute_values(cursor, """
+                UPDATE products p SET stock_quantity = p.stock_quantity - v.quantity
+                FROM (VALUES %s) AS v(product_id, quantity)
+                WHERE p.product_id = v.product_id
+            """, sorted(product_stock.items()), page_size=len(product_stock))
         
         # Clear cart
         cursor.execute("DELETE FROM cart WHERE user_id = %s", (user_id,))
@@ -95,6 +196,8 @@ def create_order():
             VALUES (%s, %s, %s, %s)
         """, (order_id, 'pending', 'Order created', user_id))
         
+        record_order(cursor, user_id, total_amount, created_at)
+        
         conn.commit()
         
         return success_response({
@@ -111,6 +214,7 @@ def create_order():
         db.return_connection(conn)
 
 @order_bp.route('', methods=['GET'])
+@query_budget(2)
 @jwt_required()
 def get_orders():
     user_id = get_jwt_identity()
@@ -118,6 +222,12 @@ def get_orders():
     per_page = int(request.args.get('per_page', 10))
     offset = (page - 1) * per_page
     
+    try:
+        select_sql, _, mapper = ORDER_LIST_FIELDS.compile(
+            ORDER_LIST_FIELDS.parse(request.args.get('fields')))
+    except UnknownFields as e:
+        return error_response(str(e))
+    
     conn = db.get_connection()
     cursor = conn.cursor()
     
@@ -125,23 +235,14 @@ def get_orders():
         cursor.execute("SELECT COUNT(*) FROM orders WHERE user_id = %s", (user_id,))
         total = cursor.fetchone()[0]
         
-        cursor.execute("""
-            SELECT order_id, order_number, total_amount, status, payment_status, created_at
-            FROM orders WHERE user_id = %s
-            ORDER BY created_at DESC
+        cursor.execute(f"""
+            SELECT {select_sql}
+            FROM orders o WHERE o.user_id = %s
+            ORDER BY o.created_at DESC
             LIMIT %s OFFSET %s
         """, (user_id, per_page, offset))
         
-        orders = []
-        for row in cursor.fetchall():
-            orders.append({
-                'order_id': row[0],
-                'order_number': row[1],
-                'total_amount': float(row[2]),
-                'status': row[3],
-                'payment_status': row[4],
-                'created_at': row[5].isoformat()
-            })
+        orders = mapper.all(cursor)
         
         return paginated_response(orders, page, per_page, total)
         
@@ -150,6 +251,7 @@ def get_orders():
         db.return_connection(conn)
 
 @order_bp.route('/<int:order_id>', methods=['GET'])
+@query_budget(2)
 @jwt_required()
 def get_order(order_id):
     user_id = get_jwt_identity()
@@ -217,6 +319,7 @@ def get_order(order_id):
 
 # Admin routes
 @order_bp.route('/admin/all', methods=['GET'])
+@query_budget(3)
 @admin_required()
 def get_all_orders():
     page = int(request.args.get('page', 1))
@@ -254,29 +357,7 @@ def get_all_orders():
         params.extend([per_page, offset])
         cursor.execute(query, params)
         
-        orders = []
-        for row in cursor.fetchall():
-            orders.append({
-                'order_id': row[0],
-                'order_number': row[1],
-                'total_amount': float(row[2]),
-                'status': row[3],
-                'payment_status': row[4],
-                'tracking_number': row[5],
-                'created_at': row[6].isoformat(),
-                'customer': {
-                    'first_name': row[7],
-                    'last_name': row[8],
-                    'email': row[9]
-                },
-                'shipping_address': {
-                    'full_name': row[10],
-                    'city': row[11],
-                    'state': row[12],
-                    'country': row[13],
-                    'phone': row[14]
-                } if row[10] else None
-            })
+        orders = ADMIN_ORDER_LIST_ROW.all(cursor)
         
         return paginated_response(orders, page, per_page, total)
         
@@ -285,84 +366,46 @@ def get_all_orders():
         db.return_connection(conn)
 
 @order_bp.route('/admin/<int:order_id>', methods=['GET'])
+@query_budget(4)
 @admin_required()
 def get_order_admin(order_id):
+    try:
+        selection = ADMIN_ORDER_FIELDS.parse(request.args.get('fields'))
+    except UnknownFields as e:
+        return error_response(str(e))
+    select_sql, join_sql, mapper = ADMIN_ORDER_FIELDS.compile(selection)
+    
     conn = db.get_connection()
     cursor = conn.cursor()
     
     try:
-        cursor.execute("""
-            SELECT o.order_id, o.order_number, o.subtotal, o.tax_amount, o.shipping_cost,
-                   o.discount_amount, o.total_amount, o.status, o.payment_status, 
-                   o.payment_method, o.tracking_number, o.shipping_method, o.created_at,
-                   u.user_id, u.first_name, u.last_name, u.email, u.phone,
-                   a.full_name, a.address_line1, a.address_line2, a.city, a.state, 
-                   a.postal_code, a.country, a.phone as shipping_phone
+        cursor.execute(f"""
+            SELECT {select_sql}
             FROM orders o
-            JOIN users u ON o.user_id = u.user_id
-            LEFT JOIN addresses a ON o.shipping_address_id = a.address_id
+            {join_sql}
             WHERE o.order_id = %s
         """, (order_id,))
         
-        order = cursor.fetchone()
-        if not order:
+        mapper.check(cursor)
+        order_data = mapper.one(cursor.fetchone())
+        if not order_data:
             return error_response('Order not found', 404)
         
-        # Get order items
-        cursor.execute("""
-            SELECT product_id, product_name, sku, quantity, unit_price, total_price
-            FROM order_items WHERE order_id = %s
-        """, (order_id,))
-        
-        items = [{'product_id': r[0], 'product_name': r[1], 'sku': r[2], 'quantity': r[3],
-                  'unit_price': float(r[4]), 'total_price': float(r[5])} 
-                 for r in cursor.fetchall()]
-        
-        # Get status history
-        cursor.execute("""
-            SELECT status, notes, created_at, created_by
-            FROM order_status_history
-            WHERE order_id = %s
-            ORDER BY created_at DESC
-        """, (order_id,))
-        
-        status_history = [{'status': r[0], 'notes': r[1], 'created_at': r[2].isoformat(),
-                          'created_by': r[3]} for r in cursor.fetchall()]
+        if 'items' in selection:
+            cursor.execute("""
+                SELECT product_id, product_name, sku, quantity, unit_price, total_price
+                FROM order_items WHERE order_id = %s
+            """, (order_id,))
+            order_data['items'] = ORDER_ITEM_ROW.all(cursor)
         
-        order_data = {
-            'order_id': order[0],
-            'order_number': order[1],
-            'subtotal': float(order[2]),
-            'tax_amount': float(order[3]),
-            'shipping_cost': float(order[4]),
-            'discount_amount': float(order[5]),
-            'total_amount': float(order[6]),
-            'status': order[7],
-            'payment_status': order[8],
-            'payment_method': order[9],
-            'tracking_number': order[10],
-            'shipping_method': order[11],
-            'created_at': order[12].isoformat(),
-            'customer': {
-                'user_id': order[13],
-                'first_name': order[14],
-                'last_name': order[15],
-                'email': order[16],
-                'phone': order[17]
-            },
-            'shipping_address': {
-                'full_name': order[18],
-                'address_line1': order[19],
-                'address_line2': order[20],
-                'city': order[21],
-                'state': order[22],
-                'postal_code': order[23],
-                'country': order[24],
-                'phone': order[25]
-            } if order[18] else None,
-            'items': items,
-            'status_history': status_history
-        }
+        if 'status_history' in selection:
+            cursor.execute("""
+                SELECT status, notes, created_at, created_by
+                FROM order_status_history
+                WHERE order_id = %s
+                ORDER BY created_at DESC
+            """, (order_id,))
+            order_data['status_history'] = STATUS_HISTORY_ROW.all(cursor)
         
         return success_response(order_data)
         
@@ -387,9 +430,13 @@ def update_order_status(order_id):
     cursor = conn.cursor()
     
     try:
-        # Check if order exists
-        cursor.execute("SELECT order_id FROM orders WHERE order_id = %s", (order_id,))
-        if not cursor.fetchone():
+        # Check if order exists; lock it so the status transition is exact
+        cursor.execute("""
+            SELECT user_id, total_amount, status FROM orders
+            WHERE order_id = %s FOR UPDATE
+        """, (order_id,))
+        order = cursor.fetchone()
+        if not order:
             return error_response('Order not found', 404)
         
         # Update order status
@@ -398,6 +445,8 @@ def update_order_status(order_id):
             WHERE order_id = %s
         """, (data['status'], order_id))
         
+        record_status_change(cursor, order[0], order[1], order[2], data['status'])
+        
         # Add to status history
         cursor.execute("""
             INSERT INTO order_status_history (order_id, status, notes, created_by)
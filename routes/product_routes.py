@@ -3,10 +3,108 @@ from flask_jwt_extended import jwt_required
 from db_connection import db
 from utils.response_utils import success_response, error_response, paginated_response
 from utils.auth_utils import admin_required
+from utils.rating_stats import average_rating
+from utils.product_events import capture_product_change
+from utils.row_mapper import zero_if_none
+from utils.fieldsets import FieldSet, Field, UnknownFields
+from utils.query_stats import query_budget
 
 product_bp = Blueprint('products', __name__)
 
+def nonzero_or_none(value):
+    return value if value else None
+
+def category_or_none(name, category_id):
+    return {'name': name, 'category_id': category_id} if name else None
+
+def rating_histogram(*stars):
+    return {str(star): count or 0 for star, count in enumerate(stars, 1)}
+
+PRODUCT_JOINS = {
+    'category': ('category', "LEFT JOIN categories c ON p.category_id = c.category_id", ()),
+    'rating': ('rating', "LEFT JOIN product_rating_stats prs ON prs.product_id = p.product_id", ()),
+}
+
+PRODUCT_LIST_FIELDS = FieldSet([
+    Field('product_id', 'p.product_id'),
+    Field('sku', 'p.sku'),
+    Field('name', 'p.name'),
+    Field('slug', 'p.slug'),
+    Field('short_description', 'p.short_description'),
+    Field('price', 'p.price'),
+    Field('compare_at_price', 'p.compare_at_price', coerce=nonzero_or_none),
+    Field('stock_quantity', 'p.stock_quantity'),
+    Field('is_featured', 'p.is_featured'),
+    Field('brand', 'p.brand'),
+    Field('category_name', 'c.name', joins=('category',)),
+    Field('primary_image', 'pi.image_url', joins=('primary_image',)),
+    Field('primary_image_variants', 'iv.variants', joins=('image_variants',)),
+    Field('avg_rating', 'prs.rating_sum', 'prs.review_count', build=average_rating,
+          joins=('rating',)),
+    Field('review_count', 'prs.review_count', coerce=zero_if_none, joins=('rating',)),
+], joins=[
+    PRODUCT_JOINS['category'],
+    PRODUCT_JOINS['rating'],
+    ('primary_image', """
+        LEFT JOIN LATERAL (
+            SELECT image_url FROM product_images WHERE product_id = p.product_id 
+            AND is_primary = TRUE LIMIT 1
+        ) pi ON TRUE""", ()),
+    ('image_variants', "LEFT JOIN image_variants iv ON iv.source_url = pi.image_url",
+     ('primary_image',)),
+], required=('product_id',), name='product_list')
+
+# Images and variants are aggregated to JSON in the product query itself,
+# and only when requested
+PRODUCT_IMAGES_SQL = """(
+    SELECT COALESCE(json_agg(json_build_object(
+               'image_id', pi.image_id, 'image_url', pi.image_url, 'alt_text', pi.alt_text,
+               'is_primary', pi.is_primary, 'display_order', pi.display_order,
+               'variants', iv.variants) ORDER BY pi.display_order), '[]'::json)
+    FROM product_images pi
+    LEFT JOIN image_variants iv ON iv.source_url = pi.image_url
+    WHERE pi.product_id = p.product_id
+)"""
+
+PRODUCT_VARIANTS_SQL = """(
+    SELECT COALESCE(json_agg(json_build_object(
+               'variant_id', pv.variant_id, 'sku', pv.sku, 'name', pv.name,
+               'price', NULLIF(pv.price, 0), 'stock_quantity', pv.stock_quantity,
+               'attributes', pv.attributes) ORDER BY pv.variant_id), '[]'::json)
+    FROM product_variants pv
+    WHERE pv.product_id = p.product_id AND pv.is_active = TRUE
+)"""
+
+PRODUCT_DETAIL_FIELDS = FieldSet([
+    Field('product_id', 'p.product_id'),
+    Field('sku', 'p.sku'),
+    Field('name', 'p.name'),
+    Field('slug', 'p.slug'),
+    Field('description', 'p.description'),
+    Field('short_description', 'p.short_description'),
+    Field('price', 'p.price'),
+    Field('compare_at_price', 'p.compare_at_price', coerce=nonzero_or_none),
+    Field('stock_quantity', 'p.stock_quantity'),
+    Field('brand', 'p.brand'),
+    Field('weight', 'p.weight', coerce=nonzero_or_none),
+    Field('is_featured', 'p.is_featured'),
+    Field('meta_title', 'p.meta_title'),
+    Field('meta_description', 'p.meta_description'),
+    Field('category', 'c.name', 'c.category_id', build=category_or_none, joins=('category',)),
+    Field('avg_rating', 'prs.rating_sum', 'prs.review_count', build=average_rating,
+          joins=('rating',)),
+    Field('review_count', 'prs.review_count', coerce=zero_if_none, joins=('rating',)),
+    Field('rating_histogram', 'prs.star_1', 'prs.star_2', 'prs.star_3', 'prs.star_4',
+          'prs.star_5', build=rating_histogram, joins=('rating',)),
+    Field('images', PRODUCT_IMAGES_SQL),
+    Field('variants', PRODUCT_VARIANTS_SQL),
+], joins=[
+    PRODUCT_JOINS['category'],
+    PRODUCT_JOINS['rating'],
+], required=('product_id',), name='product_detail')
+
 @product_bp.route('', methods=['GET'])
+@query_budget(2)
 def get_products():
     page = int(request.args.get('page', 1))
     per_page = int(request.args.get('per_page', 20))
@@ -14,6 +112,12 @@ def get_products():
     search = request.args.get('search')
     is_featured = request.args.get('is_featured')
     
+    try:
+        select_sql, join_sql, mapper = PRODUCT_LIST_FIELDS.compile(
+            PRODUCT_LIST_FIELDS.parse(request.args.get('fields')))
+    except UnknownFields as e:
+        return error_response(str(e))
+    
     offset = (page - 1) * per_page
     
     conn = db.get_connection()
@@ -46,36 +150,17 @@ def get_products():
         cursor.execute(f"SELECT COUNT(*) FROM products p WHERE {where_sql}", params)
         total = cursor.fetchone()[0]
         
-        # Get products
+        # Get products (only the columns and joins the fieldset needs)
         cursor.execute(f"""
-            SELECT p.product_id, p.sku, p.name, p.slug, p.short_description, p.price, 
-                   p.compare_at_price, p.stock_quantity, p.is_featured, p.brand,
-                   c.name as category_name,
-                   (SELECT image_url FROM product_images WHERE product_id = p.product_id 
-                    AND is_primary = TRUE LIMIT 1) as primary_image
+            SELECT {select_sql}
             FROM products p
-            LEFT JOIN categories c ON p.category_id = c.category_id
+            {join_sql}
             WHERE {where_sql}
             ORDER BY p.created_at DESC
             LIMIT %s OFFSET %s
         """, params + [per_page, offset])
         
-        products = []
-        for row in cursor.fetchall():
-            products.append({
-                'product_id': row[0],
-                'sku': row[1],
-                'name': row[2],
-                'slug': row[3],
-                'short_description': row[4],
-                'price': float(row[5]),
-                'compare_at_price': float(row[6]) if row[6] else None,
-                'stock_quantity': row[7],
-                'is_featured': row[8],
-                'brand': row[9],
-                'category_name': row[10],
-                'primary_image': row[11]
-            })
+        products = mapper.all(cursor)
         
         return paginated_response(products, page, per_page, total)
         
@@ -84,64 +169,30 @@ def get_products():
         db.return_connection(conn)
 
 @product_bp.route('/<int:product_id>', methods=['GET'])
+@query_budget(1)
 def get_product(product_id):
+    try:
+        select_sql, join_sql, mapper = PRODUCT_DETAIL_FIELDS.compile(
+            PRODUCT_DETAIL_FIELDS.parse(request.args.get('fields')))
+    except UnknownFields as e:
+        return error_response(str(e))
+    
     conn = db.get_connection()
     cursor = conn.cursor()
     
     try:
-        cursor.execute("""
-            SELECT p.product_id, p.sku, p.name, p.slug, p.description, p.short_description,
-                   p.price, p.compare_at_price, p.stock_quantity, p.brand, p.weight,
-                   p.is_featured, p.meta_title, p.meta_description,
-                   c.name as category_name, c.category_id
+        cursor.execute(f"""
+            SELECT {select_sql}
             FROM products p
-            LEFT JOIN categories c ON p.category_id = c.category_id
+            {join_sql}
             WHERE p.product_id = %s AND p.is_active = TRUE
         """, (product_id,))
         
-        row = cursor.fetchone()
-        if not row:
+        mapper.check(cursor)
+        product = mapper.one(cursor.fetchone())
+        if not product:
             return error_response('Product not found', 404)
         
-        # Get images
-        cursor.execute("""
-            SELECT image_id, image_url, alt_text, is_primary, display_order
-            FROM product_images WHERE product_id = %s ORDER BY display_order
-        """, (product_id,))
-        
-        images = [{'image_id': r[0], 'image_url': r[1], 'alt_text': r[2], 
-                   'is_primary': r[3], 'display_order': r[4]} for r in cursor.fetchall()]
-        
-        # Get variants
-        cursor.execute("""
-            SELECT variant_id, sku, name, price, stock_quantity, attributes
-            FROM product_variants WHERE product_id = %s AND is_active = TRUE
-        """, (product_id,))
-        
-        variants = [{'variant_id': r[0], 'sku': r[1], 'name': r[2], 
-                     'price': float(r[3]) if r[3] else None, 'stock_quantity': r[4],
-                     'attributes': r[5]} for r in cursor.fetchall()]
-        
-        product = {
-            'product_id': row[0],
-            'sku': row[1],
-            'name': row[2],
-            'slug': row[3],
-            'description': row[4],
-            'short_description': row[5],
-            'price': float(row[6]),
-            'compare_at_price': float(row[7]) if row[7] else None,
-            'stock_quantity': row[8],
-            'brand': row[9],
-            'weight': float(row[10]) if row[10] else None,
-            'is_featured': row[11],
-            'meta_title': row[12],
-            'meta_description': row[13],
-            'category': {'name': row[14], 'category_id': row[15]} if row[14] else None,
-            'images': images,
-            'variants': variants
-        }
-        
         return success_response(product)
         
     finally:
@@ -227,9 +278,13 @@ def update_product(product_id):
     cursor = conn.cursor()
     
     try:
-        # Check if product exists
-        cursor.execute("SELECT product_id FROM products WHERE product_id = %s", (product_id,))
-        if not cursor.fetchone():
+        # Check if product exists; lock it so the before/after comparison is exact
+        cursor.execute(
+            "SELECT price, stock_quantity FROM products WHERE product_id = %s FOR UPDATE",
+            (product_id,)
+        )
+        before = cursor.fetchone()
+        if not before:
             return error_response('Product not found', 404)
         
         # Build update query dynamically
@@ -253,8 +308,12 @@ def update_product(product_id):
         update_fields.append("updated_at = CURRENT_TIMESTAMP")
         params.append(product_id)
         
-        query = f"UPDATE products SET {', '.join(update_fields)} WHERE product_id = %s"
+        query = f"""
+            UPDATE products SET {', '.join(update_fields)} WHERE product_id = %s
+            RETURNING price, stock_quantity
+        """
         cursor.execute(query, params)
+        capture_product_change(cursor, product_id, before, cursor.fetchone())
         conn.commit()
         
         return success_response({'product_id': product_id}, 'Product updated successfully')
@@ -1,40 +1,131 @@
 from flask import Blueprint, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from db_connection import db
-from utils.response_utils import success_response, error_response
+from utils.response_utils import success_response, error_response, cursor_response
+from utils.pagination import encode_cursor, decode_cursor, parse_limit
+from utils.auth_utils import admin_required
+from utils.rating_stats import apply_review_delta
+from utils.counter_buffer import CounterBuffer
+from utils.query_stats import query_budget
+from config import Config
 
 review_bp = Blueprint('reviews', __name__)
 
+# Helpful votes are deduplicated in review_votes immediately; the
+# reviews.helpful_count increments are batched by the buffer
+helpful_votes = CounterBuffer('reviews', 'review_id', 'helpful_count',
+                              flush_interval=Config.COUNTER_FLUSH_INTERVAL)
+
+# Sort modes for product reviews: ORDER BY over the page CTE, keyset predicate
+# for "rows after the cursor", and the cursor key columns. Each order matches
+# a partial index on reviews(product_id, ...) WHERE is_approved = TRUE
+# (see migrations/009_review_indexes.py), so a page is an index-only range scan.
+# Every key column is NOT NULL (helpful_count since migration 017): a NULL
+# would sort first and a cursor holding it would match no further rows.
+REVIEW_SORTS = {
+    'newest': (
+        "created_at DESC, review_id DESC",
+        "(created_at, review_id) < (%s::timestamp, %s)",
+        ('created_at', 'review_id')
+    ),
+    'helpful': (
+        "helpful_count DESC, review_id DESC",
+        "(helpful_count, review_id) < (%s, %s)",
+        ('helpful_count', 'review_id')
+    ),
+    'highest': (
+        "rating DESC, created_at DESC, review_id DESC",
+        "(rating, created_at, review_id) < (%s, %s::timestamp, %s)",
+        ('rating', 'created_at', 'review_id')
+    ),
+    'lowest': (
+        "rating ASC, created_at DESC, review_id DESC",
+        "(rating > %s OR (rating = %s AND (created_at, review_id) < (%s::timestamp, %s)))",
+        ('rating', 'created_at', 'review_id')
+    )
+}
+
 @review_bp.route('/product/<int:product_id>', methods=['GET'])
+@query_budget(1)
 def get_product_reviews(product_id):
+    """
+    Approved reviews for a product, keyset-paginated
+    ?sort=newest|helpful|highest|lowest  ?rating=1..5  ?limit=  ?cursor=
+    """
+    sort = request.args.get('sort', 'newest')
+    if sort not in REVIEW_SORTS:
+        return error_response(f'Invalid sort. Must be one of: {", ".join(REVIEW_SORTS)}')
+    order_sql, after_sql, key_columns = REVIEW_SORTS[sort]
+    
+    limit = parse_limit(request.args.get('limit'), default=10, maximum=50)
+    
+    where_clauses = ["product_id = %s", "is_approved = TRUE"]
+    params = [product_id]
+    
+    rating = request.args.get('rating')
+    if rating is not None:
+        if rating not in ('1', '2', '3', '4', '5'):
+            return error_response('Rating filter must be between 1 and 5')
+        where_clauses.append("rating = %s")
+        params.append(int(rating))
+    
+    cursor_param = request.args.get('cursor')
+    if cursor_param:
+        key = decode_cursor(cursor_param, len(key_columns))
+        if key is None:
+            return error_response('Invalid cursor')
+        where_clauses.append(after_sql)
+        # 'lowest' compares rating twice (> and =)
+        params.extend([key[0]] + key if sort == 'lowest' else key)
+    
     conn = db.get_connection()
     cursor = conn.cursor()
     
     try:
-        cursor.execute("""
+        # The page CTE reads only indexed columns; full rows are fetched for
+        # the page alone
+        cursor.execute(f"""
+            WITH page AS (
+                SELECT review_id, rating, helpful_count, created_at
+                FROM reviews
+                WHERE {' AND '.join(where_clauses)}
+                ORDER BY {order_sql}
+                LIMIT %s
+            )
             SELECT r.review_id, r.rating, r.title, r.comment, r.is_verified_purchase,
                    r.helpful_count, r.created_at,
                    u.first_name, u.last_name
-            FROM reviews r
+            FROM page
+            JOIN reviews r ON r.review_id = page.review_id
             LEFT JOIN users u ON r.user_id = u.user_id
-            WHERE r.product_id = %s AND r.is_approved = TRUE
-            ORDER BY r.created_at DESC
-        """, (product_id,))
+            ORDER BY {', '.join('page.' + part for part in order_sql.split(', '))}
+        """, params + [limit + 1])
+        
+        rows = cursor.fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
         
         reviews = []
-        for row in cursor.fetchall():
+        for row in rows:
             reviews.append({
                 'review_id': row[0],
                 'rating': row[1],
                 'title': row[2],
                 'comment': row[3],
                 'is_verified_purchase': row[4],
-                'helpful_count': row[5],
+                'helpful_count': (row[5] or 0) + helpful_votes.pending(row[0]),
                 'created_at': row[6].isoformat(),
                 'reviewer_name': f"{row[7]} {row[8][0]}." if row[7] else "Anonymous"
             })
         
-        return success_response(reviews)
+        next_cursor = None
+        if has_more:
+            last = rows[-1]
+            values = {'review_id': last[0], 'rating': last[1],
+                      'helpful_count': last[5], 'created_at': last[6]}
+            next_cursor = encode_cursor(*(values[column] for column in key_columns))
+        
+        return cursor_response(reviews, next_cursor, limit)
         
     finally:
         cursor.close()
@@ -50,8 +141,10 @@ def create_review():
     if not all(field in data for field in required):
         return error_response('Product ID and rating required')
     
-    if not 1 <= data['rating'] <= 5:
-        return error_response('Rating must be between 1 and 5')
+    # bool is an int subclass: JSON true would otherwise be stored as 1 star
+    rating = data['rating']
+    if isinstance(rating, bool) or not isinstance(rating, int) or not 1 <= rating <= 5:
+        return error_response('Rating must be a whole number between 1 and 5')
     
     conn = db.get_connection()
     cursor = conn.cursor()
@@ -75,6 +168,9 @@ def create_review():
               data.get('title'), data.get('comment'), is_verified))
         
         review_id = cursor.fetchone()[0]
+        
+        # New reviews are approved by default (reviews.is_approved DEFAULT TRUE)
+        apply_review_delta(cursor, data['product_id'], data['rating'], 1)
         conn.commit()
         
         return success_response({'review_id': review_id}, 'Review submitted', 201)
@@ -85,3 +181,146 @@ def create_review():
     finally:
         cursor.close()
         db.return_connection(conn)
+
+@review_bp.route('/<int:review_id>/approval', methods=['PUT'])
+@jwt_required()
+@admin_required()
+def moderate_review(review_id):
+    """Approve or hide a review (admin)"""
+    data = request.get_json()
+    
+    if not isinstance(data.get('is_approved'), bool):
+        return error_response('is_approved (true/false) required')
+    
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("""
+            SELECT product_id, rating, is_approved FROM reviews
+            WHERE review_id = %s FOR UPDATE
+        """, (review_id,))
+        
+        review = cursor.fetchone()
+        if not review:
+            return error_response('Review not found', 404)
+        
+        product_id, rating, was_approved = review
+        
+        if was_approved != data['is_approved']:
+            cursor.execute("""
+                UPDATE reviews SET is_approved = %s, updated_at = CURRENT_TIMESTAMP
+                WHERE review_id = %s
+            """, (data['is_approved'], review_id))
+            
+            apply_review_delta(cursor, product_id, rating, 1 if data['is_approved'] else -1)
+        
+        conn.commit()
+        return success_response({'review_id': review_id, 'is_approved': data['is_approved']},
+                                'Review updated')
+        
+    except Exception as e:
+        conn.rollback()
+        return error_response(str(e), 500)
+    finally:
+        cursor.close()
+        db.return_connection(conn)
+
+@review_bp.route('/<int:review_id>', methods=['DELETE'])
+@jwt_required()
+@admin_required()
+def delete_review(review_id):
+    """Delete a review (admin)"""
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        cursor.execute("""
+            DELETE FROM reviews WHERE review_id = %s
+            RETURNING product_id, rating, is_approved
+        """, (review_id,))
+        
+        review = cursor.fetchone()
+        if not review:
+            return error_response('Review not found', 404)
+        
+        product_id, rating, was_approved = review
+        if was_approved:
+            apply_review_delta(cursor, product_id, rating, -1)
+        
+        conn.commit()
+        return success_response({'review_id': review_id}, 'Review deleted')
+        
+    except Exception as e:
+        conn.rollback()
+        return error_response(str(e), 500)
+    finally:
+        cursor.close()
+        db.return_connection(conn)
+
+@review_bp.route('/<int:review_id>/helpful', methods=['POST'])
+@jwt_required()
+def vote_helpful(review_id):
+    """Mark a review as helpful (once per user)"""
+    return record_helpful_vote(review_id, add=True)
+
+@review_bp.route('/<int:review_id>/helpful', methods=['DELETE'])
+@jwt_required()
+def unvote_helpful(review_id):
+    """Withdraw a helpful vote"""
+    return record_helpful_vote(review_id, add=False)
+
+def record_helpful_vote(review_id, add):
+    user_id = get_jwt_identity()
+    
+    # Convert to int if string
+    if isinstance(user_id, str):
+        user_id = int(user_id)
+    
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        if add:
+            cursor.execute("""
+                INSERT INTO review_votes (review_id, user_id)
+                SELECT review_id, %s FROM reviews
+                WHERE review_id = %s AND is_approved = TRUE
+                ON CONFLICT (review_id, user_id) DO NOTHING
+                RETURNING review_id
+            """, (user_id, review_id))
+        else:
+            cursor.execute("""
+                DELETE FROM review_votes WHERE review_id = %s AND user_id = %s
+                RETURNING review_id
+            """, (review_id, user_id))
+        
+        changed = cursor.fetchone() is not None
+        
+        if add and not changed:
+            cursor.execute("SELECT 1 FROM reviews WHERE review_id = %s AND is_approved = TRUE",
+                           (review_id,))
+            if not cursor.fetchone():
+                return error_response('Review not found', 404)
+        
+        cursor.execute("SELECT COALESCE(helpful_count, 0) FROM reviews WHERE review_id = %s",
+                       (review_id,))
+        row = cursor.fetchone()
+        conn.commit()
+        
+        # Counter update happens in the next batched flush
+        if changed:
+            helpful_votes.add(review_id, 1 if add else -1)
+        
+        return success_response({
+            'review_id': review_id,
+            'voted': add,
+            'helpful_count': (row[0] if row else 0) + helpful_votes.pending(review_id)
+        })
+        
+    except Exception as e:
+        conn.rollback()
+        return error_response(str(e), 500)
+    finally:
+        cursor.close()
+        db.return_connection(conn)
@@ -4,8 +4,11 @@ Customer Support Routes - Telegram Integration
 from flask import Blueprint, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from db_connection import db
-from utils.response_utils import success_response, error_response
+from utils.response_utils import success_response, error_response, cursor_response
+from utils.auth_utils import admin_required
+from utils.pagination import encode_cursor, decode_cursor, parse_limit
 from utils.telegram_service import telegram_service
+from utils import support_rollup
 
 support_bp = Blueprint('support', __name__)
 
@@ -56,6 +59,7 @@ def send_support_message():
         """, (user_id, order_id, message_text))
         
         message_id, created_at = cursor.fetchone()
+        support_rollup.record_customer_message(cursor, user_id, message_id, message_text, created_at)
         conn.commit()
         
         # Send Telegram notification to admin (only if not skipped)
@@ -173,9 +177,10 @@ def telegram_webhook():
         try:
             # Find the original message
             cursor.execute("""
-                SELECT user_id, message_id
+                SELECT user_id, message_id, status
                 FROM support_messages
                 WHERE telegram_message_id = %s AND sender = 'customer'
+                FOR UPDATE
             """, (reply_to_message_id,))
             
             result = cursor.fetchone()
@@ -183,7 +188,7 @@ def telegram_webhook():
                 print(f"⚠️ No customer message found for telegram_message_id: {reply_to_message_id}")
                 return success_response({'ok': True})
             
-            user_id, original_message_id = result
+            user_id, original_message_id, original_status = result
             print(f"✅ Found customer message {original_message_id} for user {user_id}")
             
             # Save admin reply
@@ -191,10 +196,10 @@ def telegram_webhook():
                 INSERT INTO support_messages 
                 (user_id, message_text, sender, status)
                 VALUES (%s, %s, 'admin', 'replied')
-                RETURNING message_id
+                RETURNING message_id, created_at
             """, (user_id, reply_text))
             
-            admin_message_id = cursor.fetchone()[0]
+            admin_message_id, reply_created_at = cursor.fetchone()
             
             # Update original message status
             cursor.execute("""
@@ -203,6 +208,11 @@ def telegram_webhook():
                 WHERE message_id = %s
             """, (original_message_id,))
             
+            support_rollup.record_admin_reply(
+                cursor, user_id, admin_message_id, reply_text, reply_created_at,
+                answered_pending=original_status == 'pending'
+            )
+            
             conn.commit()
             print(f"✅ Admin reply saved with message_id: {admin_message_id}")
             
@@ -245,6 +255,16 @@ def close_support_message(message_id):
     cursor = conn.cursor()
     
     try:
+        cursor.execute("""
+            SELECT status FROM support_messages
+            WHERE message_id = %s AND user_id = %s
+            FOR UPDATE
+        """, (message_id, user_id))
+        
+        current = cursor.fetchone()
+        if not current:
+            return error_response('Message not found', 404)
+        
         cursor.execute("""
             UPDATE support_messages 
             SET status = 'closed', updated_at = CURRENT_TIMESTAMP
@@ -253,9 +273,7 @@ def close_support_message(message_id):
         """, (message_id, user_id))
         
         result = cursor.fetchone()
-        if not result:
-            return error_response('Message not found', 404)
-        
+        support_rollup.record_closed(cursor, user_id, was_pending=current[0] == 'pending')
         conn.commit()
         return success_response({'message_id': result[0]}, 'Conversation closed')
         
@@ -265,3 +283,79 @@ def close_support_message(message_id):
     finally:
         cursor.close()
         db.return_connection(conn)
+
+@support_bp.route('/admin/conversations', methods=['GET'])
+@jwt_required()
+@admin_required()
+def get_support_inbox():
+    """
+    Admin inbox: one row per customer conversation, most recent activity first
+    Keyset-paginated with ?cursor=; ?pending=1 limits to conversations awaiting a reply
+    """
+    limit = parse_limit(request.args.get('limit'), default=20, maximum=100)
+    pending_only = request.args.get('pending') in ('1', 'true')
+    cursor_param = request.args.get('cursor')
+    
+    where_clauses = []
+    params = []
+    
+    if pending_only:
+        where_clauses.append("sc.pending_count > 0")
+    
+    if cursor_param:
+        key = decode_cursor(cursor_param, 2)
+        if key is None:
+            return error_response('Invalid cursor')
+        where_clauses.append("(sc.last_activity_at, sc.user_id) < (%s::timestamp, %s)")
+        params.extend(key)
+    
+    where_sql = f"WHERE {' AND '.join(where_clauses)}" if where_clauses else ""
+    
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        # Fetch one extra row to know whether another page exists
+        cursor.execute(f"""
+            SELECT sc.user_id, u.first_name, u.last_name, u.email,
+                   sc.last_message_id, sc.last_message_text, sc.last_sender,
+                   sc.message_count, sc.pending_count, sc.last_activity_at
+            FROM support_conversations sc
+            JOIN users u ON sc.user_id = u.user_id
+            {where_sql}
+            ORDER BY sc.last_activity_at DESC, sc.user_id DESC
+            LIMIT %s
+        """, params + [limit + 1])
+        
+        rows = cursor.fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
+        
+        conversations = []
+        for row in rows:
+            conversations.append({
+                'user_id': row[0],
+                'customer': {
+                    'first_name': row[1],
+                    'last_name': row[2],
+                    'email': row[3]
+                },
+                'last_message': {
+                    'message_id': row[4],
+                    'message_text': row[5],
+                    'sender': row[6]
+                },
+                'message_count': row[7],
+                'pending_count': row[8],
+                'last_activity_at': row[9].isoformat()
+            })
+        
+        next_cursor = encode_cursor(rows[-1][9], rows[-1][0]) if has_more else None
+        return cursor_response(conversations, next_cursor, limit)
+        
+    except Exception as e:
+        print(f"Error fetching support inbox: {e}")
+        return error_response(str(e), 500)
+    finally:
+        cursor.close()
+        db.return_connection(conn)
@@ -1,15 +1,24 @@
-from flask import Blueprint, request
+from flask import Blueprint, request, current_app, jsonify
 from flask_jwt_extended import jwt_required
 from werkzeug.utils import secure_filename
 import os
-import uuid
+from concurrent.futures import ThreadPoolExecutor
+from db_connection import db
 from utils.response_utils import success_response, error_response
 from utils.auth_utils import admin_required
+from utils.image_pipeline import process_images, save_variants
+from utils.media_store import (store_stream, store_file, record_reference, shard_dir,
+                               FileTooLarge, InvalidFileType)
+from utils import upload_sessions
+from utils.upload_sessions import SessionError
 
 upload_bp = Blueprint('upload', __name__)
 
 # Configure upload settings
 UPLOAD_FOLDER = 'static/uploads'
+UPLOAD_URL_PREFIX = '/static/uploads'
+VARIANT_FOLDER = 'static/uploads/variants'
+VARIANT_URL_PREFIX = '/static/uploads/variants'
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
 MAX_FILE_SIZE = 5 * 1024 * 1024  # 5MB
 
@@ -21,6 +30,71 @@ def ensure_upload_folder():
     if not os.path.exists(UPLOAD_FOLDER):
         os.makedirs(UPLOAD_FOLDER)
 
+def store_upload(stream, max_size=MAX_FILE_SIZE):
+    """Stream one upload into content-addressed storage (type checked by magic bytes)"""
+    return store_stream(stream, UPLOAD_FOLDER, UPLOAD_URL_PREFIX, max_size)
+
+def describe_upload(stored, variants):
+    content_hash, filepath, image_url, size, is_new = stored
+    return {
+        'image_url': image_url,
+        'filename': os.path.basename(filepath),
+        'content_hash': content_hash,
+        'size': size,
+        'duplicate': not is_new,
+        'variants': variants
+    }
+
+def register_uploads(stored):
+    """
+    Record references for stored uploads and make sure each has variants
+    Duplicates reuse the variants already built for their content hash; new
+    files are processed in parallel in the image process pool.
+    stored: list of store_stream results
+    Returns: list of variant dicts (None where unavailable), aligned with stored
+    """
+    if not stored:
+        return []
+    
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        for content_hash, _, image_url, size, _ in stored:
+            record_reference(cursor, content_hash, image_url, size)
+        
+        cursor.execute("""
+            SELECT source_url, variants FROM image_variants WHERE source_url = ANY(%s)
+        """, ([image_url for _, _, image_url, _, _ in stored],))
+        existing = dict(cursor.fetchall())
+        
+        # Same content uploaded twice in one request is processed once
+        pending = list({item[2]: item for item in stored if item[2] not in existing}.values())
+        jobs = [(filepath, os.path.join(VARIANT_FOLDER, shard_dir(content_hash)),
+                 f"{VARIANT_URL_PREFIX}/{shard_dir(content_hash).replace(os.sep, '/')}",
+                 content_hash)
+                for content_hash, filepath, _, _, _ in pending]
+        results = process_images(
+            jobs,
+            max_workers=current_app.config['IMAGE_PROCESS_WORKERS'],
+            timeout=current_app.config['IMAGE_PROCESS_TIMEOUT']
+        )
+        
+        for item, result in zip(pending, results):
+            if result:
+                save_variants(cursor, item[2], result)
+                existing[item[2]] = result['variants']
+        
+        conn.commit()
+    except Exception as e:
+        conn.rollback()
+        print(f"Error registering uploads: {e}")
+    finally:
+        cursor.close()
+        db.return_connection(conn)
+    
+    return [existing.get(image_url) for _, _, image_url, _, _ in stored]
+
 @upload_bp.route('/image', methods=['POST'])
 @jwt_required()
 @admin_required()
@@ -39,30 +113,18 @@ def upload_image():
     if not allowed_file(file.filename):
         return error_response('Invalid file type. Allowed: png, jpg, jpeg, gif, webp')
     
-    # Check file size
-    file.seek(0, os.SEEK_END)
-    file_size = file.tell()
-    file.seek(0)
-    
-    if file_size > MAX_FILE_SIZE:
-        return error_response('File too large. Maximum size: 5MB')
-    
-    # Generate unique filename
-    ext = file.filename.rsplit('.', 1)[1].lower()
-    filename = f"{uuid.uuid4()}.{ext}"
-    filepath = os.path.join(UPLOAD_FOLDER, filename)
-    
     try:
-        file.save(filepath)
+        # Hash, size-check and sniff while copying; identical content is stored once
+        stored = store_upload(file.stream)
+        variants = register_uploads([stored])[0]
         
-        # Return URL (adjust based on your server setup)
-        image_url = f"/static/uploads/{filename}"
-        
-        return success_response({
-            'image_url': image_url,
-            'filename': filename
-        }, 'Image uploaded successfully', 201)
+        return success_response(describe_upload(stored, variants),
+                                'Image uploaded successfully', 201)
         
+    except FileTooLarge:
+        return error_response('File too large. Maximum size: 5MB')
+    except InvalidFileType:
+        return error_response('File content is not a png, jpg, gif or webp image')
     except Exception as e:
         return error_response(f'Upload failed: {str(e)}', 500)
 
@@ -84,6 +146,7 @@ def upload_multiple_images():
     uploaded_images = []
     errors = []
     
+    accepted = []
     for file in files:
         if file.filename == '':
             continue
@@ -92,30 +155,37 @@ def upload_multiple_images():
             errors.append(f'{file.filename}: Invalid file type')
             continue
         
-        # Check file size
-        file.seek(0, os.SEEK_END)
-        file_size = file.tell()
-        file.seek(0)
-        
-        if file_size > MAX_FILE_SIZE:
-            errors.append(f'{file.filename}: File too large')
-            continue
-        
-        # Generate unique filename
-        ext = file.filename.rsplit('.', 1)[1].lower()
-        filename = f"{uuid.uuid4()}.{ext}"
-        filepath = os.path.join(UPLOAD_FOLDER, filename)
-        
+        accepted.append(file)
+    
+    def write(file):
         try:
-            file.save(filepath)
-            image_url = f"/static/uploads/{filename}"
-            uploaded_images.append({
-                'image_url': image_url,
-                'filename': filename,
-                'original_name': file.filename
-            })
+            return store_upload(file.stream), None
+        except FileTooLarge:
+            return None, f'{file.filename}: File too large'
+        except InvalidFileType:
+            return None, f'{file.filename}: Not a valid image'
         except Exception as e:
-            errors.append(f'{file.filename}: {str(e)}')
+            return None, f'{file.filename}: {str(e)}'
+    
+    # Files are written concurrently; each writer holds one chunk in memory
+    workers = max(1, min(len(accepted), current_app.config['UPLOAD_WRITE_WORKERS']))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        results = list(pool.map(write, accepted))
+    
+    stored = []
+    names = []
+    for file, (stored_file, error) in zip(accepted, results):
+        if error:
+            errors.append(error)
+        else:
+            stored.append(stored_file)
+            names.append(file.filename)
+    
+    # Variants for all new files are built in parallel in the image pool
+    for name, stored_file, variants in zip(names, stored, register_uploads(stored)):
+        image = describe_upload(stored_file, variants)
+        image['original_name'] = name
+        uploaded_images.append(image)
     
     if not uploaded_images and errors:
         return error_response('All uploads failed', 400)
@@ -124,3 +194,128 @@ def upload_multiple_images():
         'images': uploaded_images,
         'errors': errors if errors else None
     }, f'{len(uploaded_images)} images uploaded successfully', 201)
+
+@upload_bp.route('/stream', methods=['POST', 'PUT'])
+@jwt_required()
+@admin_required()
+def upload_stream():
+    """
+    Upload one image as the raw request body (no multipart parsing)
+    The body is read straight from the socket in chunks, so it is never
+    spooled or buffered whole; size and magic bytes are checked as it arrives.
+    """
+    ensure_upload_folder()
+    
+    if request.content_length is None:
+        return error_response('Content-Length required', 411)
+    
+    if request.content_length > MAX_FILE_SIZE:
+        return error_response('File too large. Maximum size: 5MB', 413)
+    
+    try:
+        stored = store_upload(request.stream)
+        variants = register_uploads([stored])[0]
+        
+        return success_response(describe_upload(stored, variants),
+                                'Image uploaded successfully', 201)
+        
+    except FileTooLarge:
+        return error_response('File too large. Maximum size: 5MB', 413)
+    except InvalidFileType:
+        return error_response('File content is not a png, jpg, gif or webp image')
+    except Exception as e:
+        return error_response(f'Upload failed: {str(e)}', 500)
+
+# Resumable chunked uploads:
+#   POST   /sessions        {"total_size": n}  -> upload_id
+#   PUT    /sessions/<id>   raw chunk + Content-Range: bytes start-end/total
+#   GET    /sessions/<id>   -> bytes received so far (resume point)
+#   DELETE /sessions/<id>   abort
+
+def session_error_response(e):
+    if e.received is None:
+        return error_response(e.message, e.status)
+    return jsonify({'success': False, 'error': e.message, 'received': e.received}), e.status
+
+@upload_bp.route('/sessions', methods=['POST'])
+@jwt_required()
+@admin_required()
+def create_upload_session():
+    """Start a resumable upload"""
+    data = request.get_json() or {}
+    total_size = data.get('total_size')
+    max_size = current_app.config['UPLOAD_SESSION_MAX_SIZE']
+    
+    if not isinstance(total_size, int) or total_size <= 0:
+        return error_response('total_size (bytes) required')
+    
+    if total_size > max_size:
+        return error_response(f'File too large. Maximum size: {max_size // (1024 * 1024)}MB')
+    
+    folder = current_app.config['UPLOAD_SESSION_FOLDER']
+    upload_id = upload_sessions.create_session(folder, total_size)
+    
+    return success_response({
+        'upload_id': upload_id,
+        'received': 0,
+        'total_size': total_size,
+        'chunk_size': 1024 * 1024
+    }, 'Upload session created', 201)
+
+@upload_bp.route('/sessions/<upload_id>', methods=['GET'])
+@jwt_required()
+@admin_required()
+def get_upload_session(upload_id):
+    """Report how many bytes have been received (where to resume)"""
+    try:
+        received, total_size = upload_sessions.get_status(
+            current_app.config['UPLOAD_SESSION_FOLDER'], upload_id)
+        return success_response({'upload_id': upload_id, 'received': received,
+                                 'total_size': total_size})
+    except SessionError as e:
+        return session_error_response(e)
+
+@upload_bp.route('/sessions/<upload_id>', methods=['PUT'])
+@jwt_required()
+@admin_required()
+def upload_session_chunk(upload_id):
+    """Append one chunk; the last chunk finalizes the upload"""
+    folder = current_app.config['UPLOAD_SESSION_FOLDER']
+    
+    try:
+        start, end, total = upload_sessions.parse_content_range(request.headers.get('Content-Range'))
+        received, total_size = upload_sessions.append_chunk(
+            folder, upload_id, start, end, total, request.stream)
+    except SessionError as e:
+        return session_error_response(e)
+    
+    if received < total_size:
+        return success_response({'upload_id': upload_id, 'received': received,
+                                 'total_size': total_size}, 'Chunk received', 202)
+    
+    ensure_upload_folder()
+    
+    try:
+        part_path = upload_sessions.take_completed(folder, upload_id)
+        stored = store_file(part_path, UPLOAD_FOLDER, UPLOAD_URL_PREFIX,
+                            current_app.config['UPLOAD_SESSION_MAX_SIZE'])
+        variants = register_uploads([stored])[0]
+        
+        return success_response(describe_upload(stored, variants),
+                                'Image uploaded successfully', 201)
+        
+    except InvalidFileType:
+        return error_response('File content is not a png, jpg, gif or webp image')
+    except Exception as e:
+        return error_response(f'Upload failed: {str(e)}', 500)
+
+@upload_bp.route('/sessions/<upload_id>', methods=['DELETE'])
+@jwt_required()
+@admin_required()
+def delete_upload_session(upload_id):
+    """Abort a resumable upload"""
+    try:
+        upload_sessions.discard_session(current_app.config['UPLOAD_SESSION_FOLDER'], upload_id)
+        return success_response(message='Upload session discarded')
+    except SessionError as e:
+        return session_error_response(e)
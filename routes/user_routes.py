@@ -1,61 +1,182 @@
-from flask import Blueprint, request
+import re
+import json
+import secrets
+from datetime import datetime
+from flask import Blueprint, request, Response
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from db_connection import db
-from utils.response_utils import success_response, error_response
+from utils.query_stats import query_budget
+from utils.response_utils import success_response, error_response, cursor_response
 from utils.auth_utils import admin_required
+from utils.pagination import encode_cursor, decode_cursor, parse_limit
+from utils.order_stats import serialize_order_stats
 
 user_bp = Blueprint('users', __name__)
 
+USER_LIST_COLUMNS = """
+    u.user_id, u.email, u.first_name, u.last_name, u.phone, u.role,
+    u.is_active, u.is_verified, u.created_at, u.last_login,
+    s.order_count, s.total_spent, s.last_order_at
+"""
+EXPORT_BATCH_SIZE = 2000
+
+def serialize_user_row(row):
+    return {
+        'user_id': row[0],
+        'email': row[1],
+        'first_name': row[2],
+        'last_name': row[3],
+        'phone': row[4],
+        'role': row[5],
+        'is_active': row[6],
+        'is_verified': row[7],
+        'created_at': row[8].isoformat(),
+        'last_login': row[9].isoformat() if row[9] else None,
+        'order_stats': serialize_order_stats(row[10], row[11], row[12])
+    }
+
+def parse_bool_arg(value):
+    if value is None:
+        return None
+    if value.lower() in ('1', 'true'):
+        return True
+    if value.lower() in ('0', 'false'):
+        return False
+    raise ValueError(f"Invalid boolean: {value}")
+
+def build_user_filters(args):
+    """
+    WHERE clauses for the admin user list and export
+    ?role=, ?is_verified=, ?is_active=, ?created_from= / ?created_to= (ISO dates),
+    ?q= prefix match on email, first or last name (served by the lower(...)
+    text_pattern_ops indexes from migrations/012_user_indexes.py)
+    Raises: ValueError on malformed values
+    """
+    where_clauses = []
+    params = []
+    
+    if args.get('role'):
+        where_clauses.append("u.role = %s")
+        params.append(args['role'])
+    
+    for flag in ('is_verified', 'is_active'):
+        value = parse_bool_arg(args.get(flag))
+        if value is not None:
+            where_clauses.append(f"u.{flag} = %s")
+            params.append(value)
+    
+    if args.get('created_from'):
+        where_clauses.append("u.created_at >= %s")
+        params.append(datetime.fromisoformat(args['created_from']))
+    if args.get('created_to'):
+        where_clauses.append("u.created_at < %s")
+        params.append(datetime.fromisoformat(args['created_to']))
+    
+    search = (args.get('q') or '').strip().lower()
+    if search:
+        # Escape LIKE wildcards so the input is a literal prefix
+        prefix = re.sub(r'([\\%_])', r'\\\1', search) + '%'
+        where_clauses.append(
+            "(lower(u.email) LIKE %s OR lower(u.first_name) LIKE %s OR lower(u.last_name) LIKE %s)"
+        )
+        params.extend([prefix, prefix, prefix])
+    
+    return where_clauses, params
+
 @user_bp.route('', methods=['GET'])
+@query_budget(2)
 @jwt_required()
+@admin_required()
 def get_all_users():
-    """Admin endpoint to get all users"""
-    user_id = get_jwt_identity()
+    """
+    Admin endpoint to list users, newest first
+    Keyset-paginated with ?cursor= and ?limit=; filters: see build_user_filters
+    """
+    limit = parse_limit(request.args.get('limit'), default=50, maximum=200)
     
-    # Convert to int if string
-    if isinstance(user_id, str):
-        user_id = int(user_id)
+    try:
+        where_clauses, params = build_user_filters(request.args)
+    except ValueError as e:
+        return error_response(str(e))
+    
+    cursor_param = request.args.get('cursor')
+    if cursor_param:
+        key = decode_cursor(cursor_param, 2)
+        if key is None:
+            return error_response('Invalid cursor')
+        where_clauses.append("(u.created_at, u.user_id) < (%s::timestamp, %s)")
+        params.extend(key)
+    
+    where_sql = f"WHERE {' AND '.join(where_clauses)}" if where_clauses else ""
     
-    # Check if user is admin
     conn = db.get_connection()
     cursor = conn.cursor()
     
     try:
-        # Verify admin role
-        cursor.execute("SELECT role FROM users WHERE user_id = %s", (user_id,))
-        result = cursor.fetchone()
-        if not result or result[0] != 'admin':
-            return error_response('Admin access required', 403)
+        # Fetch one extra row to know whether another page exists
+        cursor.execute(f"""
+            SELECT {USER_LIST_COLUMNS}
+            FROM users u
+            LEFT JOIN user_order_stats s ON s.user_id = u.user_id
+            {where_sql}
+            ORDER BY u.created_at DESC, u.user_id DESC
+            LIMIT %s
+        """, params + [limit + 1])
         
-        # Get all users
-        cursor.execute("""
-            SELECT user_id, email, first_name, last_name, phone, role, 
-                   is_active, is_verified, created_at, last_login
-            FROM users
-            ORDER BY created_at DESC
-        """)
+        rows = cursor.fetchall()
+        has_more = len(rows) > limit
+        rows = rows[:limit]
         
-        users = []
-        for row in cursor.fetchall():
-            users.append({
-                'user_id': row[0],
-                'email': row[1],
-                'first_name': row[2],
-                'last_name': row[3],
-                'phone': row[4],
-                'role': row[5],
-                'is_active': row[6],
-                'is_verified': row[7],
-                'created_at': row[8].isoformat(),
-                'last_login': row[9].isoformat() if row[9] else None
-            })
+        users = [serialize_user_row(row) for row in rows]
         
-        return success_response(users)
+        next_cursor = encode_cursor(rows[-1][8], rows[-1][0]) if has_more else None
+        return cursor_response(users, next_cursor, limit)
         
     finally:
         cursor.close()
         db.return_connection(conn)
 
+@user_bp.route('/export', methods=['GET'])
+@jwt_required()
+@admin_required()
+def export_users():
+    """
+    Admin export of all matching users as NDJSON (one JSON object per line)
+    Rows are read through a server-side cursor and streamed as they arrive,
+    so memory use does not grow with the number of users.
+    """
+    try:
+        where_clauses, params = build_user_filters(request.args)
+    except ValueError as e:
+        return error_response(str(e))
+    
+    where_sql = f"WHERE {' AND '.join(where_clauses)}" if where_clauses else ""
+    
+    def generate():
+        conn = db.get_connection()
+        cursor = conn.cursor(name=f"users_export_{secrets.token_hex(4)}")
+        cursor.itersize = EXPORT_BATCH_SIZE
+        
+        try:
+            cursor.execute(f"""
+                SELECT {USER_LIST_COLUMNS}
+                FROM users u
+                LEFT JOIN user_order_stats s ON s.user_id = u.user_id
+                {where_sql}
+                ORDER BY u.created_at DESC, u.user_id DESC
+            """, params)
+            
+            for row in cursor:
+                yield json.dumps(serialize_user_row(row)) + '\n'
+        finally:
+            cursor.close()
+            conn.rollback()
+            db.return_connection(conn)
+    
+    return Response(generate(), mimetype='application/x-ndjson', headers={
+        'Content-Disposition': 'attachment; filename=users.ndjson'
+    })
+
 @user_bp.route('/profile', methods=['GET'])
 @jwt_required()
 def get_profile():
@@ -1,11 +1,17 @@
-from flask import Blueprint
+from flask import Blueprint, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from db_connection import db
+from utils.query_stats import query_budget
 from utils.response_utils import success_response, error_response
+from utils.wishlist_cache import WishlistCache, contains
 
 wishlist_bp = Blueprint('wishlist', __name__)
 
+MAX_CONTAINS_IDS = 500
+membership_cache = WishlistCache()
+
 @wishlist_bp.route('', methods=['GET'])
+@query_budget(1)
 @jwt_required()
 def get_wishlist():
     user_id = get_jwt_identity()
@@ -51,13 +57,21 @@ def add_to_wishlist(product_id):
     cursor = conn.cursor()
     
     try:
+        # Bump the version only when a row was added, so other workers'
+        # cached membership sets are refreshed on their next lookup
         cursor.execute("""
-            INSERT INTO wishlist (user_id, product_id)
-            VALUES (%s, %s)
-            ON CONFLICT (user_id, product_id) DO NOTHING
-        """, (user_id, product_id))
+            WITH added AS (
+                INSERT INTO wishlist (user_id, product_id)
+                VALUES (%(user_id)s, %(product_id)s)
+                ON CONFLICT (user_id, product_id) DO NOTHING
+                RETURNING 1
+            )
+            UPDATE users SET wishlist_version = wishlist_version + 1
+            WHERE user_id = %(user_id)s AND EXISTS (SELECT 1 FROM added)
+        """, {'user_id': user_id, 'product_id': product_id})
         
         conn.commit()
+        membership_cache.invalidate(int(user_id))
         return success_response(message='Added to wishlist')
         
     except Exception as e:
@@ -77,12 +91,63 @@ def remove_from_wishlist(product_id):
     
     try:
         cursor.execute("""
-            DELETE FROM wishlist WHERE user_id = %s AND product_id = %s
-        """, (user_id, product_id))
+            WITH removed AS (
+                DELETE FROM wishlist WHERE user_id = %(user_id)s AND product_id = %(product_id)s
+                RETURNING 1
+            )
+            UPDATE users SET wishlist_version = wishlist_version + 1
+            WHERE user_id = %(user_id)s AND EXISTS (SELECT 1 FROM removed)
+        """, {'user_id': user_id, 'product_id': product_id})
         
         conn.commit()
+        membership_cache.invalidate(int(user_id))
         return success_response(message='Removed from wishlist')
         
     finally:
         cursor.close()
         db.return_connection(conn)
+
+@wishlist_bp.route('/contains', methods=['POST'])
+@query_budget(1)
+@jwt_required()
+def wishlist_contains():
+    """Which of the given product IDs are in the user's wishlist (for heart icons)"""
+    user_id = int(get_jwt_identity())
+    data = request.get_json() or {}
+    product_ids = data.get('product_ids')
+    
+    if not isinstance(product_ids, list) or \
+            not all(isinstance(pid, int) and not isinstance(pid, bool) for pid in product_ids):
+        return error_response('product_ids must be a list of integers')
+    
+    if len(product_ids) > MAX_CONTAINS_IDS:
+        return error_response(f'At most {MAX_CONTAINS_IDS} product_ids per request')
+    
+    cached_version, wishlisted = membership_cache.get(user_id)
+    
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    
+    try:
+        # One statement either way: the current version, plus the product IDs
+        # only when this worker's cached set is missing or out of date
+        cursor.execute("""
+            SELECT u.wishlist_version,
+                   CASE WHEN u.wishlist_version IS NOT DISTINCT FROM %(cached)s THEN NULL
+                        ELSE ARRAY(SELECT product_id FROM wishlist WHERE user_id = u.user_id)
+                   END
+            FROM users u WHERE u.user_id = %(user_id)s
+        """, {'user_id': user_id, 'cached': cached_version})
+        row = cursor.fetchone()
+    finally:
+        cursor.close()
+        db.return_connection(conn)
+    
+    if row is None:
+        wishlisted = ()
+    elif row[1] is not None:
+        wishlisted = membership_cache.put(user_id, row[0], row[1])
+    
+    return success_response({
+        'product_ids': [pid for pid in product_ids if contains(wishlisted, pid)]
+    })
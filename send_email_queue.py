@@ -0,0 +1,93 @@
+"""
+Send pending emails from email_queue
+
+Claims batches with FOR UPDATE SKIP LOCKED (several senders can run at once),
+sends each batch over a single SMTP connection and records the outcome.
+Failed sends are retried on later runs up to MAX_ATTEMPTS.
+
+Usage: python send_email_queue.py [--batch 100]
+"""
+import argparse
+from app import app
+from db_connection import db
+from utils.email_service import mail, build_wishlist_alert_email
+
+MAX_ATTEMPTS = 5
+
+def build_message(template, email, first_name, payload):
+    if template == 'wishlist_alert':
+        # Products merged in later the same day can repeat; keep the latest
+        items = {}
+        for item in payload.get('items', []):
+            items[(item['product_id'], item['kind'])] = item
+        return build_wishlist_alert_email(email, first_name, list(items.values()))
+    raise ValueError(f"Unknown email template: {template}")
+
+def send_email_queue(batch_size=100):
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    
+    sent = failed = 0
+    try:
+        with app.app_context():
+            while True:
+                cursor.execute("""
+                    SELECT q.email_id, q.template, q.payload, u.email, u.first_name
+                    FROM email_queue q
+                    JOIN users u ON u.user_id = q.user_id
+                    WHERE q.status = 'pending'
+                    ORDER BY q.email_id
+                    LIMIT %s
+                    FOR UPDATE OF q SKIP LOCKED
+                """, (batch_size,))
+                batch = cursor.fetchall()
+                if not batch:
+                    break
+                
+                results = []
+                with mail.connect() as smtp:
+                    for email_id, template, payload, email, first_name in batch:
+                        try:
+                            smtp.send(build_message(template, email, first_name, payload))
+                            results.append((email_id, None))
+                        except Exception as e:
+                            results.append((email_id, str(e)))
+                
+                sent_ids = [email_id for email_id, error in results if error is None]
+                if sent_ids:
+                    cursor.execute("""
+                        UPDATE email_queue
+                        SET status = 'sent', attempts = attempts + 1, sent_at = CURRENT_TIMESTAMP
+                        WHERE email_id = ANY(%s)
+                    """, (sent_ids,))
+                    sent += len(sent_ids)
+                
+                for email_id, error in results:
+                    if error is not None:
+                        cursor.execute("""
+                            UPDATE email_queue
+                            SET attempts = attempts + 1, last_error = %s,
+                                status = CASE WHEN attempts + 1 >= %s THEN 'failed' ELSE 'pending' END
+                            WHERE email_id = %s
+                        """, (error, MAX_ATTEMPTS, email_id))
+                        failed += 1
+                conn.commit()
+                
+                if failed:
+                    # Don't spin on a broken SMTP server; retry on the next run
+                    break
+        
+        print(f"✅ Sent {sent} emails ({failed} failed)")
+        
+    except Exception as e:
+        conn.rollback()
+        print(f"❌ Error sending queued emails: {e}")
+    finally:
+        cursor.close()
+        db.return_connection(conn)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Send pending queued emails')
+    parser.add_argument('--batch', type=int, default=100)
+    args = parser.parse_args()
+    send_email_queue(args.batch)
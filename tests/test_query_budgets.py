@@ -0,0 +1,67 @@
+"""
+Query budgets of the hot endpoints, asserted through the Flask test client
+
+Needs the database configured in .env with some catalogue data, e.g.
+`python migrate.py && python generate_data.py --scale 0.01`; skipped when
+no database is configured. The order test registers a throwaway customer,
+so point it at a development database.
+"""
+import os
+import secrets
+import pytest
+import config  # loads .env
+
+if not os.getenv('DB_NAME'):
+    pytest.skip('No database configured (DB_NAME)', allow_module_level=True)
+
+pytest_plugins = ['utils.query_budget_plugin']
+
+@pytest.fixture(scope='module')
+def product_id(app):
+    response = app.test_client().get('/api/products?per_page=1&fields=product_id,stock_quantity')
+    products = response.get_json()['data']
+    if not products:
+        pytest.skip('No active products in the database')
+    return products[0]['product_id']
+
+@pytest.fixture
+def customer(app, product_id):
+    """Access token and shipping address of a new customer with one cart line"""
+    client = app.test_client()
+    response = client.post('/api/auth/register', json={
+        'email': f'budget-{secrets.token_hex(6)}@example.test',
+        'password': 'budget-test-password',
+        'first_name': 'Budget',
+        'last_name': 'Test'
+    })
+    assert response.status_code == 201, response.get_json()
+    headers = {'Authorization': f"Bearer {response.get_json()['data']['access_token']}"}
+
+    response = client.post('/api/users/addresses', headers=headers, json={
+        'full_name': 'Budget Test', 'address_line1': '1 Test Street',
+        'city': 'Testville', 'postal_code': '00000', 'country': 'Testland'
+    })
+    assert response.status_code == 201, response.get_json()
+    address_id = response.get_json()['data']['address_id']
+
+    response = client.post('/api/cart', headers=headers, json={'product_id': product_id})
+    assert response.status_code == 200, response.get_json()
+    return headers, address_id
+
+def test_product_list(query_budget):
+    response = query_budget.get('/api/products?per_page=50', max_queries=2)
+    assert response.status_code == 200
+
+def test_product_list_declared_budget(query_budget):
+    response = query_budget.get('/api/products?per_page=50&fields=name,price,primary_image')
+    assert response.status_code == 200
+
+def test_product_detail(query_budget, product_id):
+    response = query_budget.get(f'/api/products/{product_id}', max_queries=1)
+    assert response.status_code == 200
+
+def test_create_order(query_budget, customer):
+    headers, address_id = customer
+    response = query_budget.post('/api/orders', headers=headers, max_queries=8,
+                                 json={'shipping_address_id': address_id})
+    assert response.status_code == 201, response.get_json()
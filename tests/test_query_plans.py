@@ -0,0 +1,133 @@
+"""
+The hot route queries are served by their intended indexes
+
+Each case calls the real endpoint through the Flask test client, captures
+the SQL it sent (parameters bound) with track_queries(capture_sql=True),
+runs EXPLAIN (FORMAT JSON) on the statement of interest and asserts the
+expected index appears in the plan. A route changing its query shape in a
+way the index cannot serve therefore fails here.
+
+Needs the database configured in .env, seeded and migrated
+(`python migrate.py && python generate_data.py --scale 0.01`); skipped when
+no database is configured. None of the requests change data: the cart case
+posts a nonexistent product (the insert fails its foreign key) and the
+Telegram case replies to an unknown message.
+
+On a small dataset PostgreSQL rightly prefers sequential scans, so they are
+disabled for the EXPLAIN: the test then proves the index *can* serve the
+query shape (filter + order). Set QUERY_PLANS_STRICT=1 on a
+production-sized copy to check the planner picks it on its own.
+"""
+import os
+import pytest
+import config  # loads .env
+
+if not os.getenv('DB_NAME'):
+    pytest.skip('No database configured (DB_NAME)', allow_module_level=True)
+
+from flask_jwt_extended import create_access_token
+from db_connection import db
+from utils.query_stats import track_queries
+
+pytest_plugins = ['utils.query_budget_plugin']
+
+STRICT = os.getenv('QUERY_PLANS_STRICT') == '1'
+
+# name, method, path, json body, token ('user', 'admin' or None),
+# text identifying the statement, acceptable indexes
+PLAN_CASES = [
+    ('products list', 'GET', '/api/products', None, None,
+     'ORDER BY p.created_at DESC', ['idx_products_active_created']),
+    ('products by category', 'GET', '/api/products?category_id={category_id}', None, None,
+     'ORDER BY p.created_at DESC', ['idx_products_active_category_created']),
+    ('featured products', 'GET', '/api/products?is_featured=1', None, None,
+     'ORDER BY p.created_at DESC', ['idx_products_featured_created']),
+    ('customer orders', 'GET', '/api/orders', None, 'user',
+     'FROM orders o WHERE o.user_id', ['idx_orders_user_created']),
+    ('admin orders by status', 'GET', '/api/orders/admin/all?status=pending', None, 'admin',
+     'ORDER BY o.created_at DESC', ['idx_orders_status_created']),
+    ('order status history', 'GET', '/api/orders/admin/{order_id}', None, 'admin',
+     'FROM order_status_history', ['idx_order_history_order_created']),
+    ('product reviews (newest)', 'GET', '/api/reviews/product/{product_id}', None, None,
+     'WITH page AS', ['idx_reviews_newest']),
+    # the UNIQUE(user_id, product_id, variant_id) constraint's index
+    ('cart existence check', 'POST', '/api/cart', {'product_id': 0}, 'user',
+     'SELECT cart_id, quantity FROM cart', ['cart_user_id_product_id_variant_id_key']),
+    ('support conversation', 'GET', '/api/support/messages', None, 'user',
+     'FROM support_messages WHERE user_id', ['idx_support_user_created']),
+    ('telegram reply lookup', 'POST', '/api/support/webhook',
+     {'message': {'reply_to_message': {'message_id': -1}, 'text': 'plan check'}}, None,
+     'WHERE telegram_message_id =', ['idx_support_telegram_message']),
+]
+
+SAMPLES = {
+    'user': "SELECT user_id FROM users ORDER BY user_id LIMIT 1",
+    'admin': "SELECT user_id FROM users WHERE role = 'admin' ORDER BY user_id LIMIT 1",
+    'category_id': "SELECT category_id FROM products WHERE category_id IS NOT NULL LIMIT 1",
+    'order_id': "SELECT order_id FROM order_status_history LIMIT 1",
+    'product_id': "SELECT product_id FROM reviews WHERE is_approved = TRUE LIMIT 1",
+}
+
+def plan_indexes(plan):
+    """All index names used anywhere in an EXPLAIN JSON plan tree"""
+    found = set()
+    if 'Index Name' in plan:
+        found.add(plan['Index Name'])
+    for child in plan.get('Plans', []):
+        found |= plan_indexes(child)
+    return found
+
+def explain(sql):
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    try:
+        if not STRICT:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        cursor.execute("EXPLAIN (FORMAT JSON) " + sql)
+        return cursor.fetchone()[0][0]['Plan']
+    finally:
+        conn.rollback()
+        cursor.close()
+        db.return_connection(conn)
+
+@pytest.fixture(scope='module')
+def samples(app):
+    """Real IDs for the path placeholders and tokens; None where the table is empty"""
+    values = {}
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    try:
+        for name, sql in SAMPLES.items():
+            cursor.execute(sql)
+            row = cursor.fetchone()
+            values[name] = row[0] if row else None
+    finally:
+        conn.rollback()
+        cursor.close()
+        db.return_connection(conn)
+    return values
+
+@pytest.mark.parametrize('name, method, path, body, token, marker, expected', PLAN_CASES,
+                         ids=[case[0] for case in PLAN_CASES])
+def test_query_plan(app, samples, name, method, path, body, token, marker, expected):
+    needed = [key for key in SAMPLES if '{' + key + '}' in path] + ([token] if token else [])
+    missing = [key for key in needed if samples[key] is None]
+    if missing:
+        pytest.skip(f"No sample rows for {', '.join(missing)}")
+
+    headers = {}
+    if token:
+        with app.app_context():
+            headers['Authorization'] = f"Bearer {create_access_token(identity=str(samples[token]))}"
+
+    with track_queries(capture_sql=True) as log:
+        app.test_client().open(path.format(**samples), method=method, headers=headers, json=body)
+
+    statements = [sql for sql in log.executed if marker in ' '.join(sql.split())]
+    if not statements:
+        pytest.fail(f"{method} {path} ran no statement containing {marker!r}\n{log.summary()}")
+
+    used = plan_indexes(explain(statements[0]))
+    assert used & set(expected), (
+        f"{name}: expected {' or '.join(expected)}, plan uses "
+        f"{', '.join(sorted(used)) or 'no index'}\n{statements[0]}")
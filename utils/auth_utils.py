@@ -1,9 +1,14 @@
 import bcrypt
 from functools import wraps
+from contextlib import contextmanager
+from contextvars import ContextVar
 from flask import jsonify
 from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
 from db_connection import db
 
+# user_id -> role while cached_roles() is active (one /api/batch)
+_role_cache = ContextVar('role_cache', default=None)
+
 def hash_password(password):
     """Hash a password using bcrypt"""
     return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
@@ -12,6 +17,34 @@ def verify_password(password, hashed):
     """Verify a password against its hash"""
     return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
 
+def get_user_role(user_id):
+    """Role of a user, or None when the user does not exist"""
+    cache = _role_cache.get()
+    if cache is not None and user_id in cache:
+        return cache[user_id]
+    
+    conn = db.get_connection()
+    cursor = conn.cursor()
+    cursor.execute("SELECT role FROM users WHERE user_id = %s", (user_id,))
+    result = cursor.fetchone()
+    cursor.close()
+    db.return_connection(conn)
+    
+    role = result[0] if result else None
+    if cache is not None:
+        cache[user_id] = role
+    return role
+
+@contextmanager
+def cached_roles():
+    """Look each user's role up once for everything run in this context
+    (used by /api/batch, whose admin sub-requests share one caller)"""
+    token = _role_cache.set({})
+    try:
+        yield
+    finally:
+        _role_cache.reset(token)
+
 def admin_required():
     """Decorator to require admin role"""
     def wrapper(fn):
@@ -24,14 +57,7 @@ def admin_required():
             if isinstance(user_id, str):
                 user_id = int(user_id)
             
-            conn = db.get_connection()
-            cursor = conn.cursor()
-            cursor.execute("SELECT role FROM users WHERE user_id = %s", (user_id,))
-            result = cursor.fetchone()
-            cursor.close()
-            db.return_connection(conn)
-            
-            if not result or result[0] != 'admin':
+            if get_user_role(user_id) != 'admin':
                 return jsonify({'error': 'Admin access required'}), 403
             
             return fn(*args, **kwargs)
@@ -0,0 +1,131 @@
+"""
+Response compression
+
+JSON and text responses of at least COMPRESSION_MIN_SIZE bytes are
+compressed with brotli (when the brotli package is installed and the client
+accepts br) or gzip, at levels chosen for CPU rather than ratio (gzip 5,
+brotli 4: most of the size reduction for a fraction of the time of the
+maximum levels). Streamed bodies, range/partial responses and anything that
+already has a Content-Encoding (precompressed media) are left alone.
+
+Compressed bodies are kept in a byte-bounded LRU keyed by the SHA-1 of the
+uncompressed body and the encoding, so a hot response (the first product
+page, a category listing) is compressed once per worker and later hits cost
+a hash instead of a compression. COMPRESSION_CACHE_BYTES=0 disables it.
+"""
+import gzip
+import hashlib
+import threading
+from collections import OrderedDict
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    'application/json', 'application/javascript', 'application/xml',
+    'application/x-ndjson', 'image/svg+xml',
+}
+
+def is_compressible(mimetype):
+    return mimetype in COMPRESSIBLE_MIMETYPES or (mimetype or '').startswith('text/')
+
+class CompressedCache:
+    """LRU of compressed bodies, bounded by their total size"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            body = self._entries.get(key)
+            if body is not None:
+                self._entries.move_to_end(key)
+            return body
+
+    def put(self, key, body):
+        if len(body) > self.max_bytes:
+            return
+        with self._lock:
+            if key in self._entries:
+                return
+            self._entries[key] = body
+            self._size += len(body)
+            while self._size > self.max_bytes:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= len(evicted)
+
+class Compressor:
+    def __init__(self, min_size=1024, gzip_level=5, brotli_quality=4, cache_bytes=0):
+        self.min_size = min_size
+        self.gzip_level = gzip_level
+        self.brotli_quality = brotli_quality
+        self.cache = CompressedCache(cache_bytes) if cache_bytes > 0 else None
+
+    def choose_encoding(self, accept_encodings):
+        if brotli is not None and accept_encodings['br']:
+            return 'br'
+        if accept_encodings['gzip']:
+            return 'gzip'
+        return None
+
+    def compress(self, body, encoding):
+        if encoding == 'br':
+            return brotli.compress(body, quality=self.brotli_quality)
+        return gzip.compress(body, compresslevel=self.gzip_level, mtime=0)
+
+    def compressed(self, body, encoding):
+        if self.cache is None:
+            return self.compress(body, encoding)
+        key = (hashlib.sha1(body).digest(), encoding)
+        cached = self.cache.get(key)
+        if cached is None:
+            cached = self.compress(body, encoding)
+            self.cache.put(key, cached)
+        return cached
+
+    def should_compress(self, response):
+        return (200 <= response.status_code < 300 and response.status_code not in (204, 206)
+                and not response.direct_passthrough
+                and not response.is_streamed
+                and 'Content-Encoding' not in response.headers
+                and is_compressible(response.mimetype))
+
+def init_compression(app):
+    """Compress eligible responses; register after the other after_request
+    hooks so it runs first and metrics see the bytes actually sent"""
+    from flask import request
+
+    if not app.config.get('COMPRESSION_ENABLED', True):
+        return
+
+    compressor = Compressor(
+        min_size=app.config.get('COMPRESSION_MIN_SIZE', 1024),
+        gzip_level=app.config.get('COMPRESSION_GZIP_LEVEL', 5),
+        brotli_quality=app.config.get('COMPRESSION_BROTLI_QUALITY', 4),
+        cache_bytes=app.config.get('COMPRESSION_CACHE_BYTES', 0),
+    )
+
+    @app.after_request
+    def compress_response(response):
+        if not compressor.should_compress(response):
+            return response
+        response.vary.add('Accept-Encoding')
+        encoding = compressor.choose_encoding(request.accept_encodings)
+        if encoding is None:
+            return response
+        body = response.get_data()
+        if len(body) < compressor.min_size:
+            return response
+
+        response.set_data(compressor.compressed(body, encoding))
+        response.headers['Content-Encoding'] = encoding
+        etag, weak = response.get_etag()
+        if etag and not weak:
+            # The compressed body is a different representation
+            response.set_etag(etag, weak=True)
+        return response
@@ -0,0 +1,87 @@
+"""
+In-process buffer for hot counters
+
+Increments are accumulated per row in memory and written by a background
+thread as one batched UPDATE ... FROM (VALUES ...) every few seconds, so a
+burst of clicks on one popular row costs one row update per interval
+instead of one per click. Rows are updated in key order to avoid deadlocks
+between workers flushing at the same time.
+
+Deltas not yet flushed are lost if the process is killed; counters that
+matter should be recomputable from a source-of-truth table.
+"""
+import os
+import time
+import atexit
+import threading
+from psycopg2.extras import execute_values
+from db_connection import db
+
+class CounterBuffer:
+    def __init__(self, table, key_column, counter_column, flush_interval=5):
+        self.table = table
+        self.key_column = key_column
+        self.counter_column = counter_column
+        self.flush_interval = flush_interval
+        self._deltas = {}
+        self._lock = threading.Lock()
+        self._thread = None
+        self._pid = None
+
+    def add(self, key, delta=1):
+        with self._lock:
+            self._deltas[key] = self._deltas.get(key, 0) + delta
+        self._ensure_flusher()
+
+    def pending(self, key):
+        """Delta for key that has not been written yet (this process only)"""
+        return self._deltas.get(key, 0)
+
+    def _ensure_flusher(self):
+        # Started lazily so each forked gunicorn worker gets its own thread
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, daemon=True,
+                                            name=f'{self.table}-{self.counter_column}-flusher')
+            self._thread.start()
+            atexit.register(self.flush)
+
+    def _run(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        """Write all pending deltas in one statement; returns rows updated"""
+        with self._lock:
+            deltas, self._deltas = self._deltas, {}
+        batch = sorted((key, delta) for key, delta in deltas.items() if delta)
+        if not batch:
+            return 0
+
+        conn = db.get_connection()
+        cursor = conn.cursor()
+        try:
+            execute_values(cursor, f"""
+                UPDATE {self.table} t
+                SET {self.counter_column} = GREATEST(COALESCE(t.{self.counter_column}, 0) + v.delta, 0)
+                FROM (VALUES %s) AS v(key, delta)
+                WHERE t.{self.key_column} = v.key
+            """, batch, page_size=1000)
+            conn.commit()
+            return len(batch)
+        except Exception as e:
+            conn.rollback()
+            print(f"Error flushing {self.table}.{self.counter_column}: {e}")
+            # Put the deltas back so the next flush retries them
+            with self._lock:
+                for key, delta in batch:
+                    self._deltas[key] = self._deltas.get(key, 0) + delta
+            return 0
+        finally:
+            cursor.close()
+            db.return_connection(conn)
@@ -1,5 +1,6 @@
 from flask_mail import Mail, Message
 from flask import current_app
+import html
 import random
 import string
 
@@ -184,3 +185,53 @@ def send_welcome_email(email, first_name):
     except Exception as e:
         print(f"Error sending welcome email: {e}")
         return False
+
+def build_wishlist_alert_email(email, first_name, items):
+    """
+    Build (not send) the daily wishlist alert; send_email_queue.py sends a
+    batch of these over one SMTP connection
+    items: [{'product_id', 'name', 'slug', 'kind', 'price', 'old_price'}]
+    """
+    rows = []
+    lines = []
+    for item in items:
+        if item['kind'] == 'back_in_stock':
+            note = 'is back in stock'
+        else:
+            # Prices come back from jsonb as floats (19.9); always show cents
+            note = f"dropped from ${float(item['old_price']):.2f} to ${float(item['price']):.2f}"
+        # Names are admin-entered; never let markup in them reach the inbox
+        rows.append(f"<li><strong>{html.escape(item['name'])}</strong> {note}</li>")
+        lines.append(f"- {item['name']} {note}")
+    
+    msg = Message(
+        subject='Items on your KStore wishlist have updates',
+        recipients=[email],
+        sender=current_app.config['MAIL_DEFAULT_SENDER']
+    )
+    
+    msg.html = f"""
+    <!DOCTYPE html>
+    <html>
+    <body style="font-family: Arial, sans-serif; line-height: 1.6; color: #333;">
+        <div style="max-width: 600px; margin: 0 auto; padding: 20px;">
+            <h2>Hi {html.escape(first_name or 'there')},</h2>
+            <p>Good news about products on your wishlist:</p>
+            <ul>{''.join(rows)}</ul>
+            <p>Happy Shopping! 🛍️</p>
+        </div>
+    </body>
+    </html>
+    """
+    
+    msg.body = f"""
+    Hi {first_name or 'there'},
+    
+    Good news about products on your wishlist:
+    
+    {chr(10).join(lines)}
+    
+    Happy Shopping!
+    """
+    
+    return msg
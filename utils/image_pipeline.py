@@ -0,0 +1,129 @@
+"""
+Image processing pipeline for product uploads
+
+Each uploaded original is resized into thumbnail, card and zoom variants and
+re-encoded as WebP (plus AVIF when Pillow supports it) with a JPEG/PNG
+fallback. Encoding is CPU-bound, so it runs in a bounded process pool that
+is created lazily in each gunicorn worker.
+"""
+import os
+import json
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor, wait
+from PIL import Image, ImageOps, features
+
+# name -> longest edge in pixels (never upscaled)
+VARIANT_SIZES = {
+    'thumbnail': 150,
+    'card': 480,
+    'zoom': 1600
+}
+
+WEBP_QUALITY = 80
+AVIF_QUALITY = 55
+JPEG_QUALITY = 82
+
+_executor = None
+
+def get_executor(max_workers):
+    """Return the per-process image pool, creating it on first use"""
+    global _executor
+    if _executor is None:
+        _executor = ProcessPoolExecutor(
+            max_workers=max_workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            max_tasks_per_child=200
+        )
+    return _executor
+
+def shutdown_executor():
+    global _executor
+    if _executor is not None:
+        _executor.shutdown(wait=False, cancel_futures=True)
+        _executor = None
+
+def _save(image, path, fmt):
+    if fmt == 'webp':
+        image.save(path, 'WEBP', quality=WEBP_QUALITY, method=4)
+    elif fmt == 'avif':
+        image.save(path, 'AVIF', quality=AVIF_QUALITY)
+    elif fmt == 'png':
+        image.save(path, 'PNG', optimize=True)
+    else:
+        image.save(path, 'JPEG', quality=JPEG_QUALITY, optimize=True, progressive=True)
+
+def generate_variants(source_path, output_dir, url_prefix, basename):
+    """
+    Build all size/format variants for one image (runs in a pool worker)
+    Returns: {'width', 'height', 'variants': {size: {'width', 'height', fmt: url}}}
+    """
+    os.makedirs(output_dir, exist_ok=True)
+
+    with Image.open(source_path) as original:
+        original.seek(0)  # first frame of animated GIF/WebP
+        image = ImageOps.exif_transpose(original)
+        has_alpha = image.mode in ('RGBA', 'LA') or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    width, height = image.size
+    fallback = 'png' if has_alpha else 'jpg'
+    formats = ['webp', fallback]
+    if features.check('avif'):
+        formats.insert(0, 'avif')
+
+    variants = {}
+    full_size = None
+    for size_name, max_edge in VARIANT_SIZES.items():
+        resized = image
+        if max(width, height) > max_edge:
+            resized = image.copy()
+            resized.thumbnail((max_edge, max_edge), Image.LANCZOS)
+        elif full_size is not None:
+            # Smaller than this size too: reuse the full-size encodes
+            variants[size_name] = full_size
+            continue
+
+        entry = {'width': resized.width, 'height': resized.height}
+        for fmt in formats:
+            filename = f"{basename}_{size_name}.{fmt}"
+            _save(resized, os.path.join(output_dir, filename), fmt)
+            entry[fmt] = f"{url_prefix}/{filename}"
+        variants[size_name] = entry
+        if resized is image:
+            full_size = entry
+
+    return {'width': width, 'height': height, 'variants': variants}
+
+def process_images(jobs, max_workers, timeout):
+    """
+    Run generate_variants for several uploads concurrently
+    jobs: list of (source_path, output_dir, url_prefix, basename)
+    Returns: list of results aligned with jobs (None where processing failed)
+    """
+    if not jobs:
+        return []
+
+    executor = get_executor(max_workers)
+    futures = [executor.submit(generate_variants, *job) for job in jobs]
+    wait(futures, timeout=timeout)
+
+    results = []
+    for future in futures:
+        if future.done() and future.exception() is None:
+            results.append(future.result())
+        else:
+            future.cancel()
+            print(f"Image processing failed: {future.exception() if future.done() else 'timeout'}")
+            results.append(None)
+    return results
+
+def save_variants(cursor, image_url, result):
+    """Record generated variants for an uploaded image URL"""
+    cursor.execute("""
+        INSERT INTO image_variants (source_url, width, height, variants)
+        VALUES (%s, %s, %s, %s)
+        ON CONFLICT (source_url) DO UPDATE SET
+            width = EXCLUDED.width,
+            height = EXCLUDED.height,
+            variants = EXCLUDED.variants
+    """, (image_url, result['width'], result['height'], json.dumps(result['variants'])))
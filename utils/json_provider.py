@@ -0,0 +1,54 @@
+"""
+orjson-backed JSON provider for Flask
+
+Replaces the stdlib encoder behind jsonify(), request.get_json() and
+app.json. orjson serializes datetime, date, time and UUID natively (ISO
+8601, the same text .isoformat() gives), so handlers can pass database
+values through unconverted. Decimal is written as a JSON number by default,
+or as a string with JSON_DECIMAL_AS='string' for clients that must not
+lose precision.
+
+Keys are not sorted (Flask's default provider sorts them); non-string keys
+such as ints are converted to strings. Responses are indented in debug mode.
+"""
+from decimal import Decimal
+import orjson
+from flask.json.provider import JSONProvider
+
+class OrjsonProvider(JSONProvider):
+    decimal_as = 'number'
+
+    def _default(self, obj):
+        if isinstance(obj, Decimal):
+            return str(obj) if self.decimal_as == 'string' else float(obj)
+        if isinstance(obj, (set, frozenset)):
+            return list(obj)
+        if hasattr(obj, '__html__'):
+            return str(obj.__html__())
+        raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+    def dumps_bytes(self, obj, indent=False, sort_keys=False):
+        """Serialize straight to UTF-8 bytes (what a response body needs)"""
+        option = orjson.OPT_NON_STR_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, default=self._default, option=option)
+
+    def dumps(self, obj, **kwargs):
+        return self.dumps_bytes(obj, indent=bool(kwargs.get('indent')),
+                                sort_keys=kwargs.get('sort_keys', False)).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        body = self.dumps_bytes(obj, indent=self._app.debug)
+        return self._app.response_class(body, mimetype='application/json')
+
+def init_json_provider(app):
+    provider = OrjsonProvider(app)
+    provider.decimal_as = app.config.get('JSON_DECIMAL_AS', 'number')
+    app.json = provider
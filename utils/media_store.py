@@ -0,0 +1,146 @@
+"""
+Content-addressed storage for uploaded media
+
+Files are stored once under their SHA-256 in a two-level sharded layout
+(static/uploads/ab/cd/abcd....jpg), so the same image uploaded many times
+is written once and always gets the same URL. media_files keeps a
+reference count per hash for garbage collection (see gc_uploads.py).
+
+Data is copied in fixed-size chunks while it is hashed, size-checked and
+sniffed for a known image signature, so memory use per upload does not
+depend on the file size.
+"""
+import os
+import shutil
+import hashlib
+import tempfile
+
+CHUNK_SIZE = 64 * 1024
+SNIFF_SIZE = 12
+
+class FileTooLarge(Exception):
+    pass
+
+class InvalidFileType(Exception):
+    pass
+
+def detect_image_type(head):
+    """Return the file extension for an image signature, or None"""
+    if head.startswith(b'\xff\xd8\xff'):
+        return 'jpg'
+    if head.startswith(b'\x89PNG\r\n\x1a\n'):
+        return 'png'
+    if head[:6] in (b'GIF87a', b'GIF89a'):
+        return 'gif'
+    if head[:4] == b'RIFF' and head[8:12] == b'WEBP':
+        return 'webp'
+    return None
+
+def shard_dir(content_hash):
+    """Relative shard directory for a hash: 'ab/cd'"""
+    return os.path.join(content_hash[:2], content_hash[2:4])
+
+def _read_head(stream):
+    """Read at least SNIFF_SIZE bytes (unless the stream ends first)"""
+    head = b''
+    while len(head) < SNIFF_SIZE:
+        chunk = stream.read(CHUNK_SIZE)
+        if not chunk:
+            break
+        head += chunk
+    return head
+
+def _place(tmp_path, content_hash, ext, upload_folder, url_prefix):
+    """Move a fully written temp file to its content-addressed path"""
+    relative = os.path.join(shard_dir(content_hash), f"{content_hash}.{ext}")
+    filepath = os.path.join(upload_folder, relative)
+
+    if os.path.exists(filepath):
+        os.remove(tmp_path)
+        is_new = False
+    else:
+        os.makedirs(os.path.dirname(filepath), exist_ok=True)
+        shutil.move(tmp_path, filepath)
+        is_new = True
+
+    url = f"{url_prefix}/{relative.replace(os.sep, '/')}"
+    return filepath, url, is_new
+
+def store_stream(stream, upload_folder, url_prefix, max_size):
+    """
+    Validate, hash and copy a stream into content-addressed storage in one pass
+    Returns: (content_hash, filepath, url, size, is_new)
+    Raises: FileTooLarge, InvalidFileType
+    """
+    hasher = hashlib.sha256()
+
+    head = _read_head(stream)
+    ext = detect_image_type(head)
+    if ext is None:
+        raise InvalidFileType()
+    size = len(head)
+    if size > max_size:
+        raise FileTooLarge()
+
+    # Write to a temp file in the upload folder so the final rename is atomic
+    fd, tmp_path = tempfile.mkstemp(dir=upload_folder, suffix='.part')
+    try:
+        with os.fdopen(fd, 'wb') as tmp:
+            hasher.update(head)
+            tmp.write(head)
+            while True:
+                chunk = stream.read(CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise FileTooLarge()
+                hasher.update(chunk)
+                tmp.write(chunk)
+
+        filepath, url, is_new = _place(tmp_path, hasher.hexdigest(), ext,
+                                       upload_folder, url_prefix)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return hasher.hexdigest(), filepath, url, size, is_new
+
+def store_file(tmp_path, upload_folder, url_prefix, max_size):
+    """
+    Move an already assembled file (e.g. a finished upload session) into
+    content-addressed storage; the file is consumed
+    Returns/Raises: same as store_stream
+    """
+    hasher = hashlib.sha256()
+    size = os.path.getsize(tmp_path)
+    try:
+        if size > max_size:
+            raise FileTooLarge()
+        with open(tmp_path, 'rb') as f:
+            ext = detect_image_type(f.read(SNIFF_SIZE))
+            if ext is None:
+                raise InvalidFileType()
+            f.seek(0)
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b''):
+                hasher.update(chunk)
+
+        filepath, url, is_new = _place(tmp_path, hasher.hexdigest(), ext,
+                                       upload_folder, url_prefix)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+    return hasher.hexdigest(), filepath, url, size, is_new
+
+def record_reference(cursor, content_hash, url, size):
+    """Register one more reference to a stored file"""
+    cursor.execute("""
+        INSERT INTO media_files (content_hash, url, size_bytes, ref_count)
+        VALUES (%s, %s, %s, 1)
+        ON CONFLICT (content_hash) DO UPDATE SET
+            ref_count = media_files.ref_count + 1,
+            last_referenced_at = CURRENT_TIMESTAMP
+    """, (content_hash, url, size))
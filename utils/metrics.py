@@ -0,0 +1,243 @@
+"""
+Request metrics in Prometheus text format
+
+Per request the app records latency, SQL time and statement count (from
+utils/query_stats.py), time spent waiting for a pooled connection and the
+response size, labelled by blueprint, endpoint and method, plus a request
+counter by status code for error rates. GET /metrics renders them in the
+Prometheus text exposition format.
+
+Each process accumulates into its own in-memory registry. With METRICS_DIR
+set, a background thread writes the registry to <dir>/<pid>-<start>.json
+every few seconds (atomically, via rename) and /metrics merges every file
+in the directory, so a scrape covers all gunicorn workers. Files of exited
+workers are kept so counters never go backwards; empty the directory before
+starting the server. Without METRICS_DIR only the answering process is
+reported, which is what the development server needs.
+"""
+import os
+import json
+import time
+import atexit
+import tempfile
+import threading
+from bisect import bisect_left
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+POOL_WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+SIZE_BUCKETS = (256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304)
+
+ENDPOINT_LABELS = ('blueprint', 'endpoint', 'method')
+
+# name: (type, help, label names, buckets)
+METRICS = {
+    'http_requests_total': (
+        'counter', 'Requests handled, by response status',
+        ENDPOINT_LABELS + ('status',), None),
+    'http_request_duration_seconds': (
+        'histogram', 'Time from request start to response', ENDPOINT_LABELS, LATENCY_BUCKETS),
+    'http_request_db_seconds': (
+        'histogram', 'Time spent executing SQL per request', ENDPOINT_LABELS, LATENCY_BUCKETS),
+    'http_request_db_queries': (
+        'histogram', 'SQL statements executed per request', ENDPOINT_LABELS, QUERY_COUNT_BUCKETS),
+    'http_request_pool_wait_seconds': (
+        'histogram', 'Time spent acquiring pooled connections per request',
+        ENDPOINT_LABELS, POOL_WAIT_BUCKETS),
+    'http_response_size_bytes': (
+        'histogram', 'Response body size (responses with a known length)',
+        ENDPOINT_LABELS, SIZE_BUCKETS),
+}
+
+class Registry:
+    """Counters and histograms for one process, keyed by (name, label values)"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters = {}
+        self._histograms = {}
+
+    def inc(self, name, labels, value=1):
+        key = (name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0) + value
+
+    def observe(self, name, labels, value):
+        buckets = METRICS[name][3]
+        key = (name, labels)
+        with self._lock:
+            series = self._histograms.get(key)
+            if series is None:
+                # per-bucket counts (last slot is +Inf), sum, count
+                series = self._histograms[key] = [[0] * (len(buckets) + 1), 0.0, 0]
+            series[0][bisect_left(buckets, value)] += 1
+            series[1] += value
+            series[2] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'counters': [[name, list(labels), value]
+                             for (name, labels), value in self._counters.items()],
+                'histograms': [[name, list(labels), list(series[0]), series[1], series[2]]
+                               for (name, labels), series in self._histograms.items()],
+            }
+
+def merge(snapshots):
+    """Sum snapshots from several processes into ({key: value}, {key: [counts, sum, count]})"""
+    counters = {}
+    histograms = {}
+    for snapshot in snapshots:
+        for name, labels, value in snapshot.get('counters', ()):
+            key = (name, tuple(labels))
+            counters[key] = counters.get(key, 0) + value
+        for name, labels, counts, total, count in snapshot.get('histograms', ()):
+            if name not in METRICS or len(counts) != len(METRICS[name][3]) + 1:
+                continue  # written by a version with different buckets
+            key = (name, tuple(labels))
+            series = histograms.setdefault(key, [[0] * len(counts), 0.0, 0])
+            for index, bucket_count in enumerate(counts):
+                series[0][index] += bucket_count
+            series[1] += total
+            series[2] += count
+    return counters, histograms
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(names, values, extra=None):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+def _number(value):
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value)
+
+def render(counters, histograms):
+    """Prometheus text exposition (version 0.0.4)"""
+    lines = []
+    for name, (kind, help_text, label_names, buckets) in METRICS.items():
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        if kind == 'counter':
+            for (series_name, labels), value in sorted(counters.items()):
+                if series_name == name:
+                    lines.append(f'{name}{_labels(label_names, labels)} {_number(value)}')
+            continue
+        for (series_name, labels), (counts, total, count) in sorted(histograms.items()):
+            if series_name != name:
+                continue
+            cumulative = 0
+            for bound, bucket_count in zip(buckets + (float('inf'),), counts):
+                cumulative += bucket_count
+                le = '+Inf' if bound == float('inf') else _number(float(bound))
+                bucket_labels = _labels(label_names, labels, 'le="' + le + '"')
+                lines.append(f'{name}_bucket{bucket_labels} {cumulative}')
+            lines.append(f'{name}_sum{_labels(label_names, labels)} {_number(total)}')
+            lines.append(f'{name}_count{_labels(label_names, labels)} {count}')
+    return '\n'.join(lines) + '\n'
+
+class FileStore:
+    """Per-process snapshot files in a shared directory"""
+
+    def __init__(self, directory, flush_interval=5):
+        self.directory = directory
+        self.flush_interval = flush_interval
+        self._thread = None
+        self._pid = None
+        self._path = None
+        self._lock = threading.Lock()
+
+    def ensure_flusher(self, registry):
+        # Started lazily so each forked gunicorn worker gets its own file and thread
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            os.makedirs(self.directory, exist_ok=True)
+            self._pid = os.getpid()
+            self._path = os.path.join(self.directory, f'{self._pid}-{int(time.time())}.json')
+            self._thread = threading.Thread(target=self._run, args=(registry,), daemon=True,
+                                            name='metrics-flusher')
+            self._thread.start()
+            atexit.register(self.write, registry)
+
+    def _run(self, registry):
+        while True:
+            time.sleep(self.flush_interval)
+            self.write(registry)
+
+    def write(self, registry):
+        if self._path is None:
+            return
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+            with os.fdopen(fd, 'w') as f:
+                json.dump(registry.snapshot(), f)
+            os.replace(tmp_path, self._path)
+        except OSError as e:
+            print(f"Error writing metrics snapshot: {e}")
+
+    def read_all(self):
+        snapshots = []
+        for filename in os.listdir(self.directory):
+            if not filename.endswith('.json'):
+                continue
+            try:
+                with open(os.path.join(self.directory, filename)) as f:
+                    snapshots.append(json.load(f))
+            except (OSError, ValueError):
+                continue  # removed or replaced while listing
+        return snapshots
+
+registry = Registry()
+
+def init_metrics(app):
+    """Record request metrics and serve them on GET /metrics"""
+    from flask import g, request, Response, abort
+    from utils.query_stats import current_log
+
+    store = None
+    if app.config.get('METRICS_DIR'):
+        store = FileStore(app.config['METRICS_DIR'], app.config.get('METRICS_FLUSH_INTERVAL', 5))
+    token = app.config.get('METRICS_TOKEN')
+
+    @app.before_request
+    def start_timer():
+        g._metrics_start = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        start = g.pop('_metrics_start', None)
+        if start is None:
+            return response
+        labels = (request.blueprint or 'app', request.endpoint or 'unmatched', request.method)
+        registry.inc('http_requests_total', labels + (str(response.status_code),))
+        registry.observe('http_request_duration_seconds', labels, time.perf_counter() - start)
+        log = current_log()
+        if log is not None:
+            registry.observe('http_request_db_seconds', labels, log.total_ms / 1000)
+            registry.observe('http_request_db_queries', labels, log.count)
+            registry.observe('http_request_pool_wait_seconds', labels, log.pool_wait_ms / 1000)
+        if response.content_length is not None:
+            registry.observe('http_response_size_bytes', labels, response.content_length)
+        if store is not None:
+            store.ensure_flusher(registry)
+        return response
+
+    @app.route('/metrics')
+    def metrics():
+        if token and request.headers.get('Authorization') != f'Bearer {token}':
+            abort(401)
+        if store is not None:
+            store.ensure_flusher(registry)
+            store.write(registry)
+            counters, histograms = merge(store.read_all())
+        else:
+            counters, histograms = merge([registry.snapshot()])
+        return Response(render(counters, histograms),
+                        mimetype='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,53 @@
+"""
+Incrementally maintained per-customer order statistics
+
+user_order_stats holds each user's number of orders, lifetime spend and
+last order date, counting only orders that are not cancelled. The helpers
+run on the caller's cursor so the rollup commits in the same transaction
+as the order change. rebuild_user_order_stats.py recomputes the table.
+"""
+
+def record_order(cursor, user_id, total_amount, created_at):
+    """A new order adds to the customer's count and spend"""
+    cursor.execute("""
+        INSERT INTO user_order_stats (user_id, order_count, total_spent, last_order_at)
+        VALUES (%s, 1, %s, %s)
+        ON CONFLICT (user_id) DO UPDATE SET
+            order_count = user_order_stats.order_count + 1,
+            total_spent = user_order_stats.total_spent + EXCLUDED.total_spent,
+            last_order_at = GREATEST(user_order_stats.last_order_at, EXCLUDED.last_order_at),
+            updated_at = CURRENT_TIMESTAMP
+    """, (user_id, total_amount, created_at))
+
+def record_status_change(cursor, user_id, total_amount, old_status, new_status):
+    """
+    Cancelling an order removes it from the stats; un-cancelling adds it back
+    Call after the orders row has been updated, so last_order_at can be
+    recomputed from the customer's remaining orders.
+    """
+    was_counted = old_status != 'cancelled'
+    is_counted = new_status != 'cancelled'
+    if was_counted == is_counted:
+        return
+
+    delta = 1 if is_counted else -1
+    cursor.execute("""
+        INSERT INTO user_order_stats (user_id, order_count, total_spent, last_order_at)
+        VALUES (%(user_id)s, %(delta)s, %(amount)s, (
+            SELECT MAX(created_at) FROM orders
+            WHERE user_id = %(user_id)s AND status <> 'cancelled'
+        ))
+        ON CONFLICT (user_id) DO UPDATE SET
+            order_count = user_order_stats.order_count + %(delta)s,
+            total_spent = user_order_stats.total_spent + %(amount)s,
+            last_order_at = EXCLUDED.last_order_at,
+            updated_at = CURRENT_TIMESTAMP
+    """, {'user_id': user_id, 'delta': delta, 'amount': total_amount * delta})
+
+def serialize_order_stats(order_count, total_spent, last_order_at):
+    """Stats for a user row LEFT JOINed to user_order_stats (NULLs = no orders)"""
+    return {
+        'order_count': order_count or 0,
+        'total_spent': float(total_spent) if total_spent is not None else 0.0,
+        'last_order_at': last_order_at.isoformat() if last_order_at else None
+    }
@@ -0,0 +1,33 @@
+"""
+Keyset (cursor) pagination helpers
+"""
+import base64
+import json
+
+def encode_cursor(*values):
+    """Encode the sort key of the last row into an opaque cursor string"""
+    key = [v.isoformat() if hasattr(v, 'isoformat') else v for v in values]
+    raw = json.dumps(key, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(cursor, size):
+    """
+    Decode a cursor produced by encode_cursor
+    Returns: list of `size` values, or None if the cursor is malformed
+    """
+    try:
+        padded = cursor + '=' * (-len(cursor) % 4)
+        key = json.loads(base64.urlsafe_b64decode(padded.encode('ascii')))
+    except (ValueError, TypeError):
+        return None
+    if not isinstance(key, list) or len(key) != size:
+        return None
+    return key
+
+def parse_limit(value, default=20, maximum=100):
+    """Clamp a ?limit= query parameter into [1, maximum]"""
+    try:
+        limit = int(value) if value is not None else default
+    except (TypeError, ValueError):
+        limit = default
+    return max(1, min(limit, maximum))
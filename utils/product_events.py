@@ -0,0 +1,29 @@
+"""
+Change capture for product updates that wishlist owners care about
+
+update_product calls capture_product_change on its own cursor, so an event
+is recorded only when the update commits. notify_wishlists.py consumes the
+events in batches.
+"""
+
+def capture_product_change(cursor, product_id, before, after):
+    """
+    Record back-in-stock / price-drop events for one product update
+    before/after: (price, stock_quantity) tuples
+    Returns: list of recorded event kinds
+    """
+    old_price, old_stock = before
+    new_price, new_stock = after
+    kinds = []
+
+    if (old_stock or 0) <= 0 and (new_stock or 0) > 0:
+        kinds.append('back_in_stock')
+    if old_price is not None and new_price is not None and new_price < old_price:
+        kinds.append('price_drop')
+
+    for kind in kinds:
+        cursor.execute("""
+            INSERT INTO product_change_events (product_id, kind, old_price, new_price)
+            VALUES (%s, %s, %s, %s)
+        """, (product_id, kind, old_price, new_price))
+    return kinds
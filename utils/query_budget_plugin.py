@@ -0,0 +1,67 @@
+"""
+pytest plugin: assert the query budgets declared on routes
+
+Load it with `pytest -p utils.query_budget_plugin` (or
+`pytest_plugins = ['utils.query_budget_plugin']` in a conftest.py). Tests
+run against the database configured in .env, e.g. a local Postgres loaded
+with `python migrate.py && python generate_data.py --scale 0.01`.
+
+    def test_product_list(query_budget):
+        response = query_budget.get('/api/products?per_page=50')
+        assert response.status_code == 200
+
+Each request through the fixture fails the test when it issues more
+statements than the endpoint's @query_budget allows (or when no budget is
+declared); the statements are listed in the failure message. Pass
+max_queries= to a call for a tighter, test-specific limit, and inspect
+query_budget.last for the QueryLog of the previous request.
+"""
+import pytest
+from utils.query_stats import track_queries, budget_for, QueryBudget
+
+class BudgetClient:
+    def __init__(self, app):
+        self.app = app
+        self.client = app.test_client()
+        self.last = None
+
+    def open(self, path, method='GET', max_queries=None, max_ms=None, **kwargs):
+        with track_queries() as log:
+            response = self.client.open(path, method=method, **kwargs)
+        self.last = log
+
+        if max_queries is not None:
+            budget = QueryBudget(max_queries, max_ms)
+        else:
+            budget = budget_for(self.app, log.endpoint)
+            if budget is None:
+                pytest.fail(f"{method} {path}: no @query_budget declared for endpoint "
+                            f"{log.endpoint!r}\n{log.summary()}")
+
+        problems = budget.violations(log)
+        if problems:
+            pytest.fail(f"{method} {path} ({log.endpoint}): {', '.join(problems)}\n"
+                        f"{log.summary()}")
+        return response
+
+    def get(self, path, **kwargs):
+        return self.open(path, method='GET', **kwargs)
+
+    def post(self, path, **kwargs):
+        return self.open(path, method='POST', **kwargs)
+
+    def put(self, path, **kwargs):
+        return self.open(path, method='PUT', **kwargs)
+
+    def delete(self, path, **kwargs):
+        return self.open(path, method='DELETE', **kwargs)
+
+@pytest.fixture(scope='session')
+def app():
+    from app import app as flask_app
+    flask_app.config.update(TESTING=True)
+    return flask_app
+
+@pytest.fixture
+def query_budget(app):
+    return BudgetClient(app)
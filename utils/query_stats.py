@@ -0,0 +1,203 @@
+"""
+Per-request SQL statement accounting
+
+Every connection in the pool is opened with InstrumentedCursor as its
+cursor factory, so each execute()/executemany()/copy_expert() is timed and
+counted into the QueryLog of the request being served (a context variable,
+so request threads and background flushers never mix). Outside a request,
+or with no log active, statements are not recorded.
+
+Routes declare their budget next to the route decorator:
+
+    @product_bp.route('', methods=['GET'])
+    @query_budget(2)
+    def get_products(): ...
+
+The app checks the budget after each request (QUERY_BUDGET_MODE: off, warn,
+raise) and utils/query_budget_plugin.py asserts it in tests.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from psycopg2.extensions import cursor as _cursor
+
+# Statements kept per request for reporting; counts and totals keep going
+MAX_RECORDED_STATEMENTS = 200
+
+_current_log = ContextVar('query_log', default=None)
+
+# Set by utils/slow_queries.py; statements are only timed when either is active
+_slow_hook = None
+_slow_threshold_ms = None
+
+class QueryLog:
+    def __init__(self, capture_sql=False):
+        self.endpoint = None
+        self.count = 0
+        self.total_ms = 0.0
+        self.rows = 0
+        self.pool_wait_ms = 0.0
+        self.statements = []
+        # With capture_sql, the exact SQL sent by each execute() (parameters
+        # bound), e.g. for EXPLAIN in tests; off by default as it holds user data
+        self.capture_sql = capture_sql
+        self.executed = []
+
+    def record(self, statement, duration_ms, rows, sent=None):
+        self.count += 1
+        if sent is not None:
+            if isinstance(sent, bytes):
+                sent = sent.decode('utf-8', 'replace')
+            self.executed.append(sent)
+        self.total_ms += duration_ms
+        if rows > 0:
+            self.rows += rows
+        if len(self.statements) < MAX_RECORDED_STATEMENTS:
+            if isinstance(statement, bytes):
+                statement = statement.decode('utf-8', 'replace')
+            self.statements.append((' '.join(str(statement).split()), duration_ms, rows))
+
+    def summary(self):
+        """Multi-line listing of the recorded statements, for failure messages and logs"""
+        lines = [f"{self.count} queries, {self.total_ms:.1f} ms, {self.rows} rows"]
+        for index, (statement, duration_ms, rows) in enumerate(self.statements, 1):
+            lines.append(f"  {index:>3}. {duration_ms:7.2f} ms {rows:>6} rows  {statement[:200]}")
+        return '\n'.join(lines)
+
+class InstrumentedCursor(_cursor):
+    """psycopg2 cursor that reports each statement to the active QueryLog
+    and, over the slow-query threshold, to the slow-query hook"""
+
+    def _timed(self, method, statement, *args):
+        log = _current_log.get()
+        if log is None and _slow_hook is None:
+            return method(statement, *args)
+        start = time.perf_counter()
+        try:
+            return method(statement, *args)
+        finally:
+            duration_ms = (time.perf_counter() - start) * 1000
+            if log is not None:
+                sent = self.query if log.capture_sql and method.__name__ == 'execute' else None
+                log.record(statement, duration_ms, self.rowcount, sent)
+            if _slow_hook is not None and duration_ms >= _slow_threshold_ms:
+                # Only a single execute() can be re-run for a plan
+                explainable = method.__name__ == 'execute'
+                _slow_hook(self, statement, args[0] if explainable else None, explainable,
+                           duration_ms, self.rowcount, log.endpoint if log else None)
+
+    def execute(self, query, vars=None):
+        return self._timed(super().execute, query, vars)
+
+    def executemany(self, query, vars_list):
+        return self._timed(super().executemany, query, vars_list)
+
+    def copy_expert(self, sql, file, size=8192):
+        return self._timed(super().copy_expert, sql, file, size)
+
+def set_slow_query_hook(threshold_ms, hook):
+    """Call hook(cursor, statement, params, explainable, duration_ms, rows,
+    endpoint) for every statement taking at least threshold_ms; pass
+    hook=None to disable"""
+    global _slow_threshold_ms, _slow_hook
+    _slow_threshold_ms = threshold_ms
+    _slow_hook = hook
+
+def record_pool_wait(duration_ms):
+    """Add time spent waiting for a pooled connection to the active QueryLog"""
+    log = _current_log.get()
+    if log is not None:
+        log.pool_wait_ms += duration_ms
+
+def current_log():
+    """The QueryLog collecting statements in this context, or None"""
+    return _current_log.get()
+
+def start_log():
+    """Install a fresh QueryLog unless one is already active; returns (log, token)"""
+    log = _current_log.get()
+    if log is not None:
+        return log, None
+    log = QueryLog()
+    return log, _current_log.set(log)
+
+def end_log(token):
+    if token is not None:
+        _current_log.reset(token)
+
+@contextmanager
+def track_queries(capture_sql=False):
+    """Collect statements run inside the block (a request made through the
+    test client included) into a new QueryLog"""
+    log = QueryLog(capture_sql)
+    token = _current_log.set(log)
+    try:
+        yield log
+    finally:
+        _current_log.reset(token)
+
+class QueryBudget:
+    def __init__(self, max_queries, max_ms=None):
+        self.max_queries = max_queries
+        self.max_ms = max_ms
+
+    def violations(self, log):
+        problems = []
+        if log.count > self.max_queries:
+            problems.append(f"{log.count} queries (budget {self.max_queries})")
+        if self.max_ms is not None and log.total_ms > self.max_ms:
+            problems.append(f"{log.total_ms:.1f} ms in SQL (budget {self.max_ms} ms)")
+        return problems
+
+def query_budget(max_queries, max_ms=None):
+    """Declare the most statements (and optionally SQL milliseconds) a view may
+    use per request; the view itself is returned unchanged"""
+    def wrapper(fn):
+        fn.query_budget = QueryBudget(max_queries, max_ms)
+        return fn
+    return wrapper
+
+def budget_for(app, endpoint):
+    """Declared QueryBudget for an endpoint, or None (decorators built with
+    functools.wraps carry the attribute up to the registered view)"""
+    view = app.view_functions.get(endpoint) if endpoint else None
+    return getattr(view, 'query_budget', None)
+
+class BudgetExceeded(Exception):
+    pass
+
+def init_query_stats(app):
+    """Open a QueryLog per request and check it against the endpoint's budget"""
+    from flask import g, request
+
+    mode = app.config.get('QUERY_BUDGET_MODE', 'warn')
+    add_headers = app.config.get('QUERY_STATS_HEADERS', False)
+
+    @app.before_request
+    def open_query_log():
+        log, g._query_log_token = start_log()
+        # A sub-request of /api/batch adds to the batch's log without renaming it
+        if g._query_log_token is not None or log.endpoint is None:
+            log.endpoint = request.endpoint
+
+    @app.after_request
+    def check_query_budget(response):
+        log = current_log()
+        if log is None:
+            return response
+        if add_headers:
+            response.headers['X-Query-Count'] = str(log.count)
+            response.headers['X-Query-Time'] = f"{log.total_ms:.1f}"
+        budget = budget_for(app, log.endpoint)
+        if mode != 'off' and budget is not None:
+            problems = budget.violations(log)
+            if problems:
+                message = f"Query budget exceeded for {log.endpoint}: {', '.join(problems)}"
+                if mode == 'raise':
+                    raise BudgetExceeded(f"{message}\n{log.summary()}")
+                app.logger.warning("%s\n%s", message, log.summary())
+        return response
+
+    @app.teardown_request
+    def close_query_log(exc):
+        end_log(g.pop('_query_log_token', None))
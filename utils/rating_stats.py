@@ -0,0 +1,31 @@
+"""
+Incrementally maintained per-product rating aggregates
+
+product_rating_stats holds the count, sum and 1-5 star histogram of each
+product's approved reviews. apply_review_delta runs on the caller's cursor
+so the aggregate commits in the same transaction as the review change.
+rebuild_rating_stats.py recomputes the table from scratch.
+"""
+
+def apply_review_delta(cursor, product_id, rating, delta):
+    """Add (delta=1) or remove (delta=-1) one approved review with this rating"""
+    stars = [delta if rating == star else 0 for star in range(1, 6)]
+    cursor.execute("""
+        INSERT INTO product_rating_stats
+        (product_id, review_count, rating_sum, star_1, star_2, star_3, star_4, star_5)
+        VALUES (%s, %s, %s, %s, %s, %s, %s, %s)
+        ON CONFLICT (product_id) DO UPDATE SET
+            review_count = product_rating_stats.review_count + EXCLUDED.review_count,
+            rating_sum = product_rating_stats.rating_sum + EXCLUDED.rating_sum,
+            star_1 = product_rating_stats.star_1 + EXCLUDED.star_1,
+            star_2 = product_rating_stats.star_2 + EXCLUDED.star_2,
+            star_3 = product_rating_stats.star_3 + EXCLUDED.star_3,
+            star_4 = product_rating_stats.star_4 + EXCLUDED.star_4,
+            star_5 = product_rating_stats.star_5 + EXCLUDED.star_5,
+            updated_at = CURRENT_TIMESTAMP
+    """, [product_id, delta, rating * delta] + stars)
+
+def average_rating(rating_sum, review_count):
+    if not review_count:
+        return None
+    return round(rating_sum / review_count, 2)
@@ -0,0 +1,184 @@
+"""
+On-demand request profiling
+
+With PROFILING_ENABLED set, a request is run under cProfile when either
+- an admin sends the X-Profile: 1 header (or ?_profile=1), or
+- it is picked by random sampling at PROFILE_SAMPLE_RATE (0.0-1.0).
+
+Each profile is saved under PROFILE_DIR as three files sharing one id:
+<id>.prof (pstats, for snakeviz / pstats), <id>.collapsed (folded stacks,
+"a;b;c <microseconds>" per line, for flamegraph.pl or speedscope) and
+<id>.json (request metadata). Only the newest PROFILE_MAX_FILES profiles are
+kept. They are listed and downloaded through /api/admin/profiles.
+
+cProfile records caller/callee pairs rather than whole stacks, so the folded
+stacks are rebuilt from the call graph, splitting each function's time
+across its callers in proportion (as flameprof does); a function reached
+through several paths is attributed proportionally rather than exactly.
+
+When PROFILING_ENABLED is off no hooks are registered at all.
+"""
+import os
+import json
+import time
+import random
+import pstats
+import cProfile
+from datetime import datetime, timezone
+
+MAX_STACK_DEPTH = 100
+MIN_FOLDED_MICROSECONDS = 1
+
+def frame_label(func):
+    filename, lineno, name = func
+    if filename == '~':
+        return name  # built-in, e.g. <method 'execute' of 'psycopg2...cursor' objects>
+    return f"{os.path.basename(filename)}:{lineno}({name})"
+
+def fold_stats(stats):
+    """
+    Folded stacks from a pstats.Stats call graph
+    Returns: {stack tuple: microseconds}
+    """
+    raw = stats.stats  # func -> (cc, nc, tt, ct, callers{caller: (cc, nc, tt, ct)})
+    callees = {}
+    for func, (_, _, _, _, callers) in raw.items():
+        for caller, edge in callers.items():
+            callees.setdefault(caller, []).append((func, edge[3]))
+
+    folded = {}
+
+    def visit(func, stack, budget):
+        _, _, tt, ct, _ = raw[func]
+        if ct <= 0 or budget <= 0:
+            return
+        scale = min(budget / ct, 1.0)
+        stack = stack + (frame_label(func),)
+        own = int(tt * scale * 1_000_000)
+        if own >= MIN_FOLDED_MICROSECONDS:
+            folded[stack] = folded.get(stack, 0) + own
+        if len(stack) >= MAX_STACK_DEPTH:
+            return
+        for callee, edge_ct in callees.get(func, ()):
+            if frame_label(callee) in stack:
+                continue  # recursion: already counted in the outer frame
+            visit(callee, stack, edge_ct * scale)
+
+    roots = [func for func, (_, _, _, _, callers) in raw.items() if not callers]
+    for root in roots:
+        visit(root, (), raw[root][3])
+    return folded
+
+def write_collapsed(folded, path):
+    with open(path, 'w') as f:
+        for stack, micros in sorted(folded.items()):
+            f.write(f"{';'.join(stack)} {micros}\n")
+
+def list_profiles(directory):
+    """Metadata of stored profiles, newest first"""
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for filename in os.listdir(directory):
+        if not filename.endswith('.json'):
+            continue
+        try:
+            with open(os.path.join(directory, filename)) as f:
+                profiles.append(json.load(f))
+        except (OSError, ValueError):
+            continue
+    profiles.sort(key=lambda meta: meta['created_at'], reverse=True)
+    return profiles
+
+def prune_profiles(directory, keep):
+    for meta in list_profiles(directory)[keep:]:
+        for suffix in ('.json', '.prof', '.collapsed'):
+            try:
+                os.remove(os.path.join(directory, meta['id'] + suffix))
+            except OSError:
+                pass
+
+def _requested_by_admin(request):
+    """X-Profile / ?_profile from a valid admin token; other callers are ignored"""
+    if request.headers.get('X-Profile') != '1' and request.args.get('_profile') != '1':
+        return False
+    from flask_jwt_extended import verify_jwt_in_request, get_jwt_identity
+    from flask_jwt_extended.exceptions import JWTExtendedException
+    from jwt.exceptions import PyJWTError
+    from utils.auth_utils import get_user_role
+    # A bad token just means no profile; the view's own auth still rejects it
+    try:
+        if not verify_jwt_in_request(optional=True):
+            return False
+        user_id = int(get_jwt_identity())
+    except (JWTExtendedException, PyJWTError, TypeError, ValueError):
+        return False
+    return get_user_role(user_id) == 'admin'
+
+def init_request_profiler(app):
+    """Register the profiling hooks when PROFILING_ENABLED is set"""
+    if not app.config.get('PROFILING_ENABLED'):
+        return
+
+    from flask import g, request
+
+    directory = os.path.join(app.root_path, app.config.get('PROFILE_DIR', 'profiles'))
+    sample_rate = app.config.get('PROFILE_SAMPLE_RATE', 0.0)
+    max_files = app.config.get('PROFILE_MAX_FILES', 200)
+    os.makedirs(directory, exist_ok=True)
+
+    @app.before_request
+    def start_profile():
+        if request.path.startswith('/api/admin/profiles'):
+            return
+        sampled = sample_rate > 0 and random.random() < sample_rate
+        if not sampled and not _requested_by_admin(request):
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:
+            return  # another profiler is already active in this thread
+        g._profiler = profiler
+        g._profile_trigger = 'sampled' if sampled else 'admin'
+        g._profile_start = time.perf_counter()
+
+    @app.after_request
+    def save_profile(response):
+        profiler = g.pop('_profiler', None)
+        if profiler is None:
+            return response
+        profiler.disable()
+        duration_ms = (time.perf_counter() - g._profile_start) * 1000
+
+        created_at = datetime.now(timezone.utc)
+        endpoint = request.endpoint or 'unmatched'
+        profile_id = f"{created_at.strftime('%Y%m%dT%H%M%S%f')}-{os.getpid()}-{endpoint.replace('.', '_')}"
+        base = os.path.join(directory, profile_id)
+        try:
+            stats = pstats.Stats(profiler)
+            stats.dump_stats(base + '.prof')
+            write_collapsed(fold_stats(stats), base + '.collapsed')
+            with open(base + '.json', 'w') as f:
+                json.dump({
+                    'id': profile_id,
+                    'created_at': created_at.isoformat(),
+                    'method': request.method,
+                    'path': request.path,
+                    'endpoint': endpoint,
+                    'status': response.status_code,
+                    'duration_ms': round(duration_ms, 2),
+                    'trigger': g._profile_trigger,
+                }, f)
+            prune_profiles(directory, max_files)
+            response.headers['X-Profile-Id'] = profile_id
+        except OSError as e:
+            print(f"Error saving request profile: {e}")
+        return response
+
+    @app.teardown_request
+    def stop_profile(exc):
+        # Only still set when the request failed before after_request ran
+        profiler = g.pop('_profiler', None)
+        if profiler is not None:
+            profiler.disable()
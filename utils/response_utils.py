@@ -1,4 +1,25 @@
-from flask import jsonify
+from flask import jsonify, current_app
+
+class RawJSON:
+    """
+    Already-serialized JSON placed into a response body as-is, e.g. a cached
+    product page: success_response(RawJSON(cached_bytes))
+    """
+    __slots__ = ('data',)
+
+    def __init__(self, data):
+        self.data = data if isinstance(data, bytes) else data.encode('utf-8')
+
+def json_response(body, status=200):
+    """Response from a dict, splicing in a RawJSON 'data' value without re-encoding it"""
+    data = body.get('data')
+    if not isinstance(data, RawJSON):
+        return jsonify(body), status
+    envelope = {key: value for key, value in body.items() if key != 'data'}
+    encoded = current_app.json.dumps_bytes(envelope)
+    # envelope always has 'success', so it is a non-empty object ending in '}'
+    encoded = encoded[:-1] + b',"data":' + data.data + b'}'
+    return current_app.response_class(encoded, mimetype='application/json'), status
 
 def success_response(data=None, message=None, status=200):
     """Standard success response"""
@@ -7,7 +28,7 @@ def success_response(data=None, message=None, status=200):
         response['message'] = message
     if data is not None:
         response['data'] = data
-    return jsonify(response), status
+    return json_response(response, status)
 
 def error_response(message, status=400):
     """Standard error response"""
@@ -15,7 +36,7 @@ def error_response(message, status=400):
 
 def paginated_response(data, page, per_page, total):
     """Paginated response"""
-    return jsonify({
+    return json_response({
         'success': True,
         'data': data,
         'pagination': {
@@ -24,4 +45,16 @@ def paginated_response(data, page, per_page, total):
             'total': total,
             'pages': (total + per_page - 1) // per_page
         }
-    }), 200
+    })
+
+def cursor_response(data, next_cursor, limit):
+    """Keyset-paginated response"""
+    return json_response({
+        'success': True,
+        'data': data,
+        'pagination': {
+            'limit': limit,
+            'next_cursor': next_cursor,
+            'has_more': next_cursor is not None
+        }
+    })
@@ -0,0 +1,292 @@
+"""
+Slow-query log with plan capture
+
+Statements slower than SLOW_QUERY_MS are reported by InstrumentedCursor
+(utils/query_stats.py). Each one is normalized (literals and placeholders
+become ?, long IN/VALUES lists are collapsed) into a fingerprint, and
+recorded with its redacted parameters, duration, row count and the route
+that issued it:
+
+- in a bounded ring buffer of recent entries and per-fingerprint totals
+  (count, total and max time), served by GET /api/admin/slow-queries;
+- as one JSON line in a rotating per-worker log file under SLOW_QUERY_LOG_DIR.
+
+A background thread re-runs the statement under EXPLAIN on its own pooled
+connection, inside a read-only transaction with a statement timeout that is
+always rolled back. SELECTs get EXPLAIN (ANALYZE, BUFFERS); anything that
+cannot run read-only falls back to a plain EXPLAIN. Each fingerprint is
+explained at most once per SLOW_QUERY_EXPLAIN_INTERVAL, and when the queue
+is full the plan is skipped rather than delaying the request.
+
+Totals and the ring buffer are per worker process; the log files cover all
+of them.
+"""
+import os
+import re
+import json
+import time
+import queue
+import hashlib
+import logging
+import threading
+from collections import deque
+from datetime import date, datetime, timezone
+from decimal import Decimal
+from logging.handlers import RotatingFileHandler
+from psycopg2.extensions import cursor as plain_cursor
+
+_STRING = re.compile(r"'(?:[^']|'')*'")
+_NUMBER = re.compile(r"\b\d+(?:\.\d+)?\b")
+_PLACEHOLDER = re.compile(r"%\(\w+\)s|%s")
+_LIST = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+_REPEATED_LISTS = re.compile(r"\(\?, \.\.\.\)(?:\s*,\s*\(\?, \.\.\.\))+")
+_WRITE_KEYWORDS = re.compile(r"\b(INSERT|UPDATE|DELETE|MERGE|FOR\s+(NO\s+KEY\s+)?UPDATE|FOR\s+SHARE)\b",
+                             re.IGNORECASE)
+
+MAX_FINGERPRINTS = 500
+MAX_LISTED_PARAMS = 5
+
+def normalize_sql(statement):
+    """Statement text with literals replaced by ? and whitespace collapsed"""
+    text = ' '.join(statement.split())
+    text = _STRING.sub('?', text)
+    text = _PLACEHOLDER.sub('?', text)
+    text = _NUMBER.sub('?', text)
+    text = _LIST.sub('(?, ...)', text)
+    return _REPEATED_LISTS.sub('(?, ...), ...', text)
+
+def fingerprint(normalized):
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()[:16]
+
+def _redact_value(value):
+    if value is None or isinstance(value, (bool, int, float)):
+        return value
+    if isinstance(value, Decimal):
+        return float(value)
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    if isinstance(value, str):
+        return f'<str:{len(value)}>'
+    if isinstance(value, (bytes, bytearray, memoryview)):
+        return f'<bytes:{len(value)}>'
+    if isinstance(value, (list, tuple)):
+        shown = [_redact_value(item) for item in value[:MAX_LISTED_PARAMS]]
+        if len(value) > MAX_LISTED_PARAMS:
+            shown.append(f'...(+{len(value) - MAX_LISTED_PARAMS})')
+        return shown
+    return f'<{type(value).__name__}>'
+
+def redact_params(params):
+    """Parameters with strings and other free-form values replaced by their
+    type and length, so logs never carry emails, tokens or addresses"""
+    if params is None:
+        return None
+    if isinstance(params, dict):
+        return {key: _redact_value(value) for key, value in params.items()}
+    return [_redact_value(value) for value in params]
+
+class SlowQueryLog:
+    def __init__(self, threshold_ms=200, buffer_size=200, log_dir='logs',
+                 log_max_bytes=5 * 1024 * 1024, log_backups=3, explain=True,
+                 explain_interval=300, explain_timeout_ms=10000):
+        self.threshold_ms = threshold_ms
+        self.log_dir = log_dir
+        self.log_max_bytes = log_max_bytes
+        self.log_backups = log_backups
+        self.explain = explain
+        self.explain_interval = explain_interval
+        self.explain_timeout_ms = explain_timeout_ms
+        self.recent = deque(maxlen=buffer_size)
+        self.stats = {}
+        self.dropped_plans = 0
+        self._lock = threading.Lock()
+        self._queue = queue.Queue(maxsize=100)
+        self._thread = None
+        self._pid = None
+        self._logger = None
+
+    def record(self, cursor, statement, params, explainable, duration_ms, rows, endpoint):
+        """Slow-query hook for InstrumentedCursor; never raises into the caller"""
+        try:
+            if isinstance(statement, bytes):
+                statement = statement.decode('utf-8', 'replace')
+            elif not isinstance(statement, str):
+                statement = statement.as_string(cursor)  # psycopg2.sql.Composed
+            self._record(statement, params, explainable, duration_ms, rows, endpoint)
+        except Exception as e:
+            print(f"Error recording slow query: {e}")
+
+    def _record(self, statement, params, explainable, duration_ms, rows, endpoint):
+        normalized = normalize_sql(statement)
+        key = fingerprint(normalized)
+        now = time.time()
+        entry = {
+            'time': datetime.fromtimestamp(now, timezone.utc).isoformat(),
+            'fingerprint': key,
+            'sql': normalized,
+            'params': redact_params(params),
+            'duration_ms': round(duration_ms, 2),
+            'rows': rows,
+            'endpoint': endpoint,
+            'plan': None,
+        }
+
+        with self._lock:
+            self.recent.append(entry)
+            stat = self.stats.get(key)
+            if stat is None:
+                if len(self.stats) >= MAX_FINGERPRINTS:
+                    # Forget the cheapest fingerprint to stay bounded
+                    del self.stats[min(self.stats, key=lambda k: self.stats[k]['total_ms'])]
+                stat = self.stats[key] = {
+                    'fingerprint': key, 'sql': normalized, 'count': 0, 'total_ms': 0.0,
+                    'max_ms': 0.0, 'endpoints': {}, 'last_seen': None, 'plan': None,
+                    'explained_at': None,
+                }
+            stat['count'] += 1
+            stat['total_ms'] += duration_ms
+            stat['max_ms'] = max(stat['max_ms'], duration_ms)
+            route = endpoint or 'background'
+            stat['endpoints'][route] = stat['endpoints'].get(route, 0) + 1
+            stat['last_seen'] = entry['time']
+
+            want_plan = (self.explain and explainable and
+                         (stat['explained_at'] is None or
+                          now - stat['explained_at'] >= self.explain_interval))
+            if want_plan:
+                stat['explained_at'] = now
+
+        self._ensure_worker()
+        job = (entry, statement, params if want_plan else None, want_plan)
+        try:
+            self._queue.put_nowait(job)
+        except queue.Full:
+            self.dropped_plans += 1
+            self._write(entry)
+
+    def top(self, order='total_ms', limit=20):
+        with self._lock:
+            stats = sorted(self.stats.values(), key=lambda stat: stat[order], reverse=True)
+            return [{
+                'fingerprint': stat['fingerprint'],
+                'sql': stat['sql'],
+                'count': stat['count'],
+                'total_ms': round(stat['total_ms'], 2),
+                'avg_ms': round(stat['total_ms'] / stat['count'], 2),
+                'max_ms': round(stat['max_ms'], 2),
+                'endpoints': dict(stat['endpoints']),
+                'last_seen': stat['last_seen'],
+                'plan': stat['plan'],
+            } for stat in stats[:limit]]
+
+    def latest(self, limit=50):
+        with self._lock:
+            return list(self.recent)[-limit:][::-1]
+
+    def _ensure_worker(self):
+        # Started lazily so each forked gunicorn worker gets its own thread and log file
+        if self._thread is not None and self._pid == os.getpid():
+            return
+        with self._lock:
+            if self._thread is not None and self._pid == os.getpid():
+                return
+            self._pid = os.getpid()
+            self._logger = self._open_log()
+            self._thread = threading.Thread(target=self._run, daemon=True,
+                                            name='slow-query-explainer')
+            self._thread.start()
+
+    def _open_log(self):
+        logger = logging.getLogger(f'slow_queries.{os.getpid()}')
+        logger.propagate = False
+        logger.setLevel(logging.INFO)
+        if not logger.handlers:
+            os.makedirs(self.log_dir, exist_ok=True)
+            path = os.path.join(self.log_dir, f'slow_queries-{os.getpid()}.log')
+            logger.addHandler(RotatingFileHandler(path, maxBytes=self.log_max_bytes,
+                                                  backupCount=self.log_backups))
+        return logger
+
+    def _write(self, entry):
+        if self._logger is not None:
+            self._logger.info(json.dumps(entry, default=str))
+
+    def _run(self):
+        # Nothing may escape the loop: a dead thread is never restarted and
+        # entries would then only be written when the queue overflows
+        while True:
+            entry, statement, params, want_plan = self._queue.get()
+            try:
+                if want_plan:
+                    plan = self._explain(statement, params)
+                    with self._lock:
+                        entry['plan'] = plan
+                        stat = self.stats.get(entry['fingerprint'])
+                        if stat is not None and plan is not None:
+                            stat['plan'] = plan
+            except Exception as e:
+                print(f"Could not explain slow query: {e}")
+            try:
+                self._write(entry)
+            except Exception as e:
+                print(f"Could not write slow query entry: {e}")
+
+    def _explain(self, statement, params):
+        """EXPLAIN the statement on a separate pooled connection; returns the
+        JSON plan, or None when it cannot be explained"""
+        from db_connection import db
+
+        analyze = not _WRITE_KEYWORDS.search(statement)
+        options = ('ANALYZE, BUFFERS, FORMAT JSON', 'FORMAT JSON') if analyze else ('FORMAT JSON',)
+        try:
+            conn = db.get_connection()
+        except Exception as e:
+            # Pool exhausted (PoolError) or no database: log the entry without a plan
+            print(f"Could not explain slow query: {e}")
+            return None
+        cursor = None
+        try:
+            # A plain cursor: EXPLAIN itself must not be reported as a slow query
+            cursor = conn.cursor(cursor_factory=plain_cursor)
+            for option in options:
+                try:
+                    cursor.execute("SET TRANSACTION READ ONLY")
+                    cursor.execute("SET LOCAL statement_timeout = %s", (self.explain_timeout_ms,))
+                    cursor.execute(f"EXPLAIN ({option}) {statement}", params)
+                    return cursor.fetchone()[0]
+                except Exception as e:
+                    error = str(e).strip()
+                    if conn.closed:
+                        break
+                    conn.rollback()
+            print(f"Could not explain slow query: {error}")
+            return None
+        finally:
+            try:
+                conn.rollback()
+                if cursor is not None:
+                    cursor.close()
+            except Exception:
+                pass  # the connection died; the pool discards it below
+            if conn.closed:
+                db.connection_pool.putconn(conn, close=True)
+            else:
+                db.return_connection(conn)
+
+slow_queries = SlowQueryLog()
+
+def init_slow_query_log(app):
+    """Configure the slow-query log and register it with InstrumentedCursor"""
+    from utils.query_stats import set_slow_query_hook
+
+    config = app.config
+    slow_queries.threshold_ms = config.get('SLOW_QUERY_MS', 200)
+    slow_queries.recent = deque(maxlen=config.get('SLOW_QUERY_BUFFER_SIZE', 200))
+    slow_queries.log_dir = config.get('SLOW_QUERY_LOG_DIR', 'logs')
+    slow_queries.explain = config.get('SLOW_QUERY_EXPLAIN', True)
+    slow_queries.explain_interval = config.get('SLOW_QUERY_EXPLAIN_INTERVAL', 300)
+
+    if slow_queries.threshold_ms > 0:
+        set_slow_query_hook(slow_queries.threshold_ms, slow_queries.record)
+    else:
+        set_slow_query_hook(None, None)
@@ -0,0 +1,55 @@
+"""
+Per-user support conversation rollup
+
+support_conversations keeps one row per customer with the latest message,
+message count and number of unanswered customer messages. The helpers
+below run on the caller's cursor so the rollup changes commit (or roll
+back) together with the support_messages write that caused them.
+"""
+
+PREVIEW_LENGTH = 200
+
+def record_customer_message(cursor, user_id, message_id, message_text, created_at):
+    """A customer message adds one pending message to the conversation"""
+    cursor.execute("""
+        INSERT INTO support_conversations
+        (user_id, last_message_id, last_message_text, last_sender,
+         message_count, pending_count, last_activity_at)
+        VALUES (%s, %s, LEFT(%s, %s), 'customer', 1, 1, %s)
+        ON CONFLICT (user_id) DO UPDATE SET
+            last_message_id = EXCLUDED.last_message_id,
+            last_message_text = EXCLUDED.last_message_text,
+            last_sender = EXCLUDED.last_sender,
+            message_count = support_conversations.message_count + 1,
+            pending_count = support_conversations.pending_count + 1,
+            last_activity_at = GREATEST(support_conversations.last_activity_at,
+                                        EXCLUDED.last_activity_at)
+    """, (user_id, message_id, message_text, PREVIEW_LENGTH, created_at))
+
+def record_admin_reply(cursor, user_id, message_id, reply_text, created_at, answered_pending):
+    """An admin reply becomes the last message and answers one pending message"""
+    cursor.execute("""
+        INSERT INTO support_conversations
+        (user_id, last_message_id, last_message_text, last_sender,
+         message_count, pending_count, last_activity_at)
+        VALUES (%s, %s, LEFT(%s, %s), 'admin', 1, 0, %s)
+        ON CONFLICT (user_id) DO UPDATE SET
+            last_message_id = EXCLUDED.last_message_id,
+            last_message_text = EXCLUDED.last_message_text,
+            last_sender = EXCLUDED.last_sender,
+            message_count = support_conversations.message_count + 1,
+            pending_count = GREATEST(support_conversations.pending_count - %s, 0),
+            last_activity_at = GREATEST(support_conversations.last_activity_at,
+                                        EXCLUDED.last_activity_at)
+    """, (user_id, message_id, reply_text, PREVIEW_LENGTH, created_at,
+          1 if answered_pending else 0))
+
+def record_closed(cursor, user_id, was_pending):
+    """Closing a pending message removes it from the pending counter"""
+    if not was_pending:
+        return
+    cursor.execute("""
+        UPDATE support_conversations
+        SET pending_count = GREATEST(pending_count - 1, 0)
+        WHERE user_id = %s
+    """, (user_id,))
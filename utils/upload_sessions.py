@@ -0,0 +1,136 @@
+"""
+Resumable chunked upload sessions
+
+A session is a pair of files in the sessions folder: <id>.json with the
+declared total size and <id>.part with the bytes received so far. The
+current offset is simply the size of the .part file, so any gunicorn
+worker can accept the next chunk and a client can resume after a dropped
+connection by asking for the offset.
+"""
+import os
+import re
+import json
+import time
+import secrets
+
+try:
+    import fcntl
+except ImportError:  # Windows development machines
+    fcntl = None
+
+CHUNK_SIZE = 64 * 1024
+SESSION_ID_RE = re.compile(r'^[0-9a-f]{32}$')
+CONTENT_RANGE_RE = re.compile(r'^bytes (\d+)-(\d+)/(\d+)$')
+
+class SessionError(Exception):
+    def __init__(self, message, status=400, received=None):
+        super().__init__(message)
+        self.message = message
+        self.status = status
+        self.received = received
+
+def _paths(folder, session_id):
+    if not SESSION_ID_RE.match(session_id):
+        raise SessionError('Upload session not found', 404)
+    return (os.path.join(folder, f"{session_id}.json"),
+            os.path.join(folder, f"{session_id}.part"))
+
+def create_session(folder, total_size):
+    """Start a session for a file of total_size bytes"""
+    os.makedirs(folder, exist_ok=True)
+    session_id = secrets.token_hex(16)
+    meta_path, part_path = _paths(folder, session_id)
+    with open(meta_path, 'w') as f:
+        json.dump({'total_size': total_size, 'created_at': time.time()}, f)
+    open(part_path, 'wb').close()
+    return session_id
+
+def get_status(folder, session_id):
+    """Returns: (received, total_size)"""
+    meta_path, part_path = _paths(folder, session_id)
+    try:
+        with open(meta_path) as f:
+            total_size = json.load(f)['total_size']
+        return os.path.getsize(part_path), total_size
+    except (OSError, ValueError, KeyError):
+        raise SessionError('Upload session not found', 404)
+
+def parse_content_range(header):
+    """Parse 'bytes start-end/total' into (start, end, total)"""
+    match = CONTENT_RANGE_RE.match(header or '')
+    if not match:
+        raise SessionError('Content-Range header required: bytes start-end/total')
+    start, end, total = (int(v) for v in match.groups())
+    if end < start or end >= total:
+        raise SessionError('Invalid Content-Range')
+    return start, end, total
+
+def append_chunk(folder, session_id, start, end, total, stream):
+    """
+    Append bytes start..end (inclusive) from stream to the session
+    Chunks must arrive in order; a mismatched start returns the current
+    offset (409) so the client can resume from there.
+    Returns: (received, total_size)
+    """
+    _, part_path = _paths(folder, session_id)
+    received, total_size = get_status(folder, session_id)
+
+    if total != total_size:
+        raise SessionError('Total size does not match the session', 400)
+
+    with open(part_path, 'ab') as part:
+        if fcntl:
+            try:
+                fcntl.flock(part.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                raise SessionError('Another chunk is being written', 409, received)
+
+        received = os.path.getsize(part_path)
+        if start != received:
+            raise SessionError('Chunk out of order', 409, received)
+
+        remaining = end - start + 1
+        while remaining > 0:
+            chunk = stream.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            part.write(chunk)
+            remaining -= len(chunk)
+
+        if remaining > 0:
+            # Short body: keep what arrived, client resumes from the new offset
+            part.flush()
+            raise SessionError('Chunk body shorter than Content-Range', 400,
+                               os.path.getsize(part_path))
+        part.flush()
+
+    return os.path.getsize(part_path), total_size
+
+def take_completed(folder, session_id):
+    """Detach a completed session and return the path of its assembled file"""
+    meta_path, part_path = _paths(folder, session_id)
+    os.remove(meta_path)
+    return part_path
+
+def discard_session(folder, session_id):
+    meta_path, part_path = _paths(folder, session_id)
+    found = False
+    for path in (meta_path, part_path):
+        if os.path.exists(path):
+            os.remove(path)
+            found = True
+    if not found:
+        raise SessionError('Upload session not found', 404)
+
+def expire_sessions(folder, max_age_seconds):
+    """Remove abandoned sessions older than max_age_seconds; returns count"""
+    if not os.path.isdir(folder):
+        return 0
+    cutoff = time.time() - max_age_seconds
+    removed = 0
+    for name in os.listdir(folder):
+        path = os.path.join(folder, name)
+        if os.path.getmtime(path) < cutoff:
+            os.remove(path)
+            removed += name.endswith('.json')
+    return removed
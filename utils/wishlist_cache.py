@@ -0,0 +1,48 @@
+"""
+Per-user wishlist membership cache
+
+Each entry is the user's wishlisted product IDs as a sorted array('l'),
+a few bytes per product, and membership is a binary search. Entries are
+tagged with users.wishlist_version, which every add/remove bumps in the same
+statement, and are only used while that version is current. Every gunicorn
+worker therefore sees a change on its next lookup: a hit costs a primary-key
+read of the version instead of the user's wishlist rows. The cache is
+LRU-bounded by user count.
+"""
+import threading
+from array import array
+from bisect import bisect_left
+from collections import OrderedDict
+
+class WishlistCache:
+    def __init__(self, max_users=10000):
+        self.max_users = max_users
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        """(version, sorted product IDs) of the cached entry, or (None, None)"""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None, None
+            self._entries.move_to_end(user_id)
+            return entry
+
+    def put(self, user_id, version, product_ids):
+        """Store an iterable of product IDs read at version; returns the sorted array"""
+        packed = array('l', sorted(set(product_ids)))
+        with self._lock:
+            self._entries[user_id] = (version, packed)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+        return packed
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+def contains(sorted_ids, product_id):
+    i = bisect_left(sorted_ids, product_id)
+    return i < len(sorted_ids) and sorted_ids[i] == product_id